@@ -0,0 +1,77 @@
+"""
+Mide el tiempo de arranque de pykarel_web.
+
+Cada caso corre en un proceso nuevo para que las importaciones sean en frío:
+tiempo de ``import pykarel_web``, de crear el primer ``Karel`` y de dibujar
+el primer frame, con y sin render, y qué dependencias pesadas quedaron
+cargadas.
+
+Uso:
+    python benchmarks/bench_inicio.py [--repeticiones N] [--salida archivo.json]
+"""
+import argparse
+import json
+import os
+import subprocess
+import sys
+
+RAIZ = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+CASOS = {
+    "ninguno": "Karel('laberinto', modo_render='ninguno')",
+    "diferido": "Karel('laberinto', modo_render='diferido')",
+    "inmediato_matplotlib": "Karel('laberinto')",
+    "inmediato_numpy": "Karel('laberinto', renderizador='numpy')",
+}
+
+PLANTILLA = """
+import json, sys, time
+t0 = time.perf_counter()
+from pykarel_web import Karel
+t1 = time.perf_counter()
+karel = {crear}
+t2 = time.perf_counter()
+karel.images[-1] if karel.modo_render != 'ninguno' else None
+t3 = time.perf_counter()
+print(json.dumps({{
+    "importar": t1 - t0,
+    "crear_karel": t2 - t1,
+    "primer_frame": t3 - t2,
+    "cargados": [m for m in ("numpy", "matplotlib", "IPython") if m in sys.modules],
+}}))
+"""
+
+
+def medir(crear):
+    entorno = dict(os.environ, PYTHONPATH=RAIZ + os.pathsep + os.environ.get("PYTHONPATH", ""))
+    salida = subprocess.run([sys.executable, "-c", PLANTILLA.format(crear=crear)],
+                            capture_output=True, text=True, check=True, env=entorno)
+    return json.loads(salida.stdout)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--repeticiones", type=int, default=3)
+    parser.add_argument("--salida", help="Archivo JSON donde guardar los resultados")
+    args = parser.parse_args()
+
+    resultados = {}
+    for nombre, crear in CASOS.items():
+        corridas = [medir(crear) for _ in range(args.repeticiones)]
+        resultados[nombre] = {
+            clave: min(corrida[clave] for corrida in corridas)
+            for clave in ("importar", "crear_karel", "primer_frame")
+        }
+        resultados[nombre]["cargados"] = corridas[-1]["cargados"]
+        r = resultados[nombre]
+        print(f"{nombre:22s} importar {r['importar'] * 1000:8.1f} ms  "
+              f"crear {r['crear_karel'] * 1000:8.1f} ms  "
+              f"primer frame {r['primer_frame'] * 1000:8.1f} ms  {r['cargados']}")
+
+    if args.salida:
+        with open(args.salida, "w") as archivo:
+            json.dump(resultados, archivo, indent=2)
+
+
+if __name__ == "__main__":
+    main()
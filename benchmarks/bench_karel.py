@@ -0,0 +1,171 @@
+"""
+Suite de benchmarks de pykarel_web.
+
+Mide, para cada mundo predefinido:
+  - acciones por segundo de avanzar/girar_izquierda/poner_coso en cada modo
+    de render,
+  - la latencia de dibujar un frame con cada renderizador,
+  - cuánta memoria ocupan los frames guardados en ejecuciones largas,
+  - el tamaño en bytes del HTML de mostrar_animacion y ejecutar_acciones.
+
+Los resultados se guardan en JSON para comparar versiones con
+``benchmarks/comparar.py``.
+
+Uso:
+    python benchmarks/bench_karel.py [--rapido] [--salida resultados.json]
+"""
+import argparse
+import json
+import os
+import platform
+import sys
+import time
+import tracemalloc
+from unittest import mock
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import pykarel_web  # noqa: E402
+from pykarel_web import Karel  # noqa: E402
+from pykarel_web.version import __version__  # noqa: E402
+
+MUNDOS = ["default", "obstaculos", "laberinto", "laberinto_complejo", "cosos", "complejo", "recta"]
+
+
+def _recorrer(karel, pasos):
+    """Programa que funciona en cualquier mundo: avanza si puede, si no gira"""
+    for _ in range(pasos):
+        if karel.frente_abierto():
+            karel.avanzar()
+        else:
+            karel.girar_izquierda()
+
+
+def _cronometrar(funcion, repeticiones):
+    mejor = float("inf")
+    for _ in range(repeticiones):
+        inicio = time.perf_counter()
+        funcion()
+        mejor = min(mejor, time.perf_counter() - inicio)
+    return mejor
+
+
+def bench_acciones(mundo, pasos, repeticiones, modos):
+    """Acciones por segundo de cada acción en cada modo de render"""
+    resultados = {}
+    for modo, opciones in modos.items():
+        n = pasos[modo]
+
+        def recorrer():
+            _recorrer(Karel(mundo, **opciones), n)
+
+        def girar():
+            karel = Karel(mundo, **opciones)
+            for _ in range(n):
+                karel.girar_izquierda()
+
+        def poner():
+            karel = Karel(mundo, cosos_iniciales=n, **opciones)
+            for _ in range(n):
+                karel.poner_coso()
+
+        resultados[modo] = {
+            "avanzar_o_girar": n / _cronometrar(recorrer, repeticiones),
+            "girar_izquierda": n / _cronometrar(girar, repeticiones),
+            "poner_coso": n / _cronometrar(poner, repeticiones),
+        }
+    return resultados
+
+
+def bench_render(mundo, frames, repeticiones):
+    """Milisegundos por frame de cada renderizador (con el fondo ya en caché)"""
+    resultados = {}
+    for nombre in ("numpy", "matplotlib"):
+        karel = Karel(mundo, renderizador=nombre)
+        estado = (karel.x, karel.y, karel.direction, dict(karel.beepers), karel.mundo)
+        karel._render(*estado, 0)  # Construye el fondo
+
+        def dibujar():
+            for paso in range(frames):
+                karel._render(*estado, paso)
+
+        resultados[nombre] = _cronometrar(dibujar, repeticiones) / frames * 1000
+    return resultados
+
+
+def bench_memoria(mundo, pasos):
+    """Bytes que ocupan los frames guardados tras una ejecución larga"""
+    resultados = {}
+    for almacen in ("completo", "deltas"):
+        tracemalloc.start()
+        karel = Karel(mundo, renderizador="numpy", almacen_frames=almacen)
+        _recorrer(karel, pasos)
+        _, pico = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+        resultados[almacen] = {
+            "frames": len(karel.images),
+            "bytes_frames": karel.images.estadisticas()["bytes"],
+            "pico_tracemalloc": pico,
+        }
+    return resultados
+
+
+def bench_html(mundo, pasos):
+    """Bytes del HTML que se envía al navegador para mostrar una ejecución"""
+    karel = Karel(mundo, renderizador="numpy", modo_render="diferido")
+    _recorrer(karel, pasos)
+    capturado = []
+    with mock.patch.object(pykarel_web, "_mostrar_html", capturado.append):
+        karel.mostrar_animacion()
+        karel.mostrar_animacion(transporte="traza")
+        karel.ejecutar_acciones()
+    animacion, traza, acciones = (len(html.encode("utf-8")) for html in capturado)
+    return {"mostrar_animacion": animacion, "mostrar_animacion_traza": traza, "ejecutar_acciones": acciones}
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--rapido", action="store_true", help="Menos pasos y repeticiones")
+    parser.add_argument("--salida", help="Archivo JSON donde guardar los resultados")
+    parser.add_argument("--mundos", nargs="*", default=MUNDOS)
+    args = parser.parse_args()
+
+    escala = 1 if args.rapido else 5
+    repeticiones = 2 if args.rapido else 5
+    modos = {
+        "ninguno": {"modo_render": "ninguno"},
+        "diferido": {"modo_render": "diferido"},
+        "inmediato_numpy": {"modo_render": "inmediato", "renderizador": "numpy"},
+        "inmediato_matplotlib": {"modo_render": "inmediato", "renderizador": "matplotlib"},
+    }
+    pasos = {"ninguno": 2000 * escala, "diferido": 2000 * escala,
+             "inmediato_numpy": 20 * escala, "inmediato_matplotlib": 4 * escala}
+
+    resultados = {
+        "version": __version__,
+        "python": platform.python_version(),
+        "plataforma": platform.platform(),
+        "fecha": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        "mundos": {},
+    }
+    for mundo in args.mundos:
+        print(f"== {mundo}", flush=True)
+        r = resultados["mundos"][mundo] = {
+            "acciones_por_segundo": bench_acciones(mundo, pasos, repeticiones, modos),
+            "ms_por_frame": bench_render(mundo, 2 * escala, repeticiones),
+            "memoria_frames": bench_memoria(mundo, 40 * escala),
+            "bytes_html": bench_html(mundo, 40 * escala),
+        }
+        for modo, valores in r["acciones_por_segundo"].items():
+            print(f"   {modo:22s} " + "  ".join(f"{k} {v:12.0f}/s" for k, v in valores.items()))
+        print("   ms/frame " + "  ".join(f"{k} {v:.1f}" for k, v in r["ms_por_frame"].items()))
+        print("   frames   " + "  ".join(f"{k} {v['bytes_frames']} B" for k, v in r["memoria_frames"].items()))
+        print("   html     " + "  ".join(f"{k} {v} B" for k, v in r["bytes_html"].items()))
+
+    if args.salida:
+        with open(args.salida, "w") as archivo:
+            json.dump(resultados, archivo, indent=2)
+
+
+if __name__ == "__main__":
+    main()
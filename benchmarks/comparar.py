@@ -0,0 +1,54 @@
+"""
+Compara dos archivos de resultados de ``bench_karel.py``.
+
+Imprime la razón nuevo/base de cada métrica y marca las regresiones que
+superan el umbral (por defecto 10%). Devuelve código 1 si hay regresiones.
+
+Uso:
+    python benchmarks/comparar.py base.json nuevo.json [--umbral 0.1]
+"""
+import argparse
+import json
+import sys
+
+# Métricas donde un valor mayor es mejor; en las demás, menor es mejor
+MAYOR_ES_MEJOR = ("acciones_por_segundo",)
+
+
+def _aplanar(datos, prefijo=""):
+    for clave, valor in datos.items():
+        ruta = f"{prefijo}.{clave}" if prefijo else clave
+        if isinstance(valor, dict):
+            yield from _aplanar(valor, ruta)
+        elif isinstance(valor, (int, float)):
+            yield ruta, valor
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("base")
+    parser.add_argument("nuevo")
+    parser.add_argument("--umbral", type=float, default=0.1)
+    args = parser.parse_args()
+
+    with open(args.base) as archivo:
+        base = dict(_aplanar(json.load(archivo)["mundos"]))
+    with open(args.nuevo) as archivo:
+        nuevo = dict(_aplanar(json.load(archivo)["mundos"]))
+
+    regresiones = 0
+    for ruta in sorted(base.keys() & nuevo.keys()):
+        if base[ruta] == 0:
+            continue
+        razon = nuevo[ruta] / base[ruta]
+        mejor_si_sube = any(metrica in ruta for metrica in MAYOR_ES_MEJOR)
+        peor = razon < 1 - args.umbral if mejor_si_sube else razon > 1 + args.umbral
+        regresiones += peor
+        print(f"{'!!' if peor else '  '} {ruta:75s} {base[ruta]:14.3f} -> {nuevo[ruta]:14.3f}  x{razon:.2f}")
+
+    print(f"\n{regresiones} regresiones por encima de {args.umbral:.0%}")
+    sys.exit(1 if regresiones else 0)
+
+
+if __name__ == "__main__":
+    main()
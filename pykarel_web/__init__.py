@@ -1,14 +1,50 @@
 # pykarel_web/__init__.py
-from IPython.display import display, HTML
-import matplotlib.pyplot as plt
-from io import BytesIO
-import base64
-import numpy as np
+import threading
+from collections import namedtuple
+from contextlib import nullcontext
+
+from .analisis import AnalisisMundo, analizar
+from .asincrono import TrabajadorRender
+from .compilador import ProgramaCompilado, compilar
+from .enjambre import Enjambre
+from .render import (ANCHO_MINIATURA, CALIDADES, Renderizador, RenderizadorMatplotlib, RenderizadorNumpy,
+                     crear_renderizador)
+from . import exportar as _exportar
+from .frames import AlmacenFrames
+from .generador import MUNDOS_PREDEFINIDOS, cosos_iniciales, generar_mundo, obtener_mundo
+from .grabacion import (AVANZAR, CAMBIAR_MUNDO, COLOCAR_COSOS, GIRAR_IZQUIERDA, INICIO, JUNTAR_COSO, PONER_COSO,
+                        Grabacion)
+from .lote import ResultadoEjecucion, ejecutar_lote, ejecutar_programa
+from .mundo import MOVIMIENTOS, Mundo, VistaBeepers
+from .perfil import Perfilador, medir
+from .visor import datos_traza, html_animacion, html_animacion_traza, html_paginador
+
+
+_SIN_CERROJO = nullcontext()
+
 
 class KarelError(Exception):
     """Clase personalizada para errores de Karel"""
     pass
 
+class LimitePasosExcedido(KarelError):
+    """Karel realizó más acciones que las permitidas por ``max_pasos``"""
+    pass
+
+
+Instantanea = namedtuple("Instantanea", ["x", "y", "direccion", "cosos", "paso", "mundo", "marca", "traza"])
+Instantanea.__doc__ = """Estado de un Karel guardado con ``Karel.instantanea()``.
+
+Solo guarda referencias y contadores: el mundo se recupera deshaciendo los
+cambios anotados en su diario y la traza se recorta a ``traza`` pasos.
+"""
+
+
+def _mostrar_html(html):
+    """Muestra HTML en el notebook; IPython solo se importa al mostrar algo."""
+    from IPython.display import display, HTML
+    display(HTML(html))
+
 class Karel:
     """
     Karel es un robot virtual que puede moverse en un mundo de cuadrícula.
@@ -18,8 +54,10 @@ class Karel:
     
     Parámetros:
     -----------
-    mundo : str o list
-        Tipo de mundo predefinido o matriz personalizada
+    mundo : str, dict, list o Mundo
+        Tipo de mundo predefinido, parámetros de ``generar_mundo`` (por
+        ejemplo ``{"generador": "laberinto", "ancho": 101, "alto": 101,
+        "semilla": 7}``), matriz personalizada o un Mundo (se copia con sus cosos)
     x_inicial : int
         Posición inicial de Karel en el eje X (comienza en 0)
     y_inicial : int
@@ -28,244 +66,299 @@ class Karel:
         Dirección inicial de Karel (0:Este, 1:Norte, 2:Oeste, 3:Sur)
     cosos_iniciales : int
         Cantidad inicial de cosos que lleva Karel
+    modo_render : str
+        "inmediato" dibuja un frame en cada acción; "diferido" solo guarda
+        el estado de cada paso y dibuja los frames cuando se muestran;
+        "asincrono" los dibuja en segundo plano (un hilo, o una tarea de
+        asyncio en Pyodide) y ``await karel.flush()`` espera a que terminen;
+        "ninguno" no guarda frames (ejecución rápida para calificar)
+    renderizador : str o Renderizador
+        "matplotlib" (por defecto), "numpy" o una instancia de Renderizador
+    calidad : str
+        Tamaño de los frames según dónde se muestran (ver ``CALIDADES``):
+        "animacion" (por defecto, unos 500 píxeles de ancho), "miniatura"
+        o "exportar"; los mundos grandes reciben más píxeles. No se usa si
+        ``renderizador`` es una instancia
+    max_pasos : int o None
+        Número máximo de acciones; al superarlo se lanza LimitePasosExcedido
+    almacen_frames : str
+        "completo" guarda cada PNG (los repetidos una sola vez); "deltas"
+        guarda solo los bloques que cambian entre pasos y reconstruye el PNG
+        al mostrarlo
+    perfilar : bool
+        Registra el tiempo de cada acción y de cada fase del render (ver
+        ``activar_perfilado``)
+    grabar : bool
+        Guarda cada acción en ``self.grabacion`` (una Grabacion que se puede
+        guardar en disco y reproducir)
     """
-    
-    def __init__(self, mundo="default", x_inicial=0, y_inicial=0, direccion_inicial=0, cosos_iniciales=0):
+
+    MODOS_RENDER = ("inmediato", "diferido", "asincrono", "ninguno")
+    ACCIONES = ("avanzar", "girar_izquierda", "girar_derecha", "poner_coso", "juntar_coso",
+                "colocar_cosos_en_posicion", "crear_mundo_personalizado")
+    CONDICIONES = ("frente_abierto", "frente_bloqueado", "izquierda_abierta", "derecha_abierta",
+                   "hay_coso", "contar_cosos")
+
+    def __init__(self, mundo="default", x_inicial=0, y_inicial=0, direccion_inicial=0, cosos_iniciales=0,
+                 modo_render="inmediato", renderizador="matplotlib", max_pasos=None, almacen_frames="completo",
+                 perfilar=False, grabar=False, calidad="animacion"):
+        if modo_render not in self.MODOS_RENDER:
+            raise KarelError(f"Modo de render desconocido: {modo_render}")
+        if almacen_frames not in ("completo", "deltas"):
+            raise KarelError(f"Almacén de frames desconocido: {almacen_frames}")
+        try:
+            renderizador = crear_renderizador(renderizador, calidad)
+        except ValueError as e:
+            raise KarelError(str(e)) from None
         self.mundo = self._crear_mundo(mundo)
         self._validar_posicion_inicial(x_inicial, y_inicial)
+        if direccion_inicial not in (0, 1, 2, 3):
+            raise KarelError("La dirección inicial debe estar entre 0 y 3")
         
         self.x = x_inicial
         self.y = y_inicial
         self.direction = direccion_inicial
-        self.beepers = self._inicializar_beepers()
+        self._vista_beepers = VistaBeepers(self.mundo)
+        if not isinstance(mundo, (dict, Mundo)):
+            self.beepers = self._inicializar_beepers()  # Los mundos generados o copiados traen sus propios cosos
         self.cosos = cosos_iniciales
         self.step = 0
-        self.images = []
-        self._render()
+        self.modo_render = modo_render
+        self.max_pasos = max_pasos
+        self._renderizador = renderizador
+        self._images = AlmacenFrames(deltas=almacen_frames == "deltas")
+        self._traza = []  # Instantáneas (x, y, dirección, paso, cambio, mundo) de cada paso
+        self._dibujados = 0  # Instantáneas de la traza que ya tienen frame
+        # En modo asíncrono el renderizador y los frames se comparten con el trabajador
+        self._cerrojo = threading.RLock() if modo_render == "asincrono" else _SIN_CERROJO
+        self._trabajador = (TrabajadorRender(self._materializar, self._pendientes)
+                            if modo_render == "asincrono" else None)
+        self._beepers_iniciales = dict(self.beepers)  # Cosos antes de la primera instantánea
+        self._beepers_frame = dict(self.beepers)  # Cosos en el último frame dibujado
+        self.perfilador = None
+        if perfilar:
+            self.activar_perfilado()
+        self.grabacion = Grabacion(self.beepers, self.step) if grabar else None
+        self._analisis = None  # (clave del mundo, AnalisisMundo)
+        # El primer frame se dibuja con la primera acción o al mostrarlo, así
+        # crear a Karel no carga matplotlib
+        self._registrar_paso(INICIO, dibujar=False)
+        self._parametros_iniciales = (mundo, x_inicial, y_inicial, direccion_inicial, cosos_iniciales)
+        # La instantánea inicial copia el mundo: vive tanto como Karel y una
+        # marca del diario obligaría a anotar cada cambio para siempre
+        self._inicial = self.instantanea()._replace(marca=self.mundo.marca(copia=True))
+
+    def activar_perfilado(self, perfilador=None):
+        """
+        Empieza a medir cada acción, condición, fase del render y display.
+
+        Devuelve el Perfilador (uno nuevo si no se pasa ninguno); su método
+        ``resumen()`` da los tiempos por fase y ``agregar_callback`` permite
+        recibir cada medición. Mientras está desactivado no hay costo extra.
+        """
+        self.desactivar_perfilado()
+        self.perfilador = perfilador if perfilador is not None else Perfilador()
+        self._renderizador.perfilador = self.perfilador
+        for nombre in self.ACCIONES:
+            setattr(self, nombre, self._medida(f"accion.{nombre}", getattr(type(self), nombre)))
+        for nombre in self.CONDICIONES:
+            setattr(self, nombre, self._medida(f"condicion.{nombre}", getattr(type(self), nombre)))
+        return self.perfilador
+
+    def desactivar_perfilado(self):
+        """Deja de medir y devuelve el Perfilador con las mediciones acumuladas."""
+        perfilador = self.perfilador
+        for nombre in self.ACCIONES + self.CONDICIONES:
+            self.__dict__.pop(nombre, None)
+        self._renderizador.perfilador = None
+        self.perfilador = None
+        return perfilador
+
+    def _medida(self, fase, metodo):
+        """Envuelve un método para registrar su tiempo en ``fase``."""
+        perfilador = self.perfilador
+
+        def envoltura(*args, **kwargs):
+            with perfilador.medir(fase):
+                return metodo(self, *args, **kwargs)
+        envoltura.__name__ = metodo.__name__
+        envoltura.__doc__ = metodo.__doc__
+        return envoltura
+
+    def perfil(self):
+        """Devuelve el resumen de tiempos por fase (vacío si el perfilado no está activo)."""
+        return self.perfilador.resumen() if self.perfilador is not None else {}
+
+    def _mostrar(self, html):
+        with medir(self.perfilador, "mostrar"):
+            _mostrar_html(html)
+
+    @property
+    def beepers(self):
+        """Cosos del mundo como diccionario {(x, y): cantidad}."""
+        return self._vista_beepers
+
+    @beepers.setter
+    def beepers(self, valor):
+        for x, y in list(self.mundo.posiciones_con_cosos()):
+            self.mundo.fijar_cosos(x, y, 0)
+        for (x, y), cantidad in valor.items():
+            self.mundo.fijar_cosos(x, y, cantidad)
+
+    @property
+    def images(self):
+        """Frames en base64; en modo diferido se dibujan al consultarlos."""
+        self._materializar()
+        return self._images
+
+    @images.setter
+    def images(self, valor):
+        self._dibujados = len(self._traza)
+        self._beepers_frame = dict(self.beepers)
+        self._images = valor if isinstance(valor, AlmacenFrames) else AlmacenFrames.desde_lista(valor)
+
+    def _verificar_pasos(self):
+        """Lanza LimitePasosExcedido si ya no quedan pasos; se llama antes de cambiar el estado"""
+        if self.max_pasos is not None and self.step > self.max_pasos:
+            raise LimitePasosExcedido(f"¡Karel superó el límite de {self.max_pasos} pasos!")
+
+    def _registrar_paso(self, operacion, cambio=None, dibujar=True):
+        """Guarda el estado del paso actual y lo dibuja si el modo es inmediato.
+
+        ``operacion`` es el código de la acción (ver ``grabacion``);
+        ``cambio`` es ``((x, y), cantidad)`` cuando la acción modificó los
+        cosos de una celda; con ``dibujar=False`` el frame queda pendiente.
+        """
+        if self.grabacion is not None:
+            self.grabacion.registrar(operacion, self.x, self.y, self.direction, self.cosos, cambio, self.mundo)
+        if self.modo_render == "ninguno":
+            self.step += 1
+            return
+        self._traza.append((self.x, self.y, self.direction, self.step, cambio, self.mundo))
+        self.step += 1
+        if not dibujar:
+            return
+        if self.modo_render == "inmediato":
+            self._materializar()
+        elif self._trabajador is not None:
+            self._trabajador.notificar()
+
+    def _pendientes(self):
+        return len(self._traza) - self._dibujados
+
+    def _materializar(self, limite=None):
+        """Dibuja en orden las instantáneas pendientes (a lo sumo ``limite``)."""
+        with self._cerrojo:
+            fin = len(self._traza) if limite is None else min(len(self._traza), self._dibujados + limite)
+            for i in range(self._dibujados, fin):
+                x, y, direccion, paso, cambio, mundo = self._traza[i]
+                if cambio is not None:
+                    posicion, cantidad = cambio
+                    self._beepers_frame[posicion] = cantidad
+                # Sin número de paso en el título (lo muestran los visores): los
+                # estados repetidos dan el mismo PNG y el almacén lo guarda una vez
+                rgb = self._renderizador.renderizar_rgb(x, y, direccion, self._beepers_frame, mundo, None)
+                frame = None if self._images.deltas else self._renderizador.codificar(rgb)
+                # Se cuenta como dibujada solo si todo salió bien: si el render
+                # falla, frames y traza siguen alineados
+                self._images.append(rgb if frame is None else frame)
+                self._dibujados = i + 1
+
+    async def flush(self):
+        """
+        Espera a que estén dibujados todos los frames: ``await karel.flush()``.
+
+        En modo "asincrono" cede el control mientras el trabajador termina y
+        relanza el primer error que haya tenido; en los demás modos dibuja
+        lo pendiente.
+        """
+        if self._trabajador is not None:
+            await self._trabajador.flush()
+        elif self.modo_render != "ninguno":
+            self._materializar()
 
     def _validar_posicion_inicial(self, x, y):
         """Valida que la posición inicial no esté en un obstáculo"""
-        if not (0 <= x < len(self.mundo[0]) and 0 <= y < len(self.mundo)):
+        if not self.mundo.dentro(x, y):
             raise KarelError("Posición inicial fuera del mundo")
-        if self.mundo[y][x] == 1:
+        if self.mundo.es_pared(x, y):
             raise KarelError("Karel no puede iniciar en un obstáculo")
 
     def _crear_mundo(self, tipo):
-        """Crea la matriz del mundo con mejor visualización"""
-        if isinstance(tipo, list):
-            return tipo  # Permite mundos personalizados
-        
-        mundos = {
-            "default": [
-                [0,0,0,0,0],
-                [0,0,0,0,0],
-                [0,0,0,0,0],
-                [0,0,0,0,0],
-                [0,0,0,0,0]
-            ],
-            "obstaculos": [
-                [0,1,0,1,0],
-                [1,0,1,0,1],
-                [0,1,0,1,0],
-                [1,0,1,0,1],
-                [0,1,0,1,0]
-            ],
-            "laberinto": [
-                [0,1,0,0,0],
-                [0,1,1,1,0],
-                [0,0,0,1,0],
-                [1,1,0,1,0],
-                [0,0,0,1,0]
-            ],
-            "laberinto_complejo": [
-                [0,0,1,1,1,1,1,1,1,1,1,1,1,1,1],
-                [1,0,0,0,0,0,0,0,0,0,1,0,0,0,1],
-                [1,1,1,1,1,1,1,1,1,0,1,0,1,0,1],
-                [1,0,0,0,0,0,0,0,0,0,1,0,1,0,1],
-                [1,0,1,1,1,1,1,1,1,1,1,0,1,0,1],
-                [1,0,1,0,0,0,0,0,0,0,0,0,1,0,1],
-                [1,0,1,0,1,1,1,1,1,1,1,1,1,0,1],
-                [1,0,1,0,1,0,0,0,0,0,0,0,0,0,1],
-                [1,0,1,0,1,0,1,1,1,1,1,1,1,1,1],
-                [1,0,1,0,1,0,0,0,0,0,1,0,0,0,1],
-                [1,0,1,0,1,1,1,1,1,0,1,0,1,0,1],
-                [1,0,1,0,0,0,0,0,1,0,1,0,1,0,1],
-                [1,0,1,1,1,1,1,0,1,0,1,0,1,0,1],
-                [1,0,0,0,0,0,0,0,1,0,0,0,1,0,0],
-                [1,1,1,1,1,1,1,1,1,1,1,1,1,1,0]
-        ],
-            "cosos": [
-                [0,2,0,3,0],
-                [1,0,4,0,5],
-                [0,6,0,7,0],
-                [8,0,9,0,10],
-                [0,11,0,12,0]
-            ],
-            "complejo": [
-                [0,1,0,1,0,1],
-                [1,0,1,0,1,0],
-                [0,1,0,1,0,1],
-                [1,0,1,0,1,0],
-                [0,1,0,1,0,1],
-                [1,0,1,0,1,0]
-            ],
-            "recta": [
-                [0,0,0,0,0,0,0,0,0,0,0,0,0,0,0,0,0,0,0,0],
-                [0,1,1,1,1,1,1,1,1,1,1,1,1,1,1,1,1,1,1,0],
-                [0,0,0,0,0,0,0,0,0,0,0,0,0,0,0,0,0,0,0,0]
-            ]
-        }
-        return mundos.get(tipo, mundos["default"])
+        """Crea el mundo a partir de un nombre predefinido, parámetros de generación, una matriz o un Mundo"""
+        if isinstance(tipo, Mundo):
+            return tipo.copia()
+        if isinstance(tipo, (str, dict)):
+            try:
+                return obtener_mundo(tipo)
+            except (TypeError, ValueError) as e:
+                raise KarelError(f"No se pudo generar el mundo: {e}") from None
+        return Mundo(tipo)  # Permite mundos personalizados
     
     def _inicializar_beepers(self):
         """Inicializa cosos en posiciones específicas para algunos mundos"""
-        if isinstance(self.mundo, list) and len(self.mundo) == 15 and len(self.mundo[0]) == 15:
-            # This is likely our complex maze
-            return {(14, 14): 1}  # Exit point with a coso
-        
-        return {
-            (2, 2): 5,
-            (3, 4): 3,
-            (0, 0): 1
-        }
+        return cosos_iniciales(self.mundo)
 
-    def _render(self):
-        """Renderiza el mundo con mejoras visuales"""
-        fig, ax = plt.subplots(figsize=(10, 10))  # Increased figure size
-        
-        # Dibujar cuadrícula
-        for x in range(len(self.mundo[0])+1):
-            ax.axvline(x, color='gray', linestyle=':', linewidth=0.5)
-        for y in range(len(self.mundo)+1):
-            ax.axhline(y, color='gray', linestyle=':', linewidth=0.5)
-        
-        # Dibujar obstáculos
-        for y in range(len(self.mundo)):
-            for x in range(len(self.mundo[0])):
-                if self.mundo[y][x] == 1:
-                    ax.add_patch(plt.Rectangle(
-                        (x, y), 1, 1, 
-                        color='#2c3e50', 
-                        hatch='//', 
-                        alpha=0.7
-                    ))
-        
-        # Dibujar cosos/zumbadores
-        for (x, y), cantidad in self.beepers.items():
-            if cantidad > 0:
-                ax.plot(x + 0.5, y + 0.5, 'ro', markersize=18, alpha=0.5)  # Increased marker size
-                ax.text(x + 0.5, y + 0.5, str(cantidad), 
-                       ha='center', va='center', 
-                       color='white', weight='bold',
-                       fontsize=12)  # Increased font size
-        
-        # Dibujar Karel
-        colores = ['#e74c3c', '#2980b9', '#27ae60', '#f1c40f']
-        arrow = ['→', '↑', '←', '↓']
-        ax.text(
-            self.x + 0.5, self.y + 0.5, 
-            arrow[self.direction],
-            fontsize=60,  # Increased font size
-            color=colores[self.direction],
-            ha='center', 
-            va='center',
-            fontweight='bold'
-        )
-        
-        # Configuración del gráfico con coordenadas
-        ax.set_xlim(-0.5, len(self.mundo[0])-0.5)
-        ax.set_ylim(-0.5, len(self.mundo)-0.5)
-        
-        # Add coordinate labels
-        x_ticks = range(len(self.mundo[0]))
-        y_ticks = range(len(self.mundo))
-        ax.set_xticks(x_ticks)
-        ax.set_yticks(y_ticks)
-        ax.set_xticklabels([str(i) for i in x_ticks], fontsize=12)  # Increased font size
-        ax.set_yticklabels([str(i) for i in y_ticks], fontsize=12)  # Increased font size
-        
-        # Add labels for axes
-        ax.set_xlabel('X Coordinates', fontsize=14, labelpad=10)  # Increased font size
-        ax.set_ylabel('Y Coordinates', fontsize=14, labelpad=10)  # Increased font size
-        
-        # Additional formatting
-        ax.grid(True, linestyle=':', alpha=0.6)
-        ax.set_title(f"Karel - Paso {self.step}", fontweight='bold', pad=20, fontsize=16)  # Increased font size
-        ax.set_aspect('equal')
-        
-        # Guardar imagen
-        buf = BytesIO()
-        plt.savefig(buf, format='png', dpi=100)  # Increased DPI
-        plt.close()
-        self.images.append(base64.b64encode(buf.getvalue()).decode('utf-8'))
-        self.step += 1
+    def _ultimo_frame(self):
+        """Devuelve el frame del último paso sin dibujar los pasos pendientes anteriores."""
+        with self._cerrojo:
+            if self._dibujados == len(self._traza):
+                return self._images[-1] if self._images else None
+            x, y, direccion, paso, _, mundo = self._traza[-1]
+            return self._render(x, y, direccion, self.beepers, mundo, paso)
+
+    def _render(self, karel_x, karel_y, direccion, beepers, mundo, paso):
+        """Renderiza un estado del mundo y lo devuelve en base64"""
+        return self._renderizador.renderizar(karel_x, karel_y, direccion, beepers, mundo, paso)
 
     def avanzar(self):
         """Mueve a Karel una celda adelante si el camino está despejado"""
         if not self.frente_abierto():
             raise KarelError("¡Choque! No puedes avanzar - Hay un obstáculo")
+        self._verificar_pasos()
         
         # Actualizar posición
-        movimientos = {
-            0: (1, 0),  # Este
-            1: (0, 1),  # Norte
-            2: (-1, 0),  # Oeste
-            3: (0, -1)   # Sur
-        }
-        dx, dy = movimientos[self.direction]
+        dx, dy = MOVIMIENTOS[self.direction]
         self.x += dx
         self.y += dy
         
         # Verificar posición válida
-        if not (0 <= self.x < len(self.mundo[0])) or not (0 <= self.y < len(self.mundo)):
+        if not self.mundo.dentro(self.x, self.y):
             raise KarelError("¡Karel se salió del mundo!")
         
-        self._render()
+        self._registrar_paso(AVANZAR)
 
     def girar_izquierda(self):
         """Gira a Karel 90 grados a la izquierda"""
+        self._verificar_pasos()
         self.direction = (self.direction + 1) % 4
-        self._render()
+        self._registrar_paso(GIRAR_IZQUIERDA)
 
     def poner_coso(self):
         """Coloca un coso en la posición actual"""
         if self.cosos <= 0:
             raise KarelError("¡No tienes cosos para poner!")
+        self._verificar_pasos()
         
         self.cosos -= 1
-        self.beepers[(self.x, self.y)] = self.beepers.get((self.x, self.y), 0) + 1
-        self._render()
+        cantidad = self.mundo.cosos(self.x, self.y) + 1
+        self.mundo.fijar_cosos(self.x, self.y, cantidad)
+        self._registrar_paso(PONER_COSO, ((self.x, self.y), cantidad))
 
     def juntar_coso(self):
         """Recoge un coso de la posición actual"""
-        if self.beepers.get((self.x, self.y), 0) < 1:
+        cantidad = self.mundo.cosos(self.x, self.y)
+        if cantidad < 1:
             raise KarelError("¡No hay cosos para recoger aquí!")
+        self._verificar_pasos()
         
         self.cosos += 1
-        self.beepers[(self.x, self.y)] -= 1
-        self._render()
+        self.mundo.fijar_cosos(self.x, self.y, cantidad - 1)
+        self._registrar_paso(JUNTAR_COSO, ((self.x, self.y), cantidad - 1))
 
     def frente_abierto(self):
         """Verifica si el frente está despejado"""
-        x, y = self.x, self.y
-        try:
-            dx, dy = {
-                0: (1, 0),   # Este
-                1: (0, 1),   # Norte
-                2: (-1, 0),  # Oeste
-                3: (0, -1)   # Sur
-            }[self.direction]
-            
-            new_x = x + dx
-            new_y = y + dy
-            
-            if new_x < 0 or new_y < 0:
-                return False
-                
-            return self.mundo[new_y][new_x] != 1
-            
-        except IndexError:
-            return False
+        return self.mundo.abierto(self.x, self.y, self.direction)
 
     # Alias para mantener compatibilidad
     def front_is_clear(self):
@@ -274,6 +367,11 @@ class Karel:
     def ejecutar_acciones(self, max_images=8, page=1, show_controls=True):
         """
         Displays Karel's actions with pagination and navigation controls.
+
+        Thumbnails (300px wide) come from the same drawing as each frame
+        and are sent once, one block per page (only the visible one when
+        controls are hidden); pages are switched in the browser, without
+        executing code in the kernel.
         
         Parameters:
         -----------
@@ -284,38 +382,19 @@ class Karel:
         show_controls : bool
             Whether to show pagination controls
         """
-        total_pages = ((len(self.images) - 1) // max_images) + 1
-        
-        # Ensure page is within valid range
-        page = max(1, min(page, total_pages))
-        
-        start = (page - 1) * max_images
-        end = min(start + max_images, len(self.images))
-        
-        # Style for individual images
-        img_style = "margin:5px; width:300px; border:1px solid #ddd; border-radius:5px;"
-        
-        # Create HTML for images
-        html = "<div style='display:flex; flex-wrap:wrap; justify-content:center;'>"
-        for img in self.images[start:end]:
-            html += f"<img src='data:image/png;base64,{img}' style='{img_style}'>"
-        html += "</div>"
-        
-        # Add pagination info and controls if needed
-        if show_controls and total_pages > 1:
-            html += f"""
-            <div style='text-align:center; margin-top:10px;'>
-                <span style='margin:0 10px;'>Página {page} de {total_pages}</span>
-                <div style='margin-top:5px;'>
-                    <button onclick='IPython.notebook.kernel.execute("_{0} = get_ipython().user_ns[\\"{0}\\"]; _{0}.ejecutar_acciones({max_images}, {max(1, page-1)})")' style='padding:5px 10px; margin:0 5px;'>« Anterior</button>
-                    <button onclick='IPython.notebook.kernel.execute("_{0} = get_ipython().user_ns[\\"{0}\\"]; _{0}.ejecutar_acciones({max_images}, {min(total_pages, page+1)})")' style='padding:5px 10px; margin:0 5px;'>Siguiente »</button>
-                </div>
-            </div>
-            """.format(id(self))
-        elif total_pages > 0:
-            html += f"<div style='text-align:center; margin-top:10px;'>Página {page} de {total_pages}</div>"
-        
-        display(HTML(html))
+        miniaturas, indices = self._miniaturas()
+        self._mostrar(html_paginador(miniaturas, max_images, page, show_controls, indices=indices))
+
+    def _miniaturas(self):
+        """
+        Devuelve (miniaturas únicas en base64, índice de cada paso). Se
+        calculan recién aquí, una vez por frame distinto, y quedan guardadas
+        en el almacén de frames.
+        """
+        with self._cerrojo:
+            self._materializar()
+            with medir(self.perfilador, "render.miniatura"):
+                return self._images.miniaturas(ANCHO_MINIATURA)
     
     def girar_derecha(self):
         """Gira Karel 90 grados a la derecha."""
@@ -325,27 +404,15 @@ class Karel:
     
     def hay_coso(self):
         """Verifica si hay un coso/zumbador en la posición actual."""
-        return self.beepers.get((self.x, self.y), 0) > 0
+        return self.mundo.cosos(self.x, self.y) > 0
     
     def izquierda_abierta(self):
         """Verifica si el camino a la izquierda está libre."""
-        # Guardar dirección actual
-        dir_actual = self.direction
-        self.direction = (self.direction + 1) % 4
-        resultado = self.frente_abierto()
-        # Restaurar dirección
-        self.direction = dir_actual
-        return resultado
+        return self.mundo.abierto(self.x, self.y, (self.direction + 1) % 4)
     
     def derecha_abierta(self):
         """Verifica si el camino a la derecha está libre."""
-        # Guardar dirección actual
-        dir_actual = self.direction
-        self.direction = (self.direction - 1) % 4
-        resultado = self.frente_abierto()
-        # Restaurar dirección
-        self.direction = dir_actual
-        return resultado
+        return self.mundo.abierto(self.x, self.y, (self.direction + 3) % 4)
     
     def frente_bloqueado(self):
         """Verifica si el frente está bloqueado."""
@@ -353,29 +420,215 @@ class Karel:
     
     def contar_cosos(self):
         """Devuelve el número de cosos/zumbadores en la posición actual."""
-        return self.beepers.get((self.x, self.y), 0)
+        return self.mundo.cosos(self.x, self.y)
     
-    def reiniciar(self, mundo="default", x_inicial=0, y_inicial=0, direccion_inicial=0):
-        """Reinicia a Karel a su estado inicial."""
-        self.__init__(mundo, x_inicial, y_inicial, direccion_inicial)
+    def analisis(self):
+        """
+        Devuelve el AnalisisMundo de las paredes actuales: componentes
+        conexas, distancias y caminos más cortos, calculados una vez por mundo.
+        """
+        if self._analisis is None or self._analisis[0] != self.mundo.clave:
+            self._analisis = (self.mundo.clave, analizar(self.mundo))
+        return self._analisis[1]
+
+    def puede_llegar(self, x, y):
+        """Indica si hay un camino libre desde la posición de Karel hasta (x, y); fuera del mundo, no."""
+        if not self.mundo.dentro(x, y):
+            return False
+        return bool(self.analisis().conectados((self.x, self.y), (x, y)))
+
+    def acciones_hasta(self, x, y, direccion_final=None):
+        """
+        Secuencia más corta de "avanzar" y "girar_izquierda" desde la pose
+        actual hasta (x, y), o None si no se puede llegar (también si la
+        celda está fuera del mundo).
+        """
+        if not self.mundo.dentro(x, y):
+            return None
+        return self.analisis().camino_acciones((self.x, self.y), self.direction, (x, y), direccion_final)
+
+    def resumen(self):
+        """Devuelve el estado final de Karel como diccionario (útil para calificar)."""
+        return {
+            "x": self.x,
+            "y": self.y,
+            "direccion": self.direction,
+            "cosos": self.cosos,
+            "pasos": self.step - 1,
+            "beepers": dict(self.beepers.items()),
+        }
+
+    @classmethod
+    def desde_grabacion(cls, grabacion, paso=-1, **opciones):
+        """
+        Crea un Karel en el estado del paso ``paso`` de una grabación.
+
+        El estado se obtiene del estado clave más cercano, sin volver a
+        ejecutar las acciones anteriores. Para obtener la ejecución completa
+        (traza, frames y animación) se crea en el paso 0 y se usa
+        ``grabacion.reproducir(karel)``.
+
+        Parámetros:
+        -----------
+        grabacion : Grabacion o str
+            Grabación o ruta de un archivo escrito con ``Grabacion.guardar``
+        paso : int
+            Índice del paso dentro de la grabación (-1 es el último)
+        opciones :
+            Parámetros adicionales para Karel (modo_render, renderizador, ...)
+        """
+        if not isinstance(grabacion, Grabacion):
+            grabacion = Grabacion.cargar(grabacion)
+        x, y, direccion, cosos, _, beepers, mundo = grabacion.estado(paso)
+        mundo = mundo.copia()
+        for (bx, by), cantidad in beepers.items():
+            mundo.fijar_cosos(bx, by, cantidad)
+        return cls(mundo, x, y, direccion, cosos, **opciones)
+
+    def instantanea(self):
+        """
+        Guarda el estado actual (posición, dirección, cosos, paso, mundo y traza).
+
+        Es O(1): el mundo no se copia, sino que se recuerda la posición en su
+        diario de cambios. Con ``restaurar`` se vuelve a este estado tantas
+        veces como se quiera, por ejemplo para probar varias ramas.
+        """
+        return Instantanea(self.x, self.y, self.direction, self.cosos, self.step,
+                           self.mundo, self.mundo.marca(), len(self._traza))
+
+    def restaurar(self, instantanea):
+        """
+        Vuelve al estado de una instantánea deshaciendo solo lo que cambió desde entonces.
+
+        Los pasos posteriores se quitan de la traza y de los frames. No se
+        puede volver a una instantánea tomada después de un estado que ya se
+        restauró y se modificó.
+        """
+        if instantanea.traza > len(self._traza) or (self.grabacion is not None and
+                                                     instantanea.paso > self.grabacion.paso_inicial + len(self.grabacion)):
+            raise KarelError("La instantánea no pertenece a la historia actual de Karel")
+        try:
+            instantanea.mundo.deshacer_hasta(instantanea.marca)
+        except ValueError:
+            raise KarelError("La instantánea no pertenece a la historia actual de Karel") from None
+        if instantanea.mundo is not self.mundo:
+            self.mundo = instantanea.mundo
+            self._vista_beepers = VistaBeepers(self.mundo)
+
+        self.x, self.y, self.direction = instantanea.x, instantanea.y, instantanea.direccion
+        self.cosos = instantanea.cosos
+        self.step = instantanea.paso
+        if self.grabacion is not None:
+            self.grabacion.truncar(instantanea.paso - self.grabacion.paso_inicial)
+        n = instantanea.traza
+        with self._cerrojo:
+            del self._traza[n:]
+            if self._dibujados > n:
+                self._dibujados = n
+                self._images.truncar(n)
+                self._beepers_frame = dict(self.beepers)
+
+    def reiniciar(self, mundo=None, x_inicial=None, y_inicial=None, direccion_inicial=None, cosos_iniciales=None):
+        """
+        Reinicia a Karel a su estado inicial.
+
+        Los parámetros que no se indican conservan el valor con el que se
+        creó a Karel. Si coinciden todos, se restaura la instantánea inicial
+        sin reconstruir el mundo ni volver a dibujar; si no, se crea el mundo
+        de nuevo.
+        """
+        actuales = self._parametros_iniciales
+        nuevos = tuple(actual if nuevo is None else nuevo
+                       for nuevo, actual in zip((mundo, x_inicial, y_inicial, direccion_inicial, cosos_iniciales),
+                                                actuales))
+        if all(nuevo is actual or (isinstance(nuevo, (str, int, dict)) and nuevo == actual)
+               for nuevo, actual in zip(nuevos, actuales)):
+            self.restaurar(self._inicial)
+            return
+
+        if self._trabajador is not None:
+            # El trabajador viejo dibujaría la traza anterior en los frames nuevos
+            self._trabajador.detener()
+        with self._cerrojo:
+            self._renderizador.invalidar()
+        perfilador = self.desactivar_perfilado()
+        self.__init__(*nuevos,
+                      modo_render=self.modo_render, renderizador=self._renderizador,
+                      max_pasos=self.max_pasos,
+                      almacen_frames="deltas" if self._images.deltas else "completo",
+                      grabar=self.grabacion is not None)
+        if perfilador is not None:
+            self.activar_perfilado(perfilador)
     
     def mostrar_ultima_accion(self):
         """Muestra solo la última acción realizada."""
-        if len(self.images) > 0:
-            html = f"<img src='data:image/png;base64,{self.images[-1]}' style='width:300px'>"
-            display(HTML(html))
+        frame = self._ultimo_frame()
+        if frame is not None:
+            html = f"<img src='data:image/png;base64,{frame}' style='width:300px'>"
+            self._mostrar(html)
     
     def colocar_cosos_en_posicion(self, x, y, cantidad=1):
         """Coloca una cantidad de cosos/zumbadores en una posición específica."""
-        self.beepers[(x, y)] = self.beepers.get((x, y), 0) + cantidad
-        self._render()
+        self._verificar_pasos()
+        cantidad = self.mundo.cosos(x, y) + cantidad
+        self.mundo.fijar_cosos(x, y, cantidad)
+        self._registrar_paso(COLOCAR_COSOS, ((x, y), cantidad))
     
     def crear_mundo_personalizado(self, matriz):
-        """Define un mundo personalizado a partir de una matriz."""
-        self.mundo = matriz
-        self._render()
+        """Define un mundo personalizado a partir de una matriz; los cosos se conservan."""
+        self._verificar_pasos()
+        cosos = dict(self.beepers.items())
+        self.mundo = Mundo(matriz)
+        self._vista_beepers = VistaBeepers(self.mundo)
+        self.beepers = cosos
+        with self._cerrojo:
+            self._renderizador.invalidar()
+        self._registrar_paso(CAMBIAR_MUNDO)
     
-    def mostrar_animacion(self, delay=500):
+    def exportar(self, ruta, formato=None, delay=500, saltar=1, renderizador="numpy"):
+        """
+        Exporta la ejecución a un GIF, PNG animado (APNG) o MP4.
+
+        Los frames se dibujan y se escriben uno por uno a partir de la traza,
+        así que no se guardan todos en memoria. Cada frame del GIF y del APNG
+        solo contiene el rectángulo que cambió, con una paleta común en el GIF.
+
+        Parámetros:
+        -----------
+        ruta : str
+            Archivo de salida; el formato se deduce de la extensión
+        formato : str o None
+            "gif", "apng" o "mp4" para ignorar la extensión
+        delay : int
+            Milisegundos entre frames
+        saltar : int
+            Exporta uno de cada ``saltar`` pasos (el último siempre se incluye)
+        renderizador : str o Renderizador
+            Renderizador usado para los frames; por defecto el de NumPy con
+            la calidad "exportar" (unos 1000 píxeles de ancho)
+        """
+        if not self._traza:
+            raise KarelError("No hay acciones para exportar")
+        try:
+            formato = _exportar.formato_de(ruta, formato)
+            renderizador = crear_renderizador(renderizador, "exportar")
+        except ValueError as e:
+            raise KarelError(str(e)) from None
+
+        indices = _exportar.indices_exportados(len(self._traza), saltar)
+        frames = _exportar.iterar_frames(self._traza, self._beepers_iniciales, renderizador, indices)
+        if formato == "gif":
+            with open(ruta, "wb") as archivo:
+                _exportar.escribir_gif(archivo, frames, delay)
+        elif formato == "apng":
+            with open(ruta, "wb") as archivo:
+                _exportar.escribir_apng(archivo, frames, len(indices), delay)
+        elif formato == "mp4":
+            _exportar.escribir_mp4(ruta, frames, delay)
+        else:
+            raise KarelError(f"Formato desconocido: {formato}")
+
+    def mostrar_animacion(self, delay=500, transporte="imagenes"):
         """
         Displays all Karel's actions as an animation.
         
@@ -383,115 +636,26 @@ class Karel:
         -----------
         delay : int
             Delay between frames in milliseconds
+        transporte : str
+            "imagenes" embeds each distinct rendered frame once plus the
+            frame index of every step; "traza" sends the world
+            once plus the per-step states and draws them on a canvas, so the
+            payload grows with the number of steps instead of image bytes
         """
+        if transporte == "traza":
+            if not self._traza:
+                self._mostrar("<p>No hay acciones para mostrar</p>")
+                return
+            self._mostrar(html_animacion_traza(datos_traza(self._traza, self._beepers_iniciales), delay))
+            return
+        if transporte != "imagenes":
+            raise KarelError(f"Transporte desconocido: {transporte}")
         if not self.images:
-            display(HTML("<p>No hay acciones para mostrar</p>"))
+            self._mostrar("<p>No hay acciones para mostrar</p>")
             return
         
-        # Generate unique ID for this animation
-        import random
-        container_id = f"karel_animation_{random.randint(10000, 99999)}"
-        
-        # Create HTML with images and animation controls
-        html = f"""
-        <div id="{container_id}" style="text-align:center;">
-            <img id="{container_id}_img" src="data:image/png;base64,{self.images[0]}" 
-                 style="width:500px; border:1px solid #ddd; border-radius:5px; margin-bottom:10px;">
-            <div style="margin:10px 0;">
-                <button id="{container_id}_prev" style="padding:5px 15px; margin:0 5px;">« Anterior</button>
-                <button id="{container_id}_play" style="padding:5px 15px; margin:0 5px;">▶ Reproducir</button>
-                <button id="{container_id}_pause" style="padding:5px 15px; margin:0 5px; display:none;">⏸ Pausar</button>
-                <button id="{container_id}_next" style="padding:5px 15px; margin:0 5px;">Siguiente »</button>
-            </div>
-            <div style="margin-top:10px;">
-                <span id="{container_id}_counter">Paso 1 de {len(self.images)}</span>
-                <div style="margin-top:10px;">
-                    <label for="{container_id}_speed">Velocidad: </label>
-                    <input type="range" id="{container_id}_speed" min="100" max="2000" value="{delay}" style="width:200px;">
-                </div>
-            </div>
-        </div>
-        
-        <script>
-        (function() {{
-            // Store images in JavaScript - directly use the encoded images
-            const images = {{ {", ".join([f"'{i}': '{img}'" for i, img in enumerate(self.images)])} }};
-            
-            // Animation variables
-            let currentIdx = 0;
-            let animationId = null;
-            let animDelay = {delay};
-            
-            // Get DOM elements
-            const container = document.getElementById("{container_id}");
-            const img = document.getElementById("{container_id}_img");
-            const prevBtn = document.getElementById("{container_id}_prev");
-            const nextBtn = document.getElementById("{container_id}_next");
-            const playBtn = document.getElementById("{container_id}_play");
-            const pauseBtn = document.getElementById("{container_id}_pause");
-            const counter = document.getElementById("{container_id}_counter");
-            const speedControl = document.getElementById("{container_id}_speed");
-            
-            // Update display
-            function updateDisplay() {{
-                img.src = "data:image/png;base64," + images[currentIdx];
-                counter.textContent = `Paso ${{currentIdx + 1}} de {len(self.images)}`;
-            }}
-            
-            // Animation functions
-            function nextFrame() {{
-                currentIdx = (currentIdx + 1) % Object.keys(images).length;
-                updateDisplay();
-            }}
-            
-            function prevFrame() {{
-                currentIdx = (currentIdx - 1 + Object.keys(images).length) % Object.keys(images).length;
-                updateDisplay();
-            }}
-            
-            function startAnimation() {{
-                if (animationId) clearInterval(animationId);
-                animationId = setInterval(nextFrame, animDelay);
-                playBtn.style.display = "none";
-                pauseBtn.style.display = "inline";
-            }}
-            
-            function stopAnimation() {{
-                if (animationId) clearInterval(animationId);
-                animationId = null;
-                playBtn.style.display = "inline";
-                pauseBtn.style.display = "none";
-            }}
-            
-            // Event listeners
-            prevBtn.addEventListener("click", () => {{
-                stopAnimation();
-                prevFrame();
-            }});
-            
-            nextBtn.addEventListener("click", () => {{
-                stopAnimation();
-                nextFrame();
-            }});
-            
-            playBtn.addEventListener("click", startAnimation);
-            pauseBtn.addEventListener("click", stopAnimation);
-            
-            speedControl.addEventListener("change", () => {{
-                animDelay = parseInt(speedControl.value);
-                if (animationId) {{
-                    stopAnimation();
-                    startAnimation();
-                }}
-            }});
-            
-            // Initialize display
-            updateDisplay();
-        }})();
-        </script>
-        """
-        
-        display(HTML(html))
+        unicos, indices = self.images.indexados()  # Cada frame repetido viaja una vez
+        self._mostrar(html_animacion(unicos, delay, indices))
         
 
 # Función de ayuda global
@@ -516,4 +680,4 @@ def help():
         <li><b>hay_coso()</b> - Verifica si hay un coso en la posición actual</li>
     </ul>
     """
-    display(HTML(help_text))
\ No newline at end of file
+    _mostrar_html(help_text)
\ No newline at end of file
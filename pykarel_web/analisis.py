@@ -0,0 +1,276 @@
+# pykarel_web/analisis.py
+import hashlib
+from collections import OrderedDict
+
+import numpy as np
+
+from .mundo import MOVIMIENTOS
+
+NO_ALCANZABLE = -1
+
+# Frentes más chicos que esto se expanden en Python: en pasillos de un
+# laberinto el frente tiene 1 o 2 celdas y llamar a NumPy cuesta más
+FRENTE_MINIMO_NUMPY = 64
+
+
+class AnalisisMundo:
+    """
+    Análisis precalculado de las paredes de un mundo.
+
+    Todo se calcula al pedirlo y se guarda: componentes conexas, campos de
+    distancias BFS desde una celda y el número mínimo de acciones
+    (``avanzar`` y ``girar_izquierda``, cada una cuenta un paso) para llegar
+    a cada celda con cada dirección. Las búsquedas avanzan por frentes con
+    operaciones de NumPy sobre la cuadrícula de paredes con borde, así que
+    el costo por nivel es proporcional al tamaño del frente y no al mundo
+    (los frentes muy chicos, como en los pasillos de un laberinto, se
+    expanden en Python para no pagar el costo fijo de cada llamada).
+
+    Se obtiene con ``analizar(mundo)``, que reutiliza el análisis de
+    cualquier mundo con las mismas paredes. Los cosos no intervienen. Pedir
+    una celda fuera del mundo lanza ValueError.
+
+    Parámetros:
+    -----------
+    mundo : Mundo
+        Mundo a analizar; se copia su cuadrícula de paredes
+    max_campos : int
+        Cuántos campos de distancias (por origen) se guardan
+    """
+
+    def __init__(self, mundo, max_campos=16):
+        self.alto, self.ancho = mundo.alto, mundo.ancho
+        self._fila = self.ancho + 2
+        self._libre = mundo.paredes.reshape(-1) == 0  # Con borde: los vecinos nunca se salen
+        self._desplazamientos_py = tuple(dy * self._fila + dx for dx, dy in MOVIMIENTOS)
+        self._desplazamientos = np.array(self._desplazamientos_py, dtype=np.int64)
+        self._libre_plano = memoryview(self._libre)
+        self.max_campos = max_campos
+        self._campos = OrderedDict()
+        self._componentes = None
+        self._num_componentes = 0
+
+    def _verificar(self, x, y):
+        if not (0 <= x < self.ancho and 0 <= y < self.alto):
+            raise ValueError(f"La celda ({x}, {y}) está fuera del mundo")
+
+    def _plano(self, x, y):
+        self._verificar(x, y)
+        return (y + 1) * self._fila + x + 1
+
+    def _recortar(self, plano):
+        """Quita el borde de un arreglo indexado por celda con borde y lo devuelve como [y, x]"""
+        return plano.reshape(self.alto + 2, self._fila)[1:-1, 1:-1]
+
+    def _guardar(self, clave, valor):
+        self._campos[clave] = valor
+        if len(self._campos) > self.max_campos:
+            self._campos.popitem(last=False)
+        return valor
+
+    # --- Componentes conexas ---
+
+    @property
+    def componentes(self):
+        """Arreglo [y, x] con la etiqueta de componente de cada celda libre (-1 en paredes)"""
+        if self._componentes is None:
+            self._componentes = self._etiquetar()
+        return self._componentes
+
+    @property
+    def num_componentes(self):
+        """Número de componentes conexas de celdas libres"""
+        self.componentes
+        return self._num_componentes
+
+    def _etiquetar(self):
+        libre = self._recortar(self._libre)
+        n = libre.size
+        indices = np.arange(n).reshape(libre.shape)
+        # Aristas entre celdas libres vecinas (horizontales y verticales)
+        h = libre[:, 1:] & libre[:, :-1]
+        v = libre[1:, :] & libre[:-1, :]
+        u = np.concatenate([indices[:, :-1][h], indices[:-1, :][v]])
+        w = np.concatenate([indices[:, 1:][h], indices[1:, :][v]])
+
+        # Enganchar cada raíz a la menor raíz vecina y comprimir caminos
+        padre = np.arange(n)
+        while True:
+            pu, pw = padre[u], padre[w]
+            distintas = pu != pw
+            if not distintas.any():
+                break
+            np.minimum.at(padre, np.maximum(pu, pw)[distintas], np.minimum(pu, pw)[distintas])
+            while True:
+                abuelo = padre[padre]
+                if np.array_equal(abuelo, padre):
+                    break
+                padre = abuelo
+
+        etiquetas = np.full(n, NO_ALCANZABLE, dtype=np.int32)
+        raices, etiquetas[libre.reshape(-1)] = np.unique(padre[libre.reshape(-1)], return_inverse=True)
+        self._num_componentes = len(raices)
+        return etiquetas.reshape(libre.shape)
+
+    def conectados(self, origen, destino):
+        """Indica si hay un camino de celdas libres entre dos celdas (x, y)"""
+        self._verificar(*origen)
+        self._verificar(*destino)
+        a = self.componentes[origen[1], origen[0]]
+        return a != NO_ALCANZABLE and a == self.componentes[destino[1], destino[0]]
+
+    # --- Distancias en celdas ---
+
+    def distancias(self, origen):
+        """
+        Campo de distancias BFS (en celdas) desde ``origen`` = (x, y).
+
+        Devuelve un arreglo int32 [y, x] con -1 en paredes y celdas
+        inalcanzables.
+        """
+        clave = ("celdas", tuple(origen))
+        if clave in self._campos:
+            self._campos.move_to_end(clave)
+            return self._campos[clave]
+
+        inicio = self._plano(*origen)
+        distancia = np.full(self._libre.size, NO_ALCANZABLE, dtype=np.int32)
+        if self._libre[inicio]:
+            self._bfs(distancia, inicio, self._vecinos_celdas, self._vecinos_celda)
+        return self._guardar(clave, self._recortar(distancia))
+
+    def _bfs(self, distancia, inicio, vecinos_frente, vecinos_uno):
+        """
+        Llena ``distancia`` por niveles desde ``inicio``; ``vecinos_frente``
+        expande un arreglo de nodos y ``vecinos_uno`` un solo nodo.
+        """
+        plana = memoryview(distancia)
+        plana[inicio] = 0
+        frente = [inicio]
+        nivel = 0
+        while len(frente):
+            nivel += 1
+            if len(frente) < FRENTE_MINIMO_NUMPY:
+                if not isinstance(frente, list):
+                    frente = frente.tolist()
+                nuevo = []
+                for nodo in frente:
+                    for vecino in vecinos_uno(nodo):
+                        if plana[vecino] == NO_ALCANZABLE:
+                            plana[vecino] = nivel
+                            nuevo.append(vecino)
+                frente = nuevo
+            else:
+                vecinos = vecinos_frente(np.asarray(frente))
+                vecinos = vecinos[distancia[vecinos] == NO_ALCANZABLE]
+                distancia[vecinos] = nivel
+                frente = np.unique(vecinos)
+
+    def _vecinos_celdas(self, frente):
+        vecinos = (frente[:, None] + self._desplazamientos[None, :]).reshape(-1)
+        return vecinos[self._libre[vecinos]]
+
+    def _vecinos_celda(self, celda):
+        libre = self._libre_plano
+        return [vecino for vecino in (celda + d for d in self._desplazamientos_py) if libre[vecino]]
+
+    def distancia(self, origen, destino):
+        """Número mínimo de celdas entre dos celdas, o -1 si no hay camino"""
+        self._verificar(*destino)
+        return int(self.distancias(origen)[destino[1], destino[0]])
+
+    # --- Acciones de Karel ---
+
+    def distancias_acciones(self, origen, direccion):
+        """
+        Mínimo de acciones para llegar a cada celda y dirección desde ``origen`` mirando a ``direccion``.
+
+        Devuelve un arreglo int32 [y, x, dirección] con -1 donde no se puede
+        llegar. ``girar_derecha`` equivale a tres ``girar_izquierda``.
+        """
+        clave = ("acciones", tuple(origen), direccion)
+        if clave not in self._campos:
+            estados = self._bfs_estados(self._plano(*origen) * 4 + direccion)
+            self._guardar(clave, estados)
+        self._campos.move_to_end(clave)
+        estados = self._campos[clave]
+        return estados.reshape(self.alto + 2, self._fila, 4)[1:-1, 1:-1]
+
+    def _bfs_estados(self, inicio):
+        """BFS sobre los estados celda * 4 + dirección; cada acción cuesta 1"""
+        distancia = np.full(self._libre.size * 4, NO_ALCANZABLE, dtype=np.int32)
+        if self._libre[inicio // 4]:
+            self._bfs(distancia, inicio, self._vecinos_estados, self._vecinos_estado)
+        return distancia
+
+    def _vecinos_estados(self, frente):
+        celda, d = frente >> 2, frente & 3
+        girar = celda * 4 + ((d + 1) & 3)
+        destino = celda + self._desplazamientos[d]
+        avanzar = (destino * 4 + d)[self._libre[destino]]
+        return np.concatenate([girar, avanzar])
+
+    def _vecinos_estado(self, estado):
+        celda, d = estado >> 2, estado & 3
+        girar = (celda << 2) | ((d + 1) & 3)
+        destino = celda + self._desplazamientos_py[d]
+        if self._libre_plano[destino]:
+            return (girar, (destino << 2) | d)
+        return (girar,)
+
+    def acciones_minimas(self, origen, direccion, destino):
+        """Mínimo de acciones para que Karel llegue a ``destino`` con cualquier dirección (-1 si no puede)"""
+        self._verificar(*destino)
+        campo = self.distancias_acciones(origen, direccion)[destino[1], destino[0]]
+        alcanzables = campo[campo != NO_ALCANZABLE]
+        return int(alcanzables.min()) if alcanzables.size else NO_ALCANZABLE
+
+    def camino_acciones(self, origen, direccion, destino, direccion_final=None):
+        """
+        Secuencia más corta de acciones para ir de ``origen`` (mirando a
+        ``direccion``) a ``destino``.
+
+        Devuelve una lista de "avanzar" y "girar_izquierda", o None si no
+        hay camino. Con ``direccion_final`` Karel termina mirando hacia ella.
+        """
+        self.distancias_acciones(origen, direccion)
+        distancia = self._campos[("acciones", tuple(origen), direccion)]
+        celda = self._plano(*destino)
+        candidatos = range(4) if direccion_final is None else (direccion_final,)
+        finales = [(int(distancia[celda * 4 + d]), d) for d in candidatos
+                   if distancia[celda * 4 + d] != NO_ALCANZABLE]
+        if not finales:
+            return None
+
+        nivel, d = min(finales)
+        acciones = []
+        while nivel:
+            anterior = celda - int(self._desplazamientos[d])
+            if self._libre[anterior] and distancia[anterior * 4 + d] == nivel - 1:
+                acciones.append("avanzar")
+                celda = anterior
+            else:
+                acciones.append("girar_izquierda")
+                d = (d - 1) & 3
+            nivel -= 1
+        acciones.reverse()
+        return acciones
+
+
+_analisis = OrderedDict()
+MAX_ANALISIS = 32
+
+
+def analizar(mundo):
+    """
+    Devuelve el AnalisisMundo de ``mundo``, reutilizando el de cualquier
+    mundo con las mismas paredes (se guardan los ``MAX_ANALISIS`` más recientes).
+    """
+    clave = (mundo.alto, mundo.ancho, hashlib.blake2b(mundo.paredes.tobytes(), digest_size=16).digest())
+    if clave in _analisis:
+        _analisis.move_to_end(clave)
+        return _analisis[clave]
+    analisis = _analisis[clave] = AnalisisMundo(mundo)
+    if len(_analisis) > MAX_ANALISIS:
+        _analisis.popitem(last=False)
+    return analisis
@@ -0,0 +1,145 @@
+# pykarel_web/asincrono.py
+import sys
+import threading
+
+
+class TrabajadorRender:
+    """
+    Dibuja en segundo plano los pasos pendientes de un Karel.
+
+    En CPython usa un hilo que se detiene solo tras ``ESPERA_INACTIVO``
+    segundos sin trabajo. En Pyodide, donde no hay hilos, usa una tarea de
+    asyncio que dibuja ``lote`` frames y cede el control al navegador; la
+    tarea corre cuando termina la celda, así que el código del estudiante
+    no espera al render.
+
+    Si se acumulan más de ``max_pendientes`` pasos sin dibujar, la acción
+    que los agrega espera (hilo) o dibuja ella misma (asyncio) hasta que
+    quede la mitad, para que la memoria no crezca sin límite.
+
+    Si dibujar falla, el trabajador se detiene en lugar de reintentar el
+    mismo frame: guarda la excepción, despierta a quien esté esperando y
+    la relanzan ``flush`` o la siguiente acción (``notificar``).
+
+    Parámetros:
+    -----------
+    materializar : callable
+        ``materializar(limite)`` dibuja a lo sumo ``limite`` pasos pendientes
+        (todos si es None)
+    pendientes : callable
+        Devuelve cuántos pasos faltan por dibujar
+    max_pendientes : int
+        Pasos sin dibujar a partir de los cuales se aplica contrapresión
+    lote : int
+        Frames que se dibujan de una vez antes de ceder el control
+    usar_hilo : bool o None
+        Forzar el modo; por defecto hilo salvo en Pyodide
+    """
+
+    ESPERA_INACTIVO = 1.0
+
+    def __init__(self, materializar, pendientes, max_pendientes=256, lote=4, usar_hilo=None):
+        self.materializar = materializar
+        self.pendientes = pendientes
+        self.max_pendientes = max_pendientes
+        self.lote = lote
+        self.usar_hilo = sys.platform != "emscripten" if usar_hilo is None else usar_hilo
+        self.error = None  # Primera excepción del render en segundo plano; se relanza en flush o notificar
+        self._detenido = False
+        self._condicion = threading.Condition()
+        self._hilo = None
+        self._tarea = None
+
+    def notificar(self):
+        """
+        Avisa que hay un paso nuevo para dibujar (lo llama cada acción).
+        Relanza el error del render si el trabajador se detuvo por uno.
+        """
+        self._relanzar()
+        if self.usar_hilo:
+            with self._condicion:
+                if self._hilo is None:
+                    self._hilo = threading.Thread(target=self._ciclo_hilo, name="pykarel-render", daemon=True)
+                    self._hilo.start()
+                self._condicion.notify_all()
+                if self.pendientes() > self.max_pendientes:
+                    self._condicion.wait_for(lambda: self.pendientes() <= self.max_pendientes // 2
+                                             or self.error is not None or self._hilo is None)
+            self._relanzar()
+            return
+
+        if self.pendientes() > self.max_pendientes:
+            self._dibujar(self.pendientes() - self.max_pendientes // 2)
+            self._relanzar()
+        if self._tarea is None or self._tarea.done():
+            import asyncio  # Solo aquí: cargarlo al importar pykarel_web es caro
+
+            try:
+                bucle = asyncio.get_running_loop()
+            except RuntimeError:
+                self._dibujar(None)  # Sin bucle de eventos no hay segundo plano: se dibuja ahora
+                return
+            self._tarea = bucle.create_task(self._ciclo_asyncio())
+
+    def _relanzar(self):
+        if self.error is not None:
+            error, self.error = self.error, None
+            raise error
+
+    def _dibujar(self, limite):
+        try:
+            self.materializar(limite)
+        except Exception as e:
+            with self._condicion:
+                if self.error is None:
+                    self.error = e
+                self._condicion.notify_all()
+
+    def _ciclo_hilo(self):
+        while True:
+            with self._condicion:
+                hay_trabajo = self._condicion.wait_for(
+                    lambda: self.pendientes() or self._detenido, timeout=self.ESPERA_INACTIVO)
+                if not hay_trabajo or self._detenido or self.error is not None:
+                    # Tras un error no se reintenta: lo relanza flush o la siguiente acción
+                    self._hilo = None
+                    self._condicion.notify_all()
+                    return
+            self._dibujar(self.lote)
+            with self._condicion:
+                self._condicion.notify_all()
+
+    async def _ciclo_asyncio(self):
+        import asyncio
+
+        while self.pendientes() and self.error is None and not self._detenido:
+            self._dibujar(self.lote)
+            await asyncio.sleep(0)
+
+    def detener(self):
+        """
+        Detiene el trabajador sin dibujar lo pendiente: espera a que el hilo
+        termine el lote en curso (o cancela la tarea) y descarta el error.
+        """
+        with self._condicion:
+            self._detenido = True
+            hilo = self._hilo
+            self._condicion.notify_all()
+        if hilo is not None and hilo is not threading.current_thread():
+            hilo.join()
+        if self._tarea is not None:
+            self._tarea.cancel()
+        self.error = None
+
+    async def flush(self):
+        """Espera a que se dibujen todos los pasos pendientes sin bloquear el bucle de eventos"""
+        import asyncio
+
+        if self.usar_hilo:
+            while self.pendientes() and self._hilo is not None and self.error is None:
+                await asyncio.sleep(0.005)
+        elif self._tarea is not None and not self._tarea.done():
+            await self._tarea
+        self._relanzar()
+        self._dibujar(None)  # Lo que quede (por ejemplo si el hilo ya terminó)
+        self._relanzar()
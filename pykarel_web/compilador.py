@@ -0,0 +1,722 @@
+# pykarel_web/compilador.py
+import ast
+import inspect
+import operator
+import textwrap
+import types
+
+import numpy as np
+
+from .mundo import MOVIMIENTOS
+
+# Instrucciones; cada una es una terna (código, a, b)
+(AVANZAR, GIRAR_IZQUIERDA, PONER_COSO, JUNTAR_COSO, SALTO, SALTO_SI, SALTO_SI_NO, CICLO, REPETIR, CONTAR,
+ DESCARTAR, LLAMAR, RETORNAR, RECORRER, FIN) = range(15)
+NOMBRES_INSTRUCCIONES = ("avanzar", "girar_izquierda", "poner_coso", "juntar_coso", "salto", "salto_si",
+                         "salto_si_no", "ciclo", "repetir", "contar", "descartar", "llamar", "retornar", "recorrer",
+                         "fin")
+
+# Condiciones; las comparaciones de ``contar_cosos()`` empiezan en COMPARACION
+FRENTE_ABIERTO, FRENTE_BLOQUEADO, IZQUIERDA_ABIERTA, DERECHA_ABIERTA, HAY_COSO, COMPARACION = range(6)
+CONDICIONES = {
+    "frente_abierto": FRENTE_ABIERTO,
+    "front_is_clear": FRENTE_ABIERTO,
+    "frente_bloqueado": FRENTE_BLOQUEADO,
+    "izquierda_abierta": IZQUIERDA_ABIERTA,
+    "derecha_abierta": DERECHA_ABIERTA,
+    "hay_coso": HAY_COSO,
+}
+ACCIONES = {
+    "avanzar": (AVANZAR,),
+    "girar_izquierda": (GIRAR_IZQUIERDA,),
+    "girar_derecha": (GIRAR_IZQUIERDA,) * 3,  # Como en Karel: cuenta tres pasos
+    "poner_coso": (PONER_COSO,),
+    "juntar_coso": (JUNTAR_COSO,),
+}
+_COMPARADORES = {ast.Eq: "==", ast.NotEq: "!=", ast.Lt: "<", ast.LtE: "<=", ast.Gt: ">", ast.GtE: ">="}
+_OPERADORES = {"==": operator.eq, "!=": operator.ne, "<": operator.lt, "<=": operator.le, ">": operator.gt,
+               ">=": operator.ge}
+
+MAX_LLAMADAS = 10000
+# Instrucciones que se simulan como máximo para resumir lo que hace un
+# recorrido en una celda; si no alcanzan, esa vuelta se interpreta normalmente
+MAX_SIMULACION = 10000
+
+
+class ProgramaCompilado:
+    """
+    Programa de Karel traducido a una secuencia de instrucciones.
+
+    Se obtiene con ``compilar``. Es invocable como el programa original,
+    ``programa(karel)``, así que sirve también en ``ejecutar_programa`` y
+    ``ejecutar_lote``, y se puede serializar con pickle.
+
+    Atributos:
+    ----------
+    codigo : list
+        Instrucciones (código, a, b); ``desensamblar()`` las muestra
+    comparaciones : list
+        (operador, n) de cada comparación ``contar_cosos() <op> n``
+    lineas : list
+        Línea del código fuente de cada instrucción
+    recorridos : list
+        (antes, despues) de cada ``while frente_abierto(): antes; avanzar(); despues``
+        que se puede adelantar de una vez (ver RECORRER)
+    """
+
+    def __init__(self, nombre, codigo, comparaciones, num_ciclos, lineas, recorridos):
+        self.__name__ = nombre
+        self.codigo = codigo
+        self.comparaciones = comparaciones
+        self.num_ciclos = num_ciclos
+        self.lineas = lineas
+        self.recorridos = recorridos
+
+    def __call__(self, karel):
+        ejecutar(self, karel)
+
+    def __repr__(self):
+        return f"<ProgramaCompilado {self.__name__}: {len(self.codigo)} instrucciones>"
+
+    def desensamblar(self):
+        """Devuelve el listado de instrucciones como texto"""
+        lineas = []
+        for i, (op, a, b) in enumerate(self.codigo):
+            argumentos = ""
+            if op in (SALTO_SI, SALTO_SI_NO):
+                argumentos = f"{self._nombre_condicion(a)} -> {b}"
+            elif op in (SALTO, CONTAR, LLAMAR):
+                argumentos = f"-> {a}"
+            elif op == CICLO:
+                argumentos = f"#{a} -> {b}"
+            elif op == RECORRER:
+                argumentos = f"#{a}"
+            elif op == REPETIR:
+                argumentos = str(a)
+            lineas.append(f"{i:5d}  {NOMBRES_INSTRUCCIONES[op]:16s} {argumentos:30s} # línea {self.lineas[i]}")
+        return "\n".join(lineas)
+
+    def _nombre_condicion(self, condicion):
+        if condicion >= COMPARACION:
+            operador, n = self.comparaciones[condicion - COMPARACION]
+            return f"contar_cosos {operador} {n}"
+        return next(nombre for nombre, codigo in CONDICIONES.items() if codigo == condicion)
+
+
+class _Compilador:
+    """Traduce el AST de una función (y de las funciones que llama) a instrucciones"""
+
+    def __init__(self):
+        self.codigo = []
+        self.lineas = []
+        self.comparaciones = []
+        self.num_ciclos = 0
+        self.direcciones = {}  # Función -> dirección de su primera instrucción
+        self.llamadas = []  # (índice de la instrucción LLAMAR, función)
+        self.recorridos = []
+        self.linea = 0
+        self.fuente = {}  # Número de línea -> texto, para los mensajes de error
+
+    def error(self, nodo, motivo="no se puede compilar"):
+        # El texto de la línea y no ast.unparse, que no existe en Python 3.8
+        linea = getattr(nodo, 'lineno', None)
+        return ValueError(f"Línea {linea or '?'}: {motivo}: {self.fuente.get(linea, '').strip()}")
+
+    def emitir(self, op, a=0, b=0):
+        self.codigo.append([op, a, b])
+        self.lineas.append(self.linea)
+        return len(self.codigo) - 1
+
+    def parchar(self, saltos, destino=None):
+        """Hace que los saltos pendientes apunten a ``destino`` (por defecto, la siguiente instrucción)"""
+        destino = len(self.codigo) if destino is None else destino
+        for i in saltos:
+            posicion = 2 if self.codigo[i][0] in (SALTO_SI, SALTO_SI_NO, CICLO) else 1
+            self.codigo[i][posicion] = destino
+
+    # --- Funciones ---
+
+    def programa(self, funcion):
+        # Todas las funciones son subrutinas (la principal también puede ser recursiva)
+        self.linea = funcion.__code__.co_firstlineno
+        self.llamadas.append((self.emitir(LLAMAR), funcion))
+        self.emitir(FIN)
+        pendientes = 0
+        while pendientes < len(self.llamadas):
+            i, llamada = self.llamadas[pendientes]
+            if llamada not in self.direcciones:
+                self.funcion(llamada)
+            self.codigo[i][1] = self.direcciones[llamada]
+            pendientes += 1
+        return ProgramaCompilado(funcion.__name__, [tuple(instruccion) for instruccion in self.codigo],
+                                 self.comparaciones, self.num_ciclos, self.lineas, self.recorridos)
+
+    def funcion(self, funcion):
+        try:
+            fuente = textwrap.dedent(inspect.getsource(funcion))
+        except (OSError, TypeError):
+            raise ValueError(f"No se encontró el código fuente de {funcion!r}") from None
+        desplazamiento = funcion.__code__.co_firstlineno - 1
+        self.fuente.update((desplazamiento + i, linea) for i, linea in enumerate(fuente.splitlines(), 1))
+        try:
+            definicion = ast.parse(fuente).body[0]
+        except SyntaxError:
+            definicion = None  # Por ejemplo una lambda en medio de una expresión
+        if not isinstance(definicion, ast.FunctionDef):
+            raise ValueError(f"{funcion.__name__} no es una función definida con def")
+        ast.increment_lineno(definicion, desplazamiento)
+        if len(definicion.args.args) != 1 or definicion.args.vararg or definicion.args.kwonlyargs:
+            raise ValueError(f"Línea {definicion.lineno}: {funcion.__name__} debe recibir solo a Karel")
+
+        self.direcciones[funcion] = len(self.codigo)
+        contexto = {"karel": definicion.args.args[0].arg, "globales": funcion.__globals__, "ciclos": []}
+        self.bloque(definicion.body, contexto)
+        self.linea = definicion.body[-1].lineno
+        self.emitir(RETORNAR)
+
+    # --- Sentencias ---
+
+    def bloque(self, sentencias, contexto):
+        for sentencia in sentencias:
+            self.linea = sentencia.lineno
+            self.sentencia(sentencia, contexto)
+
+    def sentencia(self, nodo, contexto):
+        if isinstance(nodo, ast.Expr):
+            if isinstance(nodo.value, ast.Constant) and isinstance(nodo.value.value, str):
+                return  # Docstring
+            if isinstance(nodo.value, ast.Call):
+                return self.llamada(nodo.value, contexto)
+        elif isinstance(nodo, ast.Pass):
+            return
+        elif isinstance(nodo, ast.If):
+            falso = []
+            self.saltar_si(nodo.test, False, falso, contexto)
+            self.bloque(nodo.body, contexto)
+            if nodo.orelse:
+                fin = [self.emitir(SALTO)]
+                self.parchar(falso)
+                self.bloque(nodo.orelse, contexto)
+                self.parchar(fin)
+            else:
+                self.parchar(falso)
+            return
+        elif isinstance(nodo, ast.While) and not nodo.orelse:
+            self.recorrido(nodo, contexto)
+            inicio = len(self.codigo)
+            salidas, continuaciones = [], []
+            self.saltar_si(nodo.test, False, salidas, contexto)
+            contexto["ciclos"].append(("while", inicio, salidas, continuaciones))
+            self.bloque(nodo.body, contexto)
+            contexto["ciclos"].pop()
+            # El salto de regreso de un while (también el de ``continue``)
+            # pasa por CICLO, que detecta los ciclos infinitos
+            self.parchar(continuaciones)
+            self.emitir(CICLO, self.num_ciclos, inicio)
+            self.num_ciclos += 1
+            self.parchar(salidas)
+            return
+        elif isinstance(nodo, ast.For) and not nodo.orelse:
+            veces = self.repeticiones(nodo)
+            self.emitir(REPETIR, veces)
+            inicio = self.emitir(CONTAR)
+            salidas = [inicio]
+            contexto["ciclos"].append(("for", inicio, salidas, None))
+            self.bloque(nodo.body, contexto)
+            contexto["ciclos"].pop()
+            self.emitir(SALTO, inicio)
+            self.parchar(salidas)
+            return
+        elif isinstance(nodo, (ast.Break, ast.Continue)) and contexto["ciclos"]:
+            tipo, inicio, salidas, continuaciones = contexto["ciclos"][-1]
+            if isinstance(nodo, ast.Continue) and tipo == "while":
+                continuaciones.append(self.emitir(SALTO))
+            elif isinstance(nodo, ast.Continue):
+                self.emitir(SALTO, inicio)
+            elif tipo == "for":
+                # Quita el contador del for y salta a la salida (después del CONTAR que lo quitaría)
+                self.emitir(DESCARTAR)
+                salidas.append(self.emitir(SALTO))
+            else:
+                salidas.append(self.emitir(SALTO))
+            return
+        elif isinstance(nodo, ast.Return) and nodo.value is None:
+            self.emitir(RETORNAR)
+            return
+        raise self.error(nodo)
+
+    def recorrido(self, nodo, contexto):
+        """
+        Antes de ``while frente_abierto(): antes; avanzar(); despues``, donde
+        ``antes`` y ``despues`` solo ponen o juntan cosos, emite RECORRER para
+        adelantar el ciclo hasta la pared de una vez; el ciclo se compila
+        igual después y sigue desde donde RECORRER lo deje.
+        """
+        prueba = nodo.test
+        if isinstance(prueba, ast.UnaryOp) and isinstance(prueba.op, ast.Not):
+            if not self.es_llamada(prueba.operand, "frente_bloqueado", contexto):
+                return
+        elif not self.es_llamada(prueba, "frente_abierto", contexto):
+            return
+        avances = [i for i, sentencia in enumerate(nodo.body)
+                   if isinstance(sentencia, ast.Expr) and self.es_llamada(sentencia.value, "avanzar", contexto)]
+        if len(avances) != 1:
+            return
+        antes, despues = nodo.body[:avances[0]], nodo.body[avances[0] + 1:]
+        if not (self.solo_cosos(antes, contexto) and self.solo_cosos(despues, contexto)):
+            return
+        self.recorridos.append((self.fragmento(antes, contexto), self.fragmento(despues, contexto)))
+        self.emitir(RECORRER, len(self.recorridos) - 1)
+
+    def fragmento(self, sentencias, contexto):
+        """Compila sentencias sueltas (terminadas en FIN) compartiendo la tabla de comparaciones"""
+        compilador = _Compilador()
+        compilador.comparaciones = self.comparaciones
+        compilador.bloque(sentencias, dict(contexto, ciclos=[]))
+        compilador.emitir(FIN)
+        return tuple(tuple(instruccion) for instruccion in compilador.codigo)
+
+    def solo_cosos(self, sentencias, contexto):
+        """Indica si las sentencias solo ponen o juntan cosos según los cosos de la celda"""
+        for nodo in sentencias:
+            if isinstance(nodo, ast.Expr):
+                valor = nodo.value
+                if not ((isinstance(valor, ast.Constant) and isinstance(valor.value, str))
+                        or self.es_llamada(valor, "poner_coso", contexto)
+                        or self.es_llamada(valor, "juntar_coso", contexto)):
+                    return False
+            elif isinstance(nodo, (ast.If, ast.While)):
+                if not (self.condicion_cosos(nodo.test, contexto) and self.solo_cosos(nodo.body + nodo.orelse, contexto)):
+                    return False
+            elif isinstance(nodo, ast.For):
+                if not self.solo_cosos(nodo.body + nodo.orelse, contexto):
+                    return False
+            elif not isinstance(nodo, ast.Pass):
+                return False
+        return True
+
+    def condicion_cosos(self, nodo, contexto):
+        if isinstance(nodo, ast.Constant):
+            return True
+        if isinstance(nodo, ast.UnaryOp) and isinstance(nodo.op, ast.Not):
+            return self.condicion_cosos(nodo.operand, contexto)
+        if isinstance(nodo, ast.BoolOp):
+            return all(self.condicion_cosos(termino, contexto) for termino in nodo.values)
+        if isinstance(nodo, ast.Compare):
+            return self.es_llamada(nodo.left, "contar_cosos", contexto)
+        return self.es_llamada(nodo, "hay_coso", contexto)
+
+    def repeticiones(self, nodo):
+        """Número de vueltas de ``for _ in range(...)`` con argumentos constantes"""
+        iterable = nodo.iter
+        if (isinstance(nodo.target, ast.Name) and isinstance(iterable, ast.Call)
+                and isinstance(iterable.func, ast.Name) and iterable.func.id == "range"
+                and 1 <= len(iterable.args) <= 2 and not iterable.keywords):
+            try:
+                return len(range(*(ast.literal_eval(argumento) for argumento in iterable.args)))
+            except (ValueError, TypeError):
+                pass
+        raise self.error(nodo.iter, "solo se pueden compilar ciclos for sobre range() con números constantes")
+
+    def llamada(self, nodo, contexto):
+        funcion = nodo.func
+        if self.es_metodo(funcion, contexto) and funcion.attr in ACCIONES and not (nodo.args or nodo.keywords):
+            for op in ACCIONES[funcion.attr]:
+                self.emitir(op)
+            return
+        if (isinstance(funcion, ast.Name) and len(nodo.args) == 1 and not nodo.keywords
+                and isinstance(nodo.args[0], ast.Name) and nodo.args[0].id == contexto["karel"]):
+            llamada = contexto["globales"].get(funcion.id)
+            if isinstance(llamada, types.FunctionType):
+                self.llamadas.append((self.emitir(LLAMAR), llamada))
+                return
+        raise self.error(nodo)
+
+    def es_llamada(self, nodo, metodo, contexto):
+        """Indica si ``nodo`` es ``karel.<metodo>()`` sin argumentos"""
+        return (isinstance(nodo, ast.Call) and self.es_metodo(nodo.func, contexto) and nodo.func.attr == metodo
+                and not (nodo.args or nodo.keywords))
+
+    def es_metodo(self, nodo, contexto):
+        return (isinstance(nodo, ast.Attribute) and isinstance(nodo.value, ast.Name)
+                and nodo.value.id == contexto["karel"])
+
+    # --- Condiciones ---
+
+    def saltar_si(self, nodo, valor, destinos, contexto):
+        """Emite saltos que van a ``destinos`` cuando ``nodo`` vale ``valor``; si no, sigue de largo"""
+        if isinstance(nodo, ast.Constant):
+            if bool(nodo.value) == valor:
+                destinos.append(self.emitir(SALTO))
+        elif isinstance(nodo, ast.UnaryOp) and isinstance(nodo.op, ast.Not):
+            self.saltar_si(nodo.operand, not valor, destinos, contexto)
+        elif isinstance(nodo, ast.BoolOp):
+            # ``and`` salta con False en cuanto un término es falso; ``or`` con
+            # True en cuanto uno es verdadero. En el otro caso se decide con el último
+            corta = isinstance(nodo.op, ast.Or)
+            if valor == corta:
+                for termino in nodo.values:
+                    self.saltar_si(termino, valor, destinos, contexto)
+            else:
+                sigue = []
+                for termino in nodo.values[:-1]:
+                    self.saltar_si(termino, corta, sigue, contexto)
+                self.saltar_si(nodo.values[-1], valor, destinos, contexto)
+                self.parchar(sigue)
+        else:
+            destinos.append(self.emitir(SALTO_SI if valor else SALTO_SI_NO, self.condicion(nodo, contexto)))
+
+    def condicion(self, nodo, contexto):
+        if (isinstance(nodo, ast.Call) and self.es_metodo(nodo.func, contexto)
+                and nodo.func.attr in CONDICIONES and not (nodo.args or nodo.keywords)):
+            return CONDICIONES[nodo.func.attr]
+        if (isinstance(nodo, ast.Compare) and len(nodo.ops) == 1 and type(nodo.ops[0]) in _COMPARADORES
+                and isinstance(nodo.left, ast.Call) and self.es_metodo(nodo.left.func, contexto)
+                and nodo.left.func.attr == "contar_cosos" and not nodo.left.args
+                and isinstance(nodo.comparators[0], ast.Constant) and type(nodo.comparators[0].value) is int):
+            self.comparaciones.append((_COMPARADORES[type(nodo.ops[0])], nodo.comparators[0].value))
+            return COMPARACION + len(self.comparaciones) - 1
+        raise self.error(nodo, "condición no soportada")
+
+
+def compilar(programa):
+    """
+    Compila un programa de Karel a instrucciones para ejecutarlo sin llamar
+    un método por acción.
+
+    Se aceptan funciones que reciben a Karel y usan sus acciones y
+    condiciones con ``if``/``elif``/``else``, ``while``, ``for _ in
+    range(n)`` (n constante), ``not``/``and``/``or``, comparaciones
+    ``karel.contar_cosos() <op> n``, ``break``, ``continue``, ``return`` y
+    llamadas a otras funciones de este tipo (también recursivas). Cualquier
+    otra cosa lanza ValueError con la línea que no se pudo compilar.
+
+    Parámetros:
+    -----------
+    programa : callable o ProgramaCompilado
+        Función con código fuente disponible (definida con ``def``)
+    """
+    if isinstance(programa, ProgramaCompilado):
+        return programa
+    if not isinstance(programa, types.FunctionType):
+        raise ValueError(f"Solo se pueden compilar funciones, no {programa!r}")
+    return _Compilador().programa(programa)
+
+
+def ejecutar(programa, karel):
+    """
+    Ejecuta un ProgramaCompilado sobre ``karel``.
+
+    Con ``modo_render="ninguno"`` y sin grabación ni perfilado, el intérprete
+    trabaja directamente sobre la posición de Karel y las paredes y cosos
+    del mundo, y al final (o en un error) deja a Karel en el mismo estado,
+    con el mismo número de pasos y los mismos errores que el programa
+    original, incluido LimitePasosExcedido. Los ``while frente_abierto()``
+    que solo avanzan y ponen o juntan cosos se adelantan hasta la pared de
+    una vez (RECORRER) en lugar de vuelta por vuelta. En los demás casos
+    llama a los métodos de Karel para que cada acción se dibuje o se grabe.
+
+    Un ``while`` que vuelve a empezar sin que Karel haya hecho ninguna
+    acción desde la vuelta anterior nunca terminaría: se lanza KarelError.
+    """
+    rapido = karel.modo_render == "ninguno" and karel.grabacion is None and karel.perfilador is None
+    (_ejecutar_rapido if rapido else _ejecutar_metodos)(programa, karel)
+
+
+def _comparar(programa, condicion, cantidad):
+    operador, n = programa.comparaciones[condicion - COMPARACION]
+    return _OPERADORES[operador](cantidad, n)
+
+
+def _simular(fragmento, comparaciones, cantidad):
+    """
+    Ejecuta un fragmento que solo maneja cosos sobre una celda con ``cantidad``.
+
+    Devuelve (cosos finales, cambio de la bolsa, mínimo de la bolsa relativo
+    al inicio tras cada ``poner_coso``, pasos), o None si junta de una celda
+    vacía o no termina en MAX_SIMULACION instrucciones.
+    """
+    pc = bolsa = minimo = pasos = 0
+    contadores = []
+    for _ in range(MAX_SIMULACION):
+        op, a, b = fragmento[pc]
+        pc += 1
+        if op == SALTO_SI_NO or op == SALTO_SI:
+            if a == HAY_COSO:
+                cierto = cantidad > 0
+            else:
+                operador, n = comparaciones[a - COMPARACION]
+                cierto = _OPERADORES[operador](cantidad, n)
+            if cierto == (op == SALTO_SI):
+                pc = b
+        elif op == JUNTAR_COSO:
+            if cantidad < 1:
+                return None
+            cantidad -= 1
+            bolsa += 1
+            pasos += 1
+        elif op == PONER_COSO:
+            cantidad += 1
+            bolsa -= 1
+            minimo = min(minimo, bolsa)
+            pasos += 1
+        elif op == SALTO:
+            pc = a
+        elif op == CICLO:
+            pc = b
+        elif op == CONTAR:
+            if contadores[-1]:
+                contadores[-1] -= 1
+            else:
+                contadores.pop()
+                pc = a
+        elif op == REPETIR:
+            contadores.append(a)
+        elif op == DESCARTAR:
+            contadores.pop()
+        else:  # FIN
+            return cantidad, bolsa, minimo, pasos
+    return None
+
+
+def _resumen_celdas(fragmento, comparaciones, cantidades, simulaciones):
+    """
+    Aplica ``_simular`` a cada cantidad de un arreglo (simulando una vez
+    cada valor distinto) y devuelve arreglos (cosos, bolsa, mínimo, pasos,
+    válido).
+    """
+    if len(fragmento) == 1:  # Solo FIN: la celda queda igual
+        ceros = np.zeros_like(cantidades)
+        return cantidades, ceros, ceros, ceros, ceros + 1
+    # Con pocas cantidades distintas y chicas (lo normal) basta una tabla indexada por cantidad
+    maximo = int(cantidades.max())
+    if maximo < 4 * len(cantidades) + 64 and cantidades.min() >= 0:
+        unicos = np.flatnonzero(np.bincount(cantidades)).tolist()
+        filas, inversa = unicos, cantidades
+        tabla = np.zeros((maximo + 1, 5), dtype=np.int64)
+    else:
+        unicos, inversa = np.unique(cantidades, return_inverse=True)
+        unicos = unicos.tolist()
+        filas = range(len(unicos))
+        tabla = np.zeros((len(unicos), 5), dtype=np.int64)
+    for i, cantidad in zip(filas, unicos):
+        clave = (fragmento, cantidad)
+        if clave not in simulaciones:
+            simulaciones[clave] = _simular(fragmento, comparaciones, cantidad)
+        resultado = simulaciones[clave]
+        tabla[i] = (*resultado, 1) if resultado is not None else (cantidad, 0, 0, 0, 0)
+    return tabla[inversa].T
+
+
+def _recorrer(programa, recorrido, mundo, celda, celda_cosos, d, bolsa, paso, limite, simulaciones):
+    """
+    Adelanta ``while frente_abierto(): antes; avanzar(); despues`` de una vez.
+
+    Cada celda del rayo hasta la pared se resume simulando los fragmentos
+    una vez por cantidad de cosos distinta; las vueltas se aplican con
+    sumas acumuladas hasta la primera que chocaría con el límite de pasos,
+    vaciaría la bolsa o juntaría de una celda vacía. Devuelve el estado al
+    inicio de la siguiente vuelta (celda, celda_cosos, bolsa, paso); desde
+    ahí el ciclo sigue interpretándose y produce el mismo error que produciría.
+    """
+    antes, despues = programa.recorridos[recorrido]
+    fila, ancho = mundo.ancho + 2, mundo.ancho
+    dx, dy = MOVIMIENTOS[d]
+    paso_celda, paso_cosos = dy * fila + dx, dy * ancho + dx
+
+    # Celdas libres en línea recta; el borde de paredes garantiza el final
+    largo = fila if dx else mundo.alto + 2
+    fin = celda + paso_celda * (largo + 1)
+    rayo = mundo.paredes.reshape(-1)[celda + paso_celda:fin if fin >= 0 else None:paso_celda]
+    k = int(rayo.argmax())
+    if len(antes) == len(despues) == 1:  # Solo avanzar: una acción por vuelta
+        k = int(min(k, max(0, limite - paso + 1)))
+        return celda + k * paso_celda, celda_cosos + k * paso_cosos, bolsa, paso + k
+    if not k:
+        return celda, celda_cosos, bolsa, paso
+
+    comparaciones = programa.comparaciones
+    indices = celda_cosos + paso_cosos * np.arange(k + 1)
+    originales = mundo.beepers.reshape(-1)[indices]
+    # La vuelta i hace ``antes`` en la celda i (después de que la vuelta
+    # anterior hiciera ``despues`` en ella), avanza y hace ``despues`` en la celda i + 1
+    d_cosos, d_bolsa, d_minimo, d_pasos, d_valido = _resumen_celdas(despues, comparaciones, originales[1:],
+                                                                     simulaciones)
+    entrada = np.concatenate([originales[:1], d_cosos[:-1]])
+    a_cosos, a_bolsa, a_minimo, a_pasos, a_valido = _resumen_celdas(antes, comparaciones, entrada, simulaciones)
+
+    pasos = np.cumsum(a_pasos + 1 + d_pasos)
+    cambio_bolsa = a_bolsa + d_bolsa
+    bolsa_inicial = bolsa + np.concatenate([[0], np.cumsum(cambio_bolsa)[:-1]])
+    validas = (a_valido.astype(bool) & d_valido.astype(bool) & (paso + pasos - 1 <= limite)
+               & (bolsa_inicial + np.minimum(a_minimo, a_bolsa + d_minimo) >= 0))
+    m = k if validas.all() else int(validas.argmin())
+    if not m:
+        return celda, celda_cosos, bolsa, paso
+
+    # Celdas 0..m-1 terminan tras ``antes``; la celda m solo recibió ``despues``
+    finales = np.concatenate([a_cosos[:m], d_cosos[m - 1:m]])
+    cambiadas = np.flatnonzero(finales != originales[:m + 1])
+    if len(cambiadas):
+        ys, xs = np.divmod(indices[cambiadas], ancho)
+        mundo.fijar_cosos_celdas(xs, ys, finales[cambiadas])
+    return (celda + m * paso_celda, celda_cosos + m * paso_cosos, bolsa + int(cambio_bolsa[:m].sum()),
+            paso + int(pasos[m - 1]))
+
+
+def _ejecutar_rapido(programa, karel):
+    from . import KarelError, LimitePasosExcedido
+
+    mundo = karel.mundo
+    paredes = memoryview(mundo.paredes.reshape(-1))
+    cosos_mundo = memoryview(mundo.beepers.reshape(-1))
+    fila, ancho = mundo.ancho + 2, mundo.ancho
+    desplazamientos = tuple(dy * fila + dx for dx, dy in MOVIMIENTOS)
+    desplazamientos_cosos = tuple(dy * ancho + dx for dx, dy in MOVIMIENTOS)
+    codigo, num_instrucciones = programa.codigo, len(programa.codigo)
+
+    # Estado en variables locales: celda con borde (para las paredes), celda
+    # sin borde (para los cosos), dirección, bolsa y pasos
+    celda = (karel.y + 1) * fila + karel.x + 1
+    celda_cosos = karel.y * ancho + karel.x
+    d, bolsa, paso = karel.direction, karel.cosos, karel.step
+    limite = karel.max_pasos if karel.max_pasos is not None else float("inf")
+    pc = 0
+    contadores, llamadas = [], []
+    # Paso en que cada while volvió a empezar por última vez; cada llamada
+    # tiene los suyos, así una llamada recursiva no confunde al while que la hizo
+    vueltas = [-1] * programa.num_ciclos
+    simulaciones = {}
+    try:
+        while pc < num_instrucciones:
+            op, a, b = codigo[pc]
+            pc += 1
+            if op == SALTO_SI_NO or op == SALTO_SI:
+                if a == FRENTE_ABIERTO:
+                    cierto = not paredes[celda + desplazamientos[d]]
+                elif a == FRENTE_BLOQUEADO:
+                    cierto = paredes[celda + desplazamientos[d]] != 0
+                elif a == HAY_COSO:
+                    cierto = cosos_mundo[celda_cosos] > 0
+                elif a == IZQUIERDA_ABIERTA:
+                    cierto = not paredes[celda + desplazamientos[(d + 1) & 3]]
+                elif a == DERECHA_ABIERTA:
+                    cierto = not paredes[celda + desplazamientos[(d + 3) & 3]]
+                else:
+                    cierto = _comparar(programa, a, cosos_mundo[celda_cosos])
+                if cierto == (op == SALTO_SI):
+                    pc = b
+            elif op == AVANZAR:
+                if paredes[celda + desplazamientos[d]]:
+                    raise KarelError("¡Choque! No puedes avanzar - Hay un obstáculo")
+                if paso > limite:
+                    raise LimitePasosExcedido(f"¡Karel superó el límite de {karel.max_pasos} pasos!")
+                celda += desplazamientos[d]
+                celda_cosos += desplazamientos_cosos[d]
+                paso += 1
+            elif op == GIRAR_IZQUIERDA:
+                if paso > limite:
+                    raise LimitePasosExcedido(f"¡Karel superó el límite de {karel.max_pasos} pasos!")
+                d = (d + 1) & 3
+                paso += 1
+            elif op == CICLO:
+                if vueltas[a] == paso:
+                    raise KarelError(f"¡Ciclo infinito! El while de la línea {programa.lineas[b]} "
+                                     f"se repite sin que Karel haga ninguna acción")
+                vueltas[a] = paso
+                pc = b
+            elif op == SALTO:
+                pc = a
+            elif op == CONTAR:
+                if contadores[-1]:
+                    contadores[-1] -= 1
+                else:
+                    contadores.pop()
+                    pc = a
+            elif op == REPETIR:
+                contadores.append(a)
+            elif op == PONER_COSO or op == JUNTAR_COSO:
+                cantidad = cosos_mundo[celda_cosos]
+                if op == PONER_COSO and bolsa <= 0:
+                    raise KarelError("¡No tienes cosos para poner!")
+                if op == JUNTAR_COSO and cantidad < 1:
+                    raise KarelError("¡No hay cosos para recoger aquí!")
+                if paso > limite:
+                    raise LimitePasosExcedido(f"¡Karel superó el límite de {karel.max_pasos} pasos!")
+                cambio = 1 if op == PONER_COSO else -1
+                bolsa -= cambio
+                cantidad += cambio
+                y, x = divmod(celda_cosos, ancho)
+                mundo.fijar_cosos(x, y, cantidad)  # Pasa por el diario del mundo
+                paso += 1
+            elif op == DESCARTAR:
+                contadores.pop()
+            elif op == LLAMAR:
+                if len(llamadas) >= MAX_LLAMADAS:
+                    raise KarelError(f"Demasiadas llamadas anidadas (más de {MAX_LLAMADAS})")
+                llamadas.append((pc, len(contadores), vueltas))
+                vueltas = [-1] * programa.num_ciclos
+                pc = a
+            elif op == RETORNAR:
+                pc, profundidad, vueltas = llamadas.pop()
+                del contadores[profundidad:]
+            elif op == RECORRER:
+                celda, celda_cosos, bolsa, paso = _recorrer(programa, a, mundo, celda, celda_cosos, d, bolsa, paso,
+                                                            limite, simulaciones)
+            else:  # FIN
+                break
+    finally:
+        karel.y, karel.x = divmod(celda_cosos, ancho)
+        karel.direction, karel.cosos, karel.step = d, bolsa, paso
+
+
+def _ejecutar_metodos(programa, karel):
+    from . import KarelError
+
+    codigo, num_instrucciones = programa.codigo, len(programa.codigo)
+    acciones = {AVANZAR: karel.avanzar, GIRAR_IZQUIERDA: karel.girar_izquierda,
+                PONER_COSO: karel.poner_coso, JUNTAR_COSO: karel.juntar_coso}
+    condiciones = {codigo_condicion: getattr(karel, nombre) for nombre, codigo_condicion in CONDICIONES.items()}
+    pc = 0
+    contadores, llamadas = [], []
+    vueltas = [-1] * programa.num_ciclos
+    while pc < num_instrucciones:
+        op, a, b = codigo[pc]
+        pc += 1
+        if op == SALTO_SI_NO or op == SALTO_SI:
+            cierto = condiciones[a]() if a < COMPARACION else _comparar(programa, a, karel.contar_cosos())
+            if cierto == (op == SALTO_SI):
+                pc = b
+        elif op in acciones:
+            acciones[op]()
+        elif op == CICLO:
+            if vueltas[a] == karel.step:
+                raise KarelError(f"¡Ciclo infinito! El while de la línea {programa.lineas[b]} "
+                                 f"se repite sin que Karel haga ninguna acción")
+            vueltas[a] = karel.step
+            pc = b
+        elif op == SALTO:
+            pc = a
+        elif op == CONTAR:
+            if contadores[-1]:
+                contadores[-1] -= 1
+            else:
+                contadores.pop()
+                pc = a
+        elif op == REPETIR:
+            contadores.append(a)
+        elif op == DESCARTAR:
+            contadores.pop()
+        elif op == LLAMAR:
+            if len(llamadas) >= MAX_LLAMADAS:
+                raise KarelError(f"Demasiadas llamadas anidadas (más de {MAX_LLAMADAS})")
+            llamadas.append((pc, len(contadores), vueltas))
+            vueltas = [-1] * programa.num_ciclos
+            pc = a
+        elif op == RETORNAR:
+            pc, profundidad, vueltas = llamadas.pop()
+            del contadores[profundidad:]
+        elif op == RECORRER:
+            pass  # Cada acción tiene que pasar por Karel para dibujarse o grabarse
+        else:  # FIN
+            break
@@ -0,0 +1,331 @@
+# pykarel_web/enjambre.py
+import numpy as np
+
+from .frames import AlmacenFrames
+from .generador import cosos_iniciales, obtener_mundo
+from .mundo import MOVIMIENTOS, Mundo
+from .render import crear_renderizador
+from .visor import html_animacion
+
+# Acciones de un paso del enjambre; cada robot hace una por paso
+ACCIONES = ("esperar", "avanzar", "girar_izquierda", "girar_derecha", "poner_coso", "juntar_coso")
+ESPERAR, AVANZAR, GIRAR_IZQUIERDA, GIRAR_DERECHA, PONER_COSO, JUNTAR_COSO = range(len(ACCIONES))
+_CODIGOS = {nombre: codigo for codigo, nombre in enumerate(ACCIONES)}
+
+_DX = np.array([dx for dx, _ in MOVIMIENTOS], dtype=np.int64)
+_DY = np.array([dy for _, dy in MOVIMIENTOS], dtype=np.int64)
+
+
+def _crear_mundo(tipo):
+    """
+    Mundo a partir de un nombre, parámetros de generación, una matriz o un
+    Mundo, con los mismos cosos iniciales que tendría en Karel
+    """
+    if isinstance(tipo, Mundo):
+        return tipo.copia()
+    if isinstance(tipo, dict):
+        return obtener_mundo(tipo)  # Los mundos generados traen sus propios cosos
+    mundo = obtener_mundo(tipo) if isinstance(tipo, str) else Mundo(tipo)
+    for x, y in list(mundo.posiciones_con_cosos()):
+        mundo.fijar_cosos(x, y, 0)
+    for (x, y), cantidad in cosos_iniciales(mundo).items():
+        mundo.fijar_cosos(x, y, cantidad)
+    return mundo
+
+
+def _por_robot(valor, n, nombre):
+    """Convierte un entero o una secuencia en un arreglo int64 de ``n`` valores"""
+    arreglo = np.asarray(valor, dtype=np.int64)
+    if arreglo.ndim == 0:
+        return np.full(n, arreglo, dtype=np.int64)
+    if arreglo.shape != (n,):
+        raise ValueError(f"Se esperaban {n} valores de {nombre}, no {arreglo.size}")
+    return arreglo.copy()
+
+
+class Enjambre:
+    """
+    Varios robots en un mismo mundo, con sus poses en arreglos de NumPy.
+
+    ``paso(acciones)`` recibe una acción por robot (ver ``ACCIONES``) y las
+    aplica todas a la vez sobre el estado del inicio del paso, con
+    operaciones vectorizadas:
+
+    - Un robot que avanza contra una pared o el borde se queda en su lugar.
+    - Con ``colisiones=True`` cada celda tiene a lo sumo un robot: nadie
+      entra a una celda que sigue ocupada (sí a la que otro deja en el mismo
+      paso), dos robots no intercambian celdas y, si varios van a la misma
+      celda, entra el de menor índice.
+    - Con ``colisiones=False`` los robots son independientes y pueden
+      compartir celdas. Si varios juntan en una celda con menos cosos que
+      ellos, los juntan los de menor índice; lo que se junta en un paso
+      sale de los cosos que había al empezarlo.
+
+    ``paso`` devuelve un arreglo booleano con los robots cuya acción se
+    hizo. Con render, cada paso se dibuja en un solo frame con todos los
+    robots.
+
+    Parámetros:
+    -----------
+    mundo : str, dict, list o Mundo
+        Como en Karel; todos los robots comparten el mundo y sus cosos
+    posiciones : sequence de (x, y)
+        Posición inicial de cada robot
+    direcciones : int o sequence de int
+        Dirección inicial de cada robot (0:Este, 1:Norte, 2:Oeste, 3:Sur)
+    cosos : int o sequence de int
+        Cosos que lleva cada robot al empezar
+    colisiones : bool
+        Si cada robot ocupa su celda en exclusiva
+    modo_render : str
+        "inmediato", "diferido" o "ninguno" (ver Karel)
+    renderizador : str o Renderizador
+        "numpy" (por defecto), "matplotlib" o una instancia de Renderizador
+    calidad : str
+        Tamaño de los frames (ver ``CALIDADES``)
+    max_pasos : int o None
+        Número máximo de pasos; al superarlo se lanza LimitePasosExcedido
+    """
+
+    MODOS_RENDER = ("inmediato", "diferido", "ninguno")
+
+    def __init__(self, mundo="default", posiciones=((0, 0),), direcciones=0, cosos=0, colisiones=True,
+                 modo_render="inmediato", renderizador="numpy", calidad="animacion", max_pasos=None):
+        from . import KarelError
+
+        if modo_render not in self.MODOS_RENDER:
+            raise KarelError(f"Modo de render desconocido: {modo_render}")
+        try:
+            self.mundo = _crear_mundo(mundo)
+            self._renderizador = crear_renderizador(renderizador, calidad)
+            posiciones = np.asarray(posiciones, dtype=np.int64).reshape(-1, 2)
+            n = len(posiciones)
+            self.x, self.y = posiciones[:, 0].copy(), posiciones[:, 1].copy()
+            self.direccion = _por_robot(direcciones, n, "direcciones")
+            self.cosos = _por_robot(cosos, n, "cosos")
+        except (TypeError, ValueError) as e:
+            raise KarelError(str(e)) from None
+        if n == 0:
+            raise KarelError("El enjambre necesita al menos un robot")
+        dentro = (self.x >= 0) & (self.x < self.mundo.ancho) & (self.y >= 0) & (self.y < self.mundo.alto)
+        if not dentro.all():
+            raise KarelError(f"El robot {int(np.argmin(dentro))} empieza fuera del mundo")
+        en_pared = self.mundo.paredes[self.y + 1, self.x + 1] != 0
+        if en_pared.any():
+            raise KarelError(f"El robot {int(np.argmax(en_pared))} empieza en un obstáculo")
+        if ((self.direccion < 0) | (self.direccion > 3)).any():
+            raise KarelError("Las direcciones deben estar entre 0 y 3")
+        if colisiones and len(np.unique(self._celdas())) < n:
+            raise KarelError("Con colisiones cada robot debe empezar en una celda distinta")
+
+        self.colisiones = colisiones
+        self.modo_render = modo_render
+        self.max_pasos = max_pasos
+        self.step = 0
+        self._images = AlmacenFrames()
+        self._traza = []  # (poses [3, n], paso, cambios (xs, ys, cantidades) o None, mundo) de cada paso
+        self._dibujados = 0
+        self._beepers_frame = {(x, y): int(self.mundo.cosos(x, y)) for x, y in self.mundo.posiciones_con_cosos()}
+        self._registrar_paso(None, dibujar=False)
+
+    def __len__(self):
+        return len(self.x)
+
+    @property
+    def posiciones(self):
+        """Arreglo (n, 2) con la posición (x, y) de cada robot"""
+        return np.column_stack([self.x, self.y])
+
+    def _celdas(self):
+        return self.y * self.mundo.ancho + self.x
+
+    # --- Condiciones (un valor por robot) ---
+
+    def _abierto(self, giro):
+        direccion = (self.direccion + giro) & 3
+        return self.mundo.paredes[self.y + 1 + _DY[direccion], self.x + 1 + _DX[direccion]] == 0
+
+    def frente_abierto(self):
+        """Arreglo booleano: si el frente de cada robot está libre de paredes"""
+        return self._abierto(0)
+
+    def frente_bloqueado(self):
+        return ~self._abierto(0)
+
+    def izquierda_abierta(self):
+        return self._abierto(1)
+
+    def derecha_abierta(self):
+        return self._abierto(3)
+
+    def contar_cosos(self):
+        """Arreglo con los cosos de la celda de cada robot"""
+        return self.mundo.beepers[self.y, self.x]
+
+    def hay_coso(self):
+        return self.contar_cosos() > 0
+
+    # --- Paso vectorizado ---
+
+    def _codigos(self, acciones):
+        """Convierte las acciones (nombres o códigos, o una sola para todos) en un arreglo de códigos"""
+        from . import KarelError
+
+        codigos = np.asarray([acciones] if isinstance(acciones, (str, int, np.integer)) else acciones)
+        if codigos.dtype.kind in "UO":
+            codigos = np.array([_CODIGOS.get(a, -1) if isinstance(a, str) else a for a in codigos.tolist()])
+        if codigos.size == 1:
+            codigos = np.full(len(self), codigos.reshape(-1)[0])
+        if codigos.shape != (len(self),):
+            raise KarelError(f"Se esperaba una acción por robot ({len(self)}), no {codigos.size}")
+        if not np.issubdtype(codigos.dtype, np.integer) or ((codigos < 0) | (codigos >= len(ACCIONES))).any():
+            raise KarelError(f"Acción desconocida; opciones: {', '.join(ACCIONES)}")
+        return codigos
+
+    def paso(self, acciones):
+        """
+        Aplica una acción por robot en un solo paso y devuelve el arreglo
+        booleano de los robots que la hicieron (los que chocaron, no tenían
+        cosos para poner o no encontraron cosos para juntar quedan en False).
+
+        ``acciones`` es una secuencia de nombres de ``ACCIONES`` o de sus
+        códigos, o un solo nombre para todos los robots.
+        """
+        from . import LimitePasosExcedido
+
+        codigos = self._codigos(acciones)
+        if self.max_pasos is not None and self.step >= self.max_pasos:
+            raise LimitePasosExcedido(f"¡El enjambre superó el límite de {self.max_pasos} pasos!")
+        exito = codigos == ESPERAR
+
+        izquierda, derecha = codigos == GIRAR_IZQUIERDA, codigos == GIRAR_DERECHA
+        self.direccion[izquierda] = (self.direccion[izquierda] + 1) & 3
+        self.direccion[derecha] = (self.direccion[derecha] + 3) & 3
+        exito |= izquierda | derecha
+
+        mueven = np.flatnonzero(codigos == AVANZAR)
+        if mueven.size:
+            exito[mueven] = self._mover(mueven)
+
+        cambios = self._cambiar_cosos(np.flatnonzero((codigos == PONER_COSO) & (self.cosos > 0)),
+                                      np.flatnonzero(codigos == JUNTAR_COSO), exito)
+        self.step += 1
+        self._registrar_paso(cambios)
+        return exito
+
+    def _mover(self, indices):
+        """Mueve los robots ``indices`` que pueden avanzar y devuelve cuáles se movieron"""
+        direccion = self.direccion[indices]
+        nx, ny = self.x[indices] + _DX[direccion], self.y[indices] + _DY[direccion]
+        libre = self.mundo.paredes[ny + 1, nx + 1] == 0  # El borde de paredes cubre las salidas del mundo
+        if self.colisiones:
+            libre = self._resolver_colisiones(indices, ny * self.mundo.ancho + nx, libre)
+        movidos = indices[libre]
+        self.x[movidos], self.y[movidos] = nx[libre], ny[libre]
+        return libre
+
+    def _resolver_colisiones(self, indices, destino, libre):
+        """
+        Descarta los movimientos que dejarían dos robots en una celda o que
+        intercambian dos robots. Solo se descartan movimientos, así que se
+        repite hasta que no cambie nada (una o dos vueltas en la práctica).
+        """
+        origen = self._celdas()
+        orden = np.argsort(origen)
+        ocupadas = origen[orden]
+        k = np.minimum(np.searchsorted(ocupadas, destino), len(ocupadas) - 1)
+        ocupante = np.where(ocupadas[k] == destino, orden[k], -1)  # Robot en la celda destino
+        lugar = np.full(len(self), -1)
+        lugar[indices] = np.arange(len(indices))  # Posición de cada robot en ``indices``
+        j = np.where(ocupante >= 0, lugar[ocupante], -1)  # Ocupante dentro de ``indices``, si también avanza
+        j_valido = np.maximum(j, 0)
+        vuelve = (j >= 0) & (destino[j_valido] == origen[indices])  # Intercambio de celdas
+
+        ok = libre & ~vuelve
+        while True:
+            # Varios al mismo destino: entra el de menor índice (``indices`` está ordenado)
+            candidatos = np.flatnonzero(ok)
+            _, primeros = np.unique(destino[candidatos], return_index=True)
+            nuevo = np.zeros_like(ok)
+            nuevo[candidatos[primeros]] = True
+            # La celda destino sigue ocupada si su robot no se va
+            nuevo &= (ocupante < 0) | ((j >= 0) & ok[j_valido])
+            if np.array_equal(nuevo, ok):
+                return ok
+            ok = nuevo
+
+    def _cambiar_cosos(self, ponen, juntan, exito):
+        """Aplica los cosos que se ponen y se juntan; devuelve (xs, ys, cantidades) de las celdas cambiadas"""
+        if not (ponen.size or juntan.size):
+            return None
+        ancho = self.mundo.ancho
+        planos = self.mundo.beepers.reshape(-1)
+        celdas_juntan = self.y[juntan] * ancho + self.x[juntan]
+        if juntan.size:
+            # Orden de cada robot entre los que juntan en su celda: solo alcanzan
+            # los cosos para los primeros
+            orden = np.argsort(celdas_juntan, kind="stable")
+            ordenadas = celdas_juntan[orden]
+            rango = np.empty_like(orden)
+            rango[orden] = np.arange(len(orden)) - np.searchsorted(ordenadas, ordenadas)
+            alcanza = rango < planos[celdas_juntan]
+            juntan, celdas_juntan = juntan[alcanza], celdas_juntan[alcanza]
+
+        celdas = np.concatenate([self.y[ponen] * ancho + self.x[ponen], celdas_juntan])
+        if not celdas.size:
+            return None
+        deltas = np.concatenate([np.ones(len(ponen), dtype=np.int64), np.full(len(juntan), -1, dtype=np.int64)])
+        unicas, inversa = np.unique(celdas, return_inverse=True)
+        cantidades = planos[unicas] + np.bincount(inversa, weights=deltas, minlength=len(unicas)).astype(np.int64)
+        ys, xs = np.divmod(unicas, ancho)
+        self.mundo.fijar_cosos_celdas(xs, ys, cantidades)
+        self.cosos[ponen] -= 1
+        self.cosos[juntan] += 1
+        exito[ponen] = True
+        exito[juntan] = True
+        return xs, ys, cantidades
+
+    # --- Frames ---
+
+    def _registrar_paso(self, cambios, dibujar=True):
+        """Guarda las poses del paso actual y lo dibuja si el modo es inmediato"""
+        if self.modo_render == "ninguno":
+            return
+        poses = np.stack([self.x, self.y, self.direccion]).astype(np.int32)
+        self._traza.append((poses, self.step, cambios, self.mundo))
+        if dibujar and self.modo_render == "inmediato":
+            self._materializar()
+
+    def _materializar(self):
+        """Dibuja en orden los pasos pendientes, todos los robots en un solo frame por paso"""
+        for i in range(self._dibujados, len(self._traza)):
+            poses, paso, cambios, mundo = self._traza[i]
+            if cambios is not None:
+                xs, ys, cantidades = cambios
+                self._beepers_frame.update(zip(zip(xs.tolist(), ys.tolist()), cantidades.tolist()))
+            rgb = self._renderizador.renderizar_robots_rgb(poses, self._beepers_frame, mundo, paso)
+            self._images.append(self._renderizador.codificar(rgb))
+            self._dibujados = i + 1
+
+    @property
+    def images(self):
+        """Frames en base64 de cada paso; en modo diferido se dibujan al consultarlos."""
+        self._materializar()
+        return self._images
+
+    def mostrar_ultima_accion(self):
+        """Muestra el frame de la última acción (el último paso del enjambre)."""
+        from . import _mostrar_html
+
+        if self.images:
+            _mostrar_html(f"<img src='data:image/png;base64,{self.images[-1]}' style='width:500px'>")
+
+    def mostrar_animacion(self, delay=500):
+        """Muestra todos los pasos del enjambre como una animación."""
+        from . import _mostrar_html
+
+        if not self.images:
+            _mostrar_html("<p>No hay pasos para mostrar</p>")
+            return
+        unicos, indices = self.images.indexados()  # Cada frame repetido viaja una vez
+        _mostrar_html(html_animacion(unicos, delay, indices))
@@ -0,0 +1,210 @@
+# pykarel_web/exportar.py
+import os
+import struct
+import zlib
+
+import numpy as np
+
+from .render import _chunk_png
+
+FORMATOS = {".gif": "gif", ".png": "apng", ".apng": "apng", ".mp4": "mp4"}
+
+
+def indices_exportados(total, saltar=1):
+    """Índices de los pasos que se exportan: uno de cada ``saltar`` y siempre el último"""
+    indices = list(range(0, total, max(1, saltar)))
+    if indices and indices[-1] != total - 1:
+        indices.append(total - 1)
+    return indices
+
+
+def iterar_frames(traza, beepers_iniciales, renderizador, indices):
+    """
+    Genera uno a uno los frames RGB de los pasos ``indices`` de una traza.
+
+    Los cosos se reconstruyen avanzando por la traza, así que en memoria
+    solo vive el frame que se está entregando.
+    """
+    beepers = dict(beepers_iniciales)
+    pendientes = iter(indices)
+    siguiente = next(pendientes, None)
+    for i, (x, y, direccion, paso, cambio, mundo) in enumerate(traza):
+        if siguiente is None:
+            return
+        if cambio is not None:
+            posicion, cantidad = cambio
+            beepers[posicion] = cantidad
+        if i == siguiente:
+            yield renderizador.renderizar_rgb(x, y, direccion, beepers, mundo, paso)
+            siguiente = next(pendientes, None)
+
+
+def _ajustar(frame, alto, ancho):
+    """Recorta o rellena de blanco un frame para que mida (alto, ancho)"""
+    if frame.shape[:2] == (alto, ancho):
+        return frame
+    lienzo = np.full((alto, ancho, 3), 255, dtype=np.uint8)
+    h, w = min(alto, frame.shape[0]), min(ancho, frame.shape[1])
+    lienzo[:h, :w] = frame[:h, :w]
+    return lienzo
+
+
+def _caja_cambios(anterior, actual):
+    """Rectángulo (fila, columna, alto, ancho) que contiene los píxeles que cambiaron"""
+    distinto = np.any(anterior != actual, axis=2)
+    filas = np.flatnonzero(distinto.any(axis=1))
+    if filas.size == 0:
+        return 0, 0, 1, 1
+    columnas = np.flatnonzero(distinto.any(axis=0))
+    return int(filas[0]), int(columnas[0]), int(filas[-1] - filas[0] + 1), int(columnas[-1] - columnas[0] + 1)
+
+
+def _recortes(frames):
+    """Para cada frame devuelve (frame, (fila, columna, alto, ancho)) del área que cambió"""
+    anterior = None
+    forma = None
+    for frame in frames:
+        if forma is None:
+            forma = frame.shape[:2]
+        frame = _ajustar(np.ascontiguousarray(frame[:, :, :3]), *forma)
+        caja = (0, 0) + forma if anterior is None else _caja_cambios(anterior, frame)
+        yield frame, caja
+        anterior = frame
+
+
+# --- APNG ---
+
+def escribir_apng(archivo, frames, num_frames, delay=500):
+    """Escribe un PNG animado; cada frame solo guarda el rectángulo que cambió"""
+    secuencia = 0
+    for i, (frame, (f, k, alto, ancho)) in enumerate(_recortes(frames)):
+        if i == 0:
+            archivo.write(b"\x89PNG\r\n\x1a\n")
+            archivo.write(_chunk_png(b"IHDR", struct.pack(">IIBBBBB", frame.shape[1], frame.shape[0], 8, 2, 0, 0, 0)))
+            archivo.write(_chunk_png(b"acTL", struct.pack(">II", num_frames, 0)))
+        archivo.write(_chunk_png(b"fcTL", struct.pack(">IIIIIHHBB", secuencia, ancho, alto, k, f, delay, 1000, 0, 0)))
+        secuencia += 1
+        filas = np.zeros((alto, ancho * 3 + 1), dtype=np.uint8)
+        filas[:, 1:] = frame[f:f + alto, k:k + ancho].reshape(alto, ancho * 3)
+        datos = zlib.compress(filas.tobytes(), 6)
+        if i == 0:
+            archivo.write(_chunk_png(b"IDAT", datos))
+        else:
+            archivo.write(_chunk_png(b"fdAT", struct.pack(">I", secuencia) + datos))
+            secuencia += 1
+    archivo.write(_chunk_png(b"IEND", b""))
+
+
+# --- GIF ---
+
+# Paleta fija compartida por todos los frames: cubo de 6x6x6 colores y grises
+_NIVELES = np.array([0, 51, 102, 153, 204, 255], dtype=np.uint8)
+_PALETA = np.zeros((256, 3), dtype=np.uint8)
+_PALETA[:216] = np.stack(np.meshgrid(_NIVELES, _NIVELES, _NIVELES, indexing="ij"), axis=-1).reshape(-1, 3)
+_PALETA[216:] = np.linspace(0, 255, 40).astype(np.uint8)[:, None]
+
+
+def _cuantizar(rgb):
+    """Índices de la paleta fija para cada píxel (gris si R, G y B casi coinciden)"""
+    rgb = rgb.astype(np.int16)
+    cubo = ((rgb + 25) // 51)
+    indices = cubo[..., 0] * 36 + cubo[..., 1] * 6 + cubo[..., 2]
+    gris = (rgb.max(axis=-1) - rgb.min(axis=-1)) < 8
+    nivel_gris = 216 + (rgb.mean(axis=-1) * 39 / 255 + 0.5).astype(np.int16)
+    return np.where(gris, nivel_gris, indices).astype(np.uint8)
+
+
+def _lzw(indices, bits_minimos=8):
+    """Comprime una secuencia de índices con el LZW de los GIF"""
+    limpiar = 1 << bits_minimos
+    fin = limpiar + 1
+    salida = bytearray()
+    acumulado = 0
+    n_bits = 0
+
+    bits = bits_minimos + 1
+    siguiente = fin + 1
+    tabla = {}
+
+    def emitir(codigo):
+        nonlocal acumulado, n_bits
+        acumulado |= codigo << n_bits
+        n_bits += bits
+        while n_bits >= 8:
+            salida.append(acumulado & 0xFF)
+            acumulado >>= 8
+            n_bits -= 8
+
+    emitir(limpiar)
+    datos = indices.tobytes()
+    prefijo = datos[0]
+    for valor in datos[1:]:
+        clave = (prefijo << 8) | valor
+        codigo = tabla.get(clave)
+        if codigo is not None:
+            prefijo = codigo
+            continue
+        emitir(prefijo)
+        if siguiente < 4096:
+            tabla[clave] = siguiente
+            siguiente += 1
+            if siguiente > (1 << bits) and bits < 12:
+                bits += 1
+        else:
+            emitir(limpiar)
+            tabla = {}
+            bits = bits_minimos + 1
+            siguiente = fin + 1
+        prefijo = valor
+    emitir(prefijo)
+    emitir(fin)
+    if n_bits:
+        salida.append(acumulado & 0xFF)
+    return bytes(salida)
+
+
+def escribir_gif(archivo, frames, delay=500):
+    """Escribe un GIF animado con paleta global; cada frame solo guarda el rectángulo que cambió"""
+    centesimas = max(2, round(delay / 10))
+    for i, (frame, (f, k, alto, ancho)) in enumerate(_recortes(frames)):
+        if i == 0:
+            archivo.write(b"GIF89a")
+            archivo.write(struct.pack("<HHBBB", frame.shape[1], frame.shape[0], 0xF7, 0, 0))
+            archivo.write(_PALETA.tobytes())
+            archivo.write(b"\x21\xFF\x0BNETSCAPE2.0\x03\x01\x00\x00\x00")  # Repetir sin fin
+        archivo.write(struct.pack("<BBBBHBB", 0x21, 0xF9, 4, 0x04, centesimas, 0, 0))
+        archivo.write(struct.pack("<BHHHHB", 0x2C, k, f, ancho, alto, 0))
+        archivo.write(b"\x08")
+        datos = _lzw(_cuantizar(frame[f:f + alto, k:k + ancho]).reshape(-1))
+        for inicio in range(0, len(datos), 255):
+            bloque = datos[inicio:inicio + 255]
+            archivo.write(bytes([len(bloque)]) + bloque)
+        archivo.write(b"\x00")
+    archivo.write(b"\x3B")
+
+
+# --- MP4 ---
+
+def escribir_mp4(ruta, frames, delay=500):
+    """Escribe un MP4 con imageio/ffmpeg, enviando los frames uno por uno"""
+    try:
+        import imageio.v2 as imageio
+    except ImportError:
+        raise ImportError("Exportar a MP4 requiere imageio y imageio-ffmpeg: pip install imageio[ffmpeg]") from None
+    with imageio.get_writer(ruta, fps=1000 / delay, macro_block_size=1) as escritor:
+        forma = None
+        for frame in frames:
+            if forma is None:
+                # Los códecs de video requieren dimensiones pares
+                forma = (frame.shape[0] + frame.shape[0] % 2, frame.shape[1] + frame.shape[1] % 2)
+            escritor.append_data(_ajustar(np.ascontiguousarray(frame[:, :, :3]), *forma))
+
+
+def formato_de(ruta, formato=None):
+    """Deduce el formato de exportación a partir de la extensión del archivo"""
+    if formato is not None:
+        return formato
+    extension = os.path.splitext(str(ruta))[1].lower()
+    if extension not in FORMATOS:
+        raise ValueError(f"No se reconoce el formato de '{ruta}'; usa .gif, .png/.apng o .mp4")
+    return FORMATOS[extension]
@@ -0,0 +1,221 @@
+# pykarel_web/frames.py
+import base64
+import hashlib
+import zlib
+from collections.abc import Sequence
+
+import numpy as np
+
+from .render import ancho_png, codificar_png, decodificar_png, reducir
+
+
+def _hash(datos):
+    return hashlib.blake2b(datos, digest_size=16).digest()
+
+
+class AlmacenFrames(Sequence):
+    """
+    Almacén de los frames de una ejecución de Karel.
+
+    Se comporta como una lista de PNGs en base64 (``almacen[i]``,
+    ``almacen[a:b]``, ``len``), pero cada contenido se guarda una sola vez
+    según su hash. Karel dibuja estos frames sin número de paso en el título
+    (ver ``render.titulo``) para que los estados repetidos coincidan.
+
+    Con ``deltas=True`` recibe arreglos RGB en lugar de PNGs: guarda un frame
+    completo cada ``intervalo_clave`` frames y, en los demás, solo los
+    bloques de ``bloque`` x ``bloque`` píxeles que cambiaron respecto al
+    frame anterior. Los bloques repetidos (Karel girando en la misma celda,
+    yendo y viniendo, ...) se comparten. El PNG se reconstruye al pedirlo.
+
+    ``miniaturas`` y ``indexados`` devuelven cada contenido distinto una
+    sola vez junto con el índice de cada frame; las miniaturas se calculan
+    al pedirlas y se guardan por contenido.
+
+    Parámetros:
+    -----------
+    deltas : bool
+        Guardar solo los bloques que cambian entre frames
+    intervalo_clave : int
+        Cada cuántos frames se guarda un frame completo (modo deltas)
+    bloque : int
+        Tamaño en píxeles de los bloques comparados (modo deltas)
+    """
+
+    def __init__(self, deltas=False, intervalo_clave=50, bloque=32):
+        self.deltas = deltas
+        self.intervalo_clave = intervalo_clave
+        self.bloque = bloque
+        self._unicos = {}  # hash -> PNG en base64, o bloque RGB comprimido con zlib
+        self._frames = []  # hash del PNG, o (completo, [(fila, columna, alto, ancho, hash), ...])
+        self._anterior = None  # Último frame RGB agregado (modo deltas)
+        self._cache = (None, None)  # (índice, RGB) del último frame reconstruido
+        self._miniaturas = {}  # (clave del contenido, ancho) -> miniatura en base64
+
+    @classmethod
+    def desde_lista(cls, imagenes):
+        """Crea un almacén sin deltas a partir de una lista de PNGs en base64"""
+        almacen = cls()
+        for imagen in imagenes:
+            almacen.append(imagen)
+        return almacen
+
+    def _guardar(self, datos, comprimir=False):
+        clave = _hash(datos)
+        if clave not in self._unicos:
+            self._unicos[clave] = zlib.compress(datos, 1) if comprimir else datos
+        return clave
+
+    def append(self, frame):
+        """Agrega un frame: PNG en base64, o arreglo RGB uint8 si ``deltas`` está activo"""
+        if not self.deltas:
+            clave = _hash(frame.encode('ascii'))
+            self._unicos.setdefault(clave, frame)
+            self._frames.append(clave)
+            return
+
+        frame = np.ascontiguousarray(frame[:, :, :3], dtype=np.uint8)
+        completo = (self._anterior is None or frame.shape != self._anterior.shape
+                    or len(self._frames) % self.intervalo_clave == 0)
+        if completo:
+            parches = [(0, 0, frame.shape[0], frame.shape[1], self._guardar(frame.tobytes(), True))]
+        else:
+            parches = [(f, k, b.shape[0], b.shape[1], self._guardar(b.tobytes(), True))
+                       for f, k, b in self._bloques_cambiados(self._anterior, frame)]
+        self._frames.append((completo, parches))
+        self._anterior = frame
+
+    def truncar(self, n):
+        """
+        Descarta los frames desde el índice ``n`` (el siguiente frame con
+        deltas será completo) y los contenidos que ya no usa ningún frame.
+        """
+        if n >= len(self._frames):
+            return
+        del self._frames[n:]
+        if self.deltas:
+            usados = {parche[4] for _, parches in self._frames for parche in parches}
+        else:
+            usados = set(self._frames)
+        self._unicos = {clave: datos for clave, datos in self._unicos.items() if clave in usados}
+        # Con deltas las miniaturas van por el hash del RGB, que no se conserva
+        self._miniaturas = {} if self.deltas else {clave: miniatura for clave, miniatura in self._miniaturas.items()
+                                                    if clave[0] in usados}
+        self._anterior = None
+        if self._cache[0] is not None and self._cache[0] >= n:
+            self._cache = (None, None)
+
+    def _bloques_cambiados(self, anterior, actual):
+        """Devuelve (fila, columna, bloque) de cada bloque que difiere entre dos frames"""
+        b = self.bloque
+        alto, ancho = actual.shape[:2]
+        distinto = np.any(anterior != actual, axis=2)
+        filas, columnas = -(-alto // b), -(-ancho // b)
+        relleno = np.zeros((filas * b, columnas * b), dtype=bool)
+        relleno[:alto, :ancho] = distinto
+        cambiados = relleno.reshape(filas, b, columnas, b).any(axis=(1, 3))
+        for i, j in zip(*np.nonzero(cambiados)):
+            f, k = int(i) * b, int(j) * b
+            yield f, k, actual[f:f + b, k:k + b]
+
+    def _bloque(self, alto, ancho, clave):
+        return np.frombuffer(zlib.decompress(self._unicos[clave]), dtype=np.uint8).reshape(alto, ancho, 3)
+
+    def _reconstruir_rgb(self, indice):
+        """Reconstruye el frame RGB ``indice`` a partir del frame completo anterior"""
+        inicio = indice
+        while not self._frames[inicio][0]:
+            inicio -= 1
+
+        # Recorrer los frames en orden solo aplica los parches de un paso
+        indice_cache, rgb_cache = self._cache
+        img = None
+        if indice_cache is not None and inicio <= indice_cache <= indice:
+            inicio, img = indice_cache + 1, rgb_cache.copy()
+
+        for completo, parches in self._frames[inicio:indice + 1]:
+            for f, k, alto, ancho, clave in parches:
+                if completo:
+                    img = self._bloque(alto, ancho, clave).copy()
+                else:
+                    img[f:f + alto, k:k + ancho] = self._bloque(alto, ancho, clave)
+        self._cache = (indice, img)
+        return img
+
+    def __len__(self):
+        return len(self._frames)
+
+    def __getitem__(self, indice):
+        if isinstance(indice, slice):
+            return [self[i] for i in range(*indice.indices(len(self)))]
+        if indice < 0:
+            indice += len(self)
+        if not 0 <= indice < len(self):
+            raise IndexError("Índice de frame fuera de rango")
+        if not self.deltas:
+            return self._unicos[self._frames[indice]]
+        return base64.b64encode(codificar_png(self._reconstruir_rgb(indice))).decode('utf-8')
+
+    def _distintos(self):
+        """
+        Devuelve ([(clave, RGB o None), ...] de cada contenido distinto en
+        orden de aparición, índice en esa lista de cada frame). Con deltas
+        los frames se reconstruyen en orden y la clave es el hash del RGB.
+        """
+        posiciones, distintos, indices = {}, [], []
+        for i, clave in enumerate(self._frames):
+            rgb = None
+            if self.deltas:
+                rgb = self._reconstruir_rgb(i)
+                clave = _hash(rgb.tobytes())
+            if clave not in posiciones:
+                posiciones[clave] = len(distintos)
+                distintos.append((clave, rgb))
+            indices.append(posiciones[clave])
+        return distintos, indices
+
+    def indexados(self):
+        """
+        Devuelve (PNGs únicos en base64, índice en esa lista de cada frame),
+        así un visor envía cada contenido una sola vez.
+        """
+        distintos, indices = self._distintos()
+        return [self._unicos[clave] if rgb is None else base64.b64encode(codificar_png(rgb)).decode('utf-8')
+                for clave, rgb in distintos], indices
+
+    def miniaturas(self, ancho):
+        """
+        Devuelve (miniaturas únicas en base64, índice de cada frame) como
+        ``indexados``. Los frames de menos del doble de ``ancho`` se usan
+        tal cual (el navegador los achica); los demás se reducen tomando
+        uno de cada n píxeles. Cada miniatura se calcula una vez por contenido.
+        """
+        distintos, indices = self._distintos()
+        miniaturas = []
+        for clave, rgb in distintos:
+            if (clave, ancho) not in self._miniaturas:
+                self._miniaturas[(clave, ancho)] = self._miniatura(clave, rgb, ancho)
+            miniaturas.append(self._miniaturas[(clave, ancho)])
+        return miniaturas, indices
+
+    def _miniatura(self, clave, rgb, ancho):
+        if rgb is None:
+            png = self._unicos[clave]
+            datos = base64.b64decode(png)
+            if ancho_png(datos) < 2 * ancho:
+                return png
+            try:
+                rgb = decodificar_png(datos)
+            except ValueError:
+                return png  # Un PNG asignado a mano que no sabemos decodificar
+        elif rgb.shape[1] < 2 * ancho:
+            return base64.b64encode(codificar_png(rgb)).decode('utf-8')
+        return base64.b64encode(codificar_png(reducir(rgb, ancho))).decode('utf-8')
+
+    def estadisticas(self):
+        """Devuelve cuántos frames hay, cuántos contenidos únicos y los bytes que ocupan"""
+        return {
+            "frames": len(self._frames),
+            "unicos": len(self._unicos),
+            "bytes": sum(len(datos) for datos in self._unicos.values()),
+        }
@@ -0,0 +1,265 @@
+# pykarel_web/generador.py
+import random
+from functools import lru_cache
+
+import numpy as np
+
+from .mundo import Mundo
+
+# Mundos con nombre; cada matriz está indexada [y][x] y 1 es obstáculo
+MUNDOS_PREDEFINIDOS = {
+    "default": [
+        [0,0,0,0,0],
+        [0,0,0,0,0],
+        [0,0,0,0,0],
+        [0,0,0,0,0],
+        [0,0,0,0,0]
+    ],
+    "obstaculos": [
+        [0,1,0,1,0],
+        [1,0,1,0,1],
+        [0,1,0,1,0],
+        [1,0,1,0,1],
+        [0,1,0,1,0]
+    ],
+    "laberinto": [
+        [0,1,0,0,0],
+        [0,1,1,1,0],
+        [0,0,0,1,0],
+        [1,1,0,1,0],
+        [0,0,0,1,0]
+    ],
+    "laberinto_complejo": [
+        [0,0,1,1,1,1,1,1,1,1,1,1,1,1,1],
+        [1,0,0,0,0,0,0,0,0,0,1,0,0,0,1],
+        [1,1,1,1,1,1,1,1,1,0,1,0,1,0,1],
+        [1,0,0,0,0,0,0,0,0,0,1,0,1,0,1],
+        [1,0,1,1,1,1,1,1,1,1,1,0,1,0,1],
+        [1,0,1,0,0,0,0,0,0,0,0,0,1,0,1],
+        [1,0,1,0,1,1,1,1,1,1,1,1,1,0,1],
+        [1,0,1,0,1,0,0,0,0,0,0,0,0,0,1],
+        [1,0,1,0,1,0,1,1,1,1,1,1,1,1,1],
+        [1,0,1,0,1,0,0,0,0,0,1,0,0,0,1],
+        [1,0,1,0,1,1,1,1,1,0,1,0,1,0,1],
+        [1,0,1,0,0,0,0,0,1,0,1,0,1,0,1],
+        [1,0,1,1,1,1,1,0,1,0,1,0,1,0,1],
+        [1,0,0,0,0,0,0,0,1,0,0,0,1,0,0],
+        [1,1,1,1,1,1,1,1,1,1,1,1,1,1,0]
+    ],
+    "cosos": [
+        [0,2,0,3,0],
+        [1,0,4,0,5],
+        [0,6,0,7,0],
+        [8,0,9,0,10],
+        [0,11,0,12,0]
+    ],
+    "complejo": [
+        [0,1,0,1,0,1],
+        [1,0,1,0,1,0],
+        [0,1,0,1,0,1],
+        [1,0,1,0,1,0],
+        [0,1,0,1,0,1],
+        [1,0,1,0,1,0]
+    ],
+    "recta": [
+        [0,0,0,0,0,0,0,0,0,0,0,0,0,0,0,0,0,0,0,0],
+        [0,1,1,1,1,1,1,1,1,1,1,1,1,1,1,1,1,1,1,0],
+        [0,0,0,0,0,0,0,0,0,0,0,0,0,0,0,0,0,0,0,0]
+    ],
+}
+
+MAX_LADO = 1000
+
+
+def _laberinto_backtracking(ancho, alto, rng):
+    """Laberinto perfecto por búsqueda en profundidad iterativa (pasillos largos)"""
+    celdas = np.ones((alto, ancho), dtype=np.int8)
+    celdas[0, 0] = 0
+    azar = random.Random(int(rng.integers(2 ** 63)))
+    pila = [(0, 0)]
+    while pila:
+        x, y = pila[-1]
+        vecinos = [(x + dx, y + dy, x + dx // 2, y + dy // 2)
+                   for dx, dy in ((2, 0), (0, 2), (-2, 0), (0, -2))
+                   if 0 <= x + dx < ancho and 0 <= y + dy < alto and celdas[y + dy, x + dx]]
+        if not vecinos:
+            pila.pop()
+            continue
+        nx, ny, mx, my = azar.choice(vecinos)
+        celdas[my, mx] = 0
+        celdas[ny, nx] = 0
+        pila.append((nx, ny))
+    return celdas
+
+
+def _laberinto_arbol_binario(ancho, alto, rng):
+    """Laberinto perfecto de árbol binario: cada celda abre al este o al norte (vectorizado)"""
+    celdas = np.ones((alto, ancho), dtype=np.int8)
+    nodos_x = np.arange(0, ancho, 2)
+    nodos_y = np.arange(0, alto, 2)
+    celdas[np.ix_(nodos_y, nodos_x)] = 0
+
+    # En la última fila de nodos solo se puede abrir al este y en la última
+    # columna solo al norte; el nodo de la esquina no abre nada
+    puede_este = nodos_x + 2 < ancho
+    puede_norte = nodos_y + 2 < alto
+    al_este = rng.random((len(nodos_y), len(nodos_x))) < 0.5
+    al_este |= ~puede_norte[:, None]
+    al_este &= puede_este[None, :]
+    al_norte = ~al_este & puede_norte[:, None]
+
+    ys, xs = np.nonzero(al_este)
+    celdas[nodos_y[ys], nodos_x[xs] + 1] = 0
+    ys, xs = np.nonzero(al_norte)
+    celdas[nodos_y[ys] + 1, nodos_x[xs]] = 0
+    return celdas
+
+
+ALGORITMOS_LABERINTO = {
+    "backtracking": _laberinto_backtracking,
+    "arbol_binario": _laberinto_arbol_binario,
+}
+
+
+def _generar_laberinto(ancho, alto, rng, algoritmo="backtracking"):
+    if algoritmo not in ALGORITMOS_LABERINTO:
+        raise ValueError(f"Algoritmo de laberinto desconocido: {algoritmo}. "
+                         f"Opciones: {', '.join(ALGORITMOS_LABERINTO)}")
+    return ALGORITMOS_LABERINTO[algoritmo](ancho, alto, rng)
+
+
+def _generar_obstaculos(ancho, alto, rng, densidad=0.25):
+    if not 0 <= densidad < 1:
+        raise ValueError("La densidad de obstáculos debe estar en [0, 1)")
+    celdas = (rng.random((alto, ancho)) < densidad).astype(np.int8)
+    celdas[0, 0] = 0  # Karel empieza por defecto en (0, 0)
+    return celdas
+
+
+def _generar_habitacion(ancho, alto, rng):
+    return np.zeros((alto, ancho), dtype=np.int8)
+
+
+GENERADORES = {
+    "laberinto": _generar_laberinto,
+    "obstaculos": _generar_obstaculos,
+    "habitacion": _generar_habitacion,
+}
+
+
+def colocar_cosos(mundo, cantidad=0, densidad=None, max_por_celda=1, semilla=None):
+    """
+    Reparte cosos al azar en las celdas libres de un Mundo (lo modifica).
+
+    Parámetros:
+    -----------
+    mundo : Mundo
+        Mundo donde se colocan los cosos
+    cantidad : int
+        Número de celdas con cosos (se ignora si se da ``densidad``)
+    densidad : float o None
+        Fracción de las celdas libres que reciben cosos
+    max_por_celda : int
+        Cada celda elegida recibe entre 1 y ``max_por_celda`` cosos
+    semilla : int, numpy.random.Generator o None
+        Semilla para reproducir la misma distribución
+    """
+    rng = np.random.default_rng(semilla)
+    libres = np.flatnonzero(mundo.celdas.reshape(-1) != 1)
+    if densidad is not None:
+        cantidad = int(round(densidad * len(libres)))
+    cantidad = min(cantidad, len(libres))
+    if cantidad <= 0:
+        return mundo
+    elegidas = rng.choice(libres, size=cantidad, replace=False)
+    mundo.beepers.reshape(-1)[elegidas] = rng.integers(1, max_por_celda + 1, size=cantidad)
+    return mundo
+
+
+def cosos_iniciales(mundo):
+    """
+    Cosos {(x, y): cantidad} con los que empiezan los mundos predefinidos y
+    las matrices (los mundos generados traen los suyos).
+    """
+    if mundo.alto == 15 and mundo.ancho == 15:
+        # Probablemente el laberinto complejo
+        return {(14, 14): 1}  # Salida con un coso
+
+    return {
+        (2, 2): 5,
+        (3, 4): 3,
+        (0, 0): 1
+    }
+
+
+def generar_mundo(generador="laberinto", ancho=21, alto=21, semilla=None, cosos=0, densidad_cosos=None,
+                  max_por_celda=1, **opciones):
+    """
+    Genera un Mundo al azar; la misma semilla produce siempre el mismo mundo.
+
+    Parámetros:
+    -----------
+    generador : str
+        "laberinto" (opción ``algoritmo``: "backtracking" o "arbol_binario"),
+        "obstaculos" (opción ``densidad``) o "habitacion" (sin paredes)
+    ancho, alto : int
+        Tamaño del mundo en celdas (hasta MAX_LADO); en los laberintos los
+        pasillos están en las coordenadas pares, así que conviene usar
+        tamaños impares
+    semilla : int o None
+        Semilla del generador de números aleatorios
+    cosos, densidad_cosos, max_por_celda :
+        Cosos a repartir en las celdas libres (ver ``colocar_cosos``)
+    """
+    if generador not in GENERADORES:
+        raise ValueError(f"Generador de mundos desconocido: {generador}. Opciones: {', '.join(GENERADORES)}")
+    if not (1 <= ancho <= MAX_LADO and 1 <= alto <= MAX_LADO):
+        raise ValueError(f"El tamaño del mundo debe estar entre 1 y {MAX_LADO} celdas por lado")
+    rng = np.random.default_rng(semilla)
+    mundo = Mundo(GENERADORES[generador](ancho, alto, rng, **opciones))
+    return colocar_cosos(mundo, cosos, densidad_cosos, max_por_celda, rng)
+
+
+def _clave(espec):
+    """Convierte un nombre o un dict de parámetros en una llave hashable para la caché"""
+    if isinstance(espec, str):
+        return espec if espec in MUNDOS_PREDEFINIDOS else "default"
+    return tuple(sorted(espec.items()))
+
+
+@lru_cache(maxsize=32)
+def _plantilla(clave):
+    if isinstance(clave, str):
+        return Mundo(MUNDOS_PREDEFINIDOS[clave])
+    return generar_mundo(**dict(clave))
+
+
+def obtener_mundo(espec):
+    """
+    Devuelve un Mundo nuevo a partir de un nombre predefinido o de los
+    parámetros de ``generar_mundo``.
+
+    Los mundos se guardan en una caché LRU según sus parámetros, así que
+    volver a pedir el mismo mundo (un nuevo ``Karel`` o ``reiniciar``) solo
+    copia los arreglos. Los nombres desconocidos dan el mundo "default".
+    Un dict sin ``semilla`` genera un mundo distinto cada vez y no se guarda.
+
+    Parámetros:
+    -----------
+    espec : str o dict
+        Nombre de ``MUNDOS_PREDEFINIDOS`` o, por ejemplo,
+        ``{"generador": "laberinto", "ancho": 101, "alto": 101, "semilla": 7}``
+    """
+    if isinstance(espec, dict) and espec.get("semilla") is None:
+        return generar_mundo(**espec)
+    return _plantilla(_clave(espec)).copia()
+
+
+def limpiar_cache():
+    """Vacía la caché de mundos generados"""
+    _plantilla.cache_clear()
+
+
+def info_cache():
+    """Aciertos, fallos y tamaño de la caché de mundos (``functools.lru_cache``)"""
+    return _plantilla.cache_info()
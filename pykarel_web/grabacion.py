@@ -0,0 +1,284 @@
+# pykarel_web/grabacion.py
+import base64
+import bisect
+import io
+import json
+from array import array
+
+import numpy as np
+
+from .mundo import Mundo
+from .render import codificar_png, crear_renderizador
+
+# Código de operación de cada paso grabado
+INICIO, AVANZAR, GIRAR_IZQUIERDA, PONER_COSO, JUNTAR_COSO, COLOCAR_COSOS, CAMBIAR_MUNDO = range(7)
+NOMBRES_OPERACIONES = ("inicio", "avanzar", "girar_izquierda", "poner_coso", "juntar_coso",
+                       "colocar_cosos_en_posicion", "crear_mundo_personalizado")
+
+FORMATO_VERSION = 1
+
+
+class Grabacion:
+    """
+    Registro compacto de una ejecución de Karel que se puede guardar y reproducir.
+
+    Por cada paso guarda el código de la acción, la pose resultante
+    (x, y, dirección, cosos en la bolsa) y, si la acción cambió los cosos
+    de una celda, la nueva cantidad de esa celda. Los mundos se guardan una
+    vez cada uno. Es lo que usa ``Karel(..., grabar=True)``; los cambios de
+    cosos hechos fuera de las acciones (``karel.beepers[...] = n``) no se
+    graban.
+
+    Para dibujar el paso ``n`` se parte del último estado clave de los
+    cosos y se aplican los cambios posteriores. Hay un estado clave cada
+    ``intervalo_clave`` cambios (o cada tantos cambios como cosos haya, si
+    son más, para que los estados clave no ocupen más que los cambios), así
+    que el costo no depende del largo de la ejecución.
+
+    Parámetros:
+    -----------
+    beepers_iniciales : dict
+        Cosos {(x, y): cantidad} antes del primer paso
+    paso_inicial : int
+        Número de paso del primer registro
+    intervalo_clave : int
+        Cada cuántos cambios de cosos se guarda un estado clave
+    """
+
+    def __init__(self, beepers_iniciales=None, paso_inicial=0, intervalo_clave=64):
+        self.beepers_iniciales = {posicion: cantidad for posicion, cantidad in (beepers_iniciales or {}).items()
+                                  if cantidad}
+        self.paso_inicial = paso_inicial
+        self.intervalo_clave = intervalo_clave
+        self._operaciones = array("B")
+        self._poses = array("i")  # x, y, dirección, cosos de cada paso
+        self._cambios = array("i")  # paso, x, y, cantidad de cada cambio de cosos
+        self._pasos_cambios = array("i")  # Solo el paso de cada cambio, para bisect
+        self._mundos = []  # Celdas de cada mundo distinto
+        self._cambios_mundo = []  # (paso, índice en _mundos)
+        self._ultima_clave = None  # ``Mundo.clave`` del último paso
+        self._claves = [0]  # Número de cambios aplicados en cada estado clave
+        self._beepers_clave = [self.beepers_iniciales]  # Cosos de cada estado clave
+        self._cache_mundos = {}
+        self._renderizadores = {}
+
+    def __len__(self):
+        return len(self._operaciones)
+
+    def __getstate__(self):
+        estado = dict(self.__dict__)
+        estado["_cache_mundos"] = {}
+        estado["_renderizadores"] = {}
+        return estado
+
+    def registrar(self, operacion, x, y, direccion, cosos, cambio=None, mundo=None):
+        """Agrega un paso; ``cambio`` es ``((x, y), cantidad)`` y ``mundo`` el Mundo del paso"""
+        i = len(self._operaciones)
+        if mundo is not None and mundo.clave != self._ultima_clave:
+            self._ultima_clave = mundo.clave
+            if not self._mundos or not np.array_equal(self._mundos[self._cambios_mundo[-1][1]], mundo.celdas):
+                self._mundos.append(mundo.celdas)
+                self._cambios_mundo.append((i, len(self._mundos) - 1))
+        self._operaciones.append(operacion)
+        self._poses.extend((x, y, direccion, cosos))
+        if cambio is not None:
+            (cx, cy), cantidad = cambio
+            self._cambios.extend((i, cx, cy, cantidad))
+            self._pasos_cambios.append(i)
+
+    def truncar(self, n):
+        """Descarta los pasos desde el índice ``n``"""
+        if n >= len(self):
+            return
+        del self._operaciones[n:]
+        del self._poses[4 * n:]
+        c = bisect.bisect_left(self._pasos_cambios, n)
+        del self._cambios[4 * c:]
+        del self._pasos_cambios[c:]
+        while self._cambios_mundo and self._cambios_mundo[-1][0] >= n:
+            self._cambios_mundo.pop()
+        del self._mundos[self._cambios_mundo[-1][1] + 1 if self._cambios_mundo else 0:]
+        for indice in [i for i in self._cache_mundos if i >= len(self._mundos)]:
+            del self._cache_mundos[indice]
+        k = bisect.bisect_right(self._claves, c)
+        del self._claves[k:]
+        del self._beepers_clave[k:]
+        self._ultima_clave = None
+
+    def operacion(self, n):
+        """Nombre de la acción del paso ``n``"""
+        return NOMBRES_OPERACIONES[self._operaciones[n]]
+
+    def _indice(self, n):
+        if n < 0:
+            n += len(self)
+        if not 0 <= n < len(self):
+            raise IndexError("Paso fuera de la grabación")
+        return n
+
+    def _clave(self, hasta):
+        """Devuelve (cambios aplicados, cosos) del último estado clave antes del cambio ``hasta``"""
+        while True:
+            aplicados, beepers = self._claves[-1], self._beepers_clave[-1]
+            siguiente = aplicados + max(self.intervalo_clave, len(beepers))
+            if siguiente > hasta:
+                break
+            beepers = dict(beepers)
+            self._aplicar(beepers, aplicados, siguiente)
+            self._claves.append(siguiente)
+            self._beepers_clave.append(beepers)
+        k = bisect.bisect_right(self._claves, hasta) - 1
+        return self._claves[k], self._beepers_clave[k]
+
+    def _aplicar(self, beepers, desde, hasta):
+        cambios = self._cambios
+        for c in range(desde, hasta):
+            x, y, cantidad = cambios[4 * c + 1], cambios[4 * c + 2], cambios[4 * c + 3]
+            if cantidad:
+                beepers[(x, y)] = cantidad
+            else:
+                beepers.pop((x, y), None)
+
+    def _mundo(self, n):
+        j = bisect.bisect_right(self._cambios_mundo, (n, float("inf"))) - 1
+        indice = self._cambios_mundo[j][1]
+        if indice not in self._cache_mundos:
+            self._cache_mundos[indice] = Mundo(self._mundos[indice])
+        return self._cache_mundos[indice]
+
+    def estado(self, n):
+        """Devuelve (x, y, dirección, cosos, paso, beepers, mundo) después del paso ``n``"""
+        n = self._indice(n)
+        hasta = bisect.bisect_right(self._pasos_cambios, n)
+        aplicados, beepers = self._clave(hasta)
+        beepers = dict(beepers)
+        self._aplicar(beepers, aplicados, hasta)
+        x, y, direccion, cosos = self._poses[4 * n:4 * n + 4]
+        return x, y, direccion, cosos, self.paso_inicial + n, beepers, self._mundo(n)
+
+    def renderizar_rgb(self, n, renderizador="numpy", calidad="animacion"):
+        """
+        Dibuja el paso ``n`` y devuelve el arreglo RGB (``renderizador`` es
+        un nombre o una instancia; ``calidad`` solo se usa con un nombre)
+        """
+        if isinstance(renderizador, str):
+            if (renderizador, calidad) not in self._renderizadores:
+                self._renderizadores[renderizador, calidad] = crear_renderizador(renderizador, calidad)
+            renderizador = self._renderizadores[renderizador, calidad]
+        x, y, direccion, _, paso, beepers, mundo = self.estado(n)
+        return renderizador.renderizar_rgb(x, y, direccion, beepers, mundo, paso)
+
+    def frame(self, n, renderizador="numpy", calidad="animacion"):
+        """Dibuja el paso ``n`` y lo devuelve como PNG en base64"""
+        return base64.b64encode(codificar_png(self.renderizar_rgb(n, renderizador, calidad))).decode("utf-8")
+
+    def traza(self):
+        """Genera las instantáneas (x, y, dirección, paso, cambio, mundo) que usan el visor y la exportación"""
+        c = 0
+        cambios = self._cambios
+        for n in range(len(self)):
+            cambio = None
+            if c < len(self._pasos_cambios) and self._pasos_cambios[c] == n:
+                cambio = ((cambios[4 * c + 1], cambios[4 * c + 2]), cambios[4 * c + 3])
+                c += 1
+            yield (self._poses[4 * n], self._poses[4 * n + 1], self._poses[4 * n + 2],
+                   self.paso_inicial + n, cambio, self._mundo(n))
+
+    def reproducir(self, karel, hasta=None):
+        """
+        Vuelve a ejecutar las acciones grabadas en ``karel`` (que debe estar
+        en el estado del paso 0, por ejemplo con ``Karel.desde_grabacion(g, 0)``).
+
+        Lanza ValueError si la pose de Karel deja de coincidir con la grabada.
+        """
+        hasta = len(self) if hasta is None else min(hasta, len(self))
+        c = bisect.bisect_left(self._pasos_cambios, 1)
+        for n in range(1, hasta):
+            operacion = self._operaciones[n]
+            if operacion == AVANZAR:
+                karel.avanzar()
+            elif operacion == GIRAR_IZQUIERDA:
+                karel.girar_izquierda()
+            elif operacion == PONER_COSO:
+                karel.poner_coso()
+            elif operacion == JUNTAR_COSO:
+                karel.juntar_coso()
+            elif operacion == COLOCAR_COSOS:
+                x, y, cantidad = self._cambios[4 * c + 1:4 * c + 4]
+                karel.colocar_cosos_en_posicion(x, y, cantidad - karel.mundo.cosos(x, y))
+            elif operacion == CAMBIAR_MUNDO:
+                karel.crear_mundo_personalizado(self._mundo(n).celdas)
+            if c < len(self._pasos_cambios) and self._pasos_cambios[c] == n:
+                c += 1
+            if (karel.x, karel.y, karel.direction, karel.cosos) != tuple(self._poses[4 * n:4 * n + 4]):
+                raise ValueError(f"La reproducción se desvió de la grabación en el paso {n}")
+        return karel
+
+    # --- Serialización ---
+
+    def a_dict(self):
+        """Devuelve la grabación como diccionario serializable a JSON"""
+        return {
+            "version": FORMATO_VERSION,
+            "paso_inicial": self.paso_inicial,
+            "intervalo_clave": self.intervalo_clave,
+            "beepers_iniciales": [[x, y, cantidad] for (x, y), cantidad in self.beepers_iniciales.items()],
+            "mundos": [celdas.tolist() for celdas in self._mundos],
+            "cambios_mundo": [list(cambio) for cambio in self._cambios_mundo],
+            "operaciones": self._operaciones.tolist(),
+            "poses": self._poses.tolist(),
+            "cambios": self._cambios.tolist(),
+        }
+
+    @classmethod
+    def desde_dict(cls, datos):
+        """Crea una grabación a partir de ``a_dict``"""
+        if datos.get("version") != FORMATO_VERSION:
+            raise ValueError(f"Versión de grabación no soportada: {datos.get('version')}")
+        grabacion = cls({(x, y): cantidad for x, y, cantidad in datos["beepers_iniciales"]},
+                        datos["paso_inicial"], datos["intervalo_clave"])
+        grabacion._mundos = [np.array(celdas, dtype=np.int32) for celdas in datos["mundos"]]
+        grabacion._cambios_mundo = [tuple(cambio) for cambio in datos["cambios_mundo"]]
+        grabacion._operaciones = array("B", datos["operaciones"])
+        grabacion._poses = array("i", datos["poses"])
+        grabacion._cambios = array("i", datos["cambios"])
+        grabacion._pasos_cambios = grabacion._cambios[0::4]
+        return grabacion
+
+    def guardar(self, ruta):
+        """
+        Guarda la grabación en ``ruta``: JSON si termina en ".json", si no
+        un archivo binario comprimido (``numpy.savez_compressed``).
+        """
+        if str(ruta).endswith(".json"):
+            with open(ruta, "w") as archivo:
+                json.dump(self.a_dict(), archivo, separators=(",", ":"))
+            return
+        datos = self.a_dict()
+        arreglos = {
+            "operaciones": np.frombuffer(self._operaciones, dtype=np.uint8),
+            "poses": np.frombuffer(self._poses, dtype=np.int32),
+            "cambios": np.frombuffer(self._cambios, dtype=np.int32),
+        }
+        for i, celdas in enumerate(self._mundos):
+            arreglos[f"mundo_{i}"] = celdas
+        for nombre in list(arreglos) + ["mundos"]:
+            datos.pop(nombre, None)
+        datos["num_mundos"] = len(self._mundos)
+        arreglos["meta"] = np.frombuffer(json.dumps(datos).encode("utf-8"), dtype=np.uint8)
+        with open(ruta, "wb") as archivo:
+            np.savez_compressed(archivo, **arreglos)
+
+    @classmethod
+    def cargar(cls, ruta):
+        """Lee una grabación escrita con ``guardar``"""
+        if str(ruta).endswith(".json"):
+            with open(ruta) as archivo:
+                return cls.desde_dict(json.load(archivo))
+        with open(ruta, "rb") as archivo:
+            contenido = np.load(io.BytesIO(archivo.read()), allow_pickle=False)
+            datos = json.loads(contenido["meta"].tobytes().decode("utf-8"))
+            datos["mundos"] = [contenido[f"mundo_{i}"] for i in range(datos.pop("num_mundos"))]
+            for nombre in ("operaciones", "poses", "cambios"):
+                datos[nombre] = contenido[nombre].tolist()
+        return cls.desde_dict(datos)
@@ -0,0 +1,158 @@
+# pykarel_web/lote.py
+import os
+import sys
+import time
+from collections import namedtuple
+
+ResultadoEjecucion = namedtuple(
+    "ResultadoEjecucion",
+    ["programa", "mundo", "exito", "error", "mensaje", "pasos", "beepers", "x", "y", "direccion", "cosos", "tiempo",
+     "grabacion"],
+    defaults=(None,),
+)
+ResultadoEjecucion.__doc__ = """Resultado de ejecutar un programa de Karel en un mundo.
+
+``error`` es el nombre de la clase de la excepción (por ejemplo
+``"KarelError"`` o ``"LimitePasosExcedido"``) o ``None`` si el programa
+terminó sin errores; ``tiempo`` es el tiempo de pared en segundos;
+``grabacion`` es la Grabacion de la ejecución si se pidió ``grabar=True``
+en las opciones de Karel.
+"""
+
+
+def _nombre_programa(programa):
+    return getattr(programa, "__name__", repr(programa))
+
+
+def _normalizar_mundos(mundos):
+    """Devuelve una lista de pares (nombre, mundo) a partir de nombres, matrices o un dict"""
+    if isinstance(mundos, dict):
+        return list(mundos.items())
+    normalizados = []
+    for i, mundo in enumerate(mundos):
+        if isinstance(mundo, str):
+            normalizados.append((mundo, mundo))
+        else:
+            normalizados.append((f"mundo_{i}", mundo))
+    return normalizados
+
+
+def ejecutar_programa(programa, mundo, nombre_mundo=None, max_pasos=10000, verificar=None, compilado=False,
+                      **opciones_karel):
+    """
+    Ejecuta un programa sobre un Karel sin render y devuelve un ResultadoEjecucion.
+
+    Parámetros:
+    -----------
+    programa : callable
+        Función que recibe el objeto Karel y ejecuta las acciones
+    mundo : str, dict o list
+        Nombre de un mundo predefinido, parámetros de ``generar_mundo`` o
+        matriz personalizada
+    nombre_mundo : str
+        Etiqueta del mundo en el resultado
+    max_pasos : int
+        Límite de acciones para detectar ciclos infinitos
+    verificar : callable o None
+        Función que recibe el Karel final y devuelve True si la solución es correcta
+    compilado : bool
+        Ejecutar el programa con ``compilador.compilar``; si no se puede
+        compilar, el resultado lleva el error (ValueError)
+    opciones_karel : dict
+        Parámetros adicionales para Karel (x_inicial, cosos_iniciales, ...)
+    """
+    from . import Karel
+    from .compilador import compilar
+
+    inicio = time.perf_counter()
+    karel = None
+    error = mensaje = None
+    try:
+        karel = Karel(mundo, modo_render="ninguno", max_pasos=max_pasos, **opciones_karel)
+        (compilar(programa) if compilado else programa)(karel)
+        if verificar is not None and not verificar(karel):
+            error, mensaje = "VerificacionFallida", "El estado final no es el esperado"
+    except Exception as e:
+        error, mensaje = type(e).__name__, str(e)
+    tiempo = time.perf_counter() - inicio
+
+    estado = karel.resumen() if karel is not None else {}
+    return ResultadoEjecucion(
+        programa=_nombre_programa(programa),
+        mundo=nombre_mundo if nombre_mundo is not None else mundo,
+        exito=error is None,
+        error=error,
+        mensaje=mensaje,
+        pasos=estado.get("pasos", 0),
+        beepers=estado.get("beepers", {}),
+        x=estado.get("x"),
+        y=estado.get("y"),
+        direccion=estado.get("direccion"),
+        cosos=estado.get("cosos"),
+        tiempo=tiempo,
+        grabacion=karel.grabacion if karel is not None else None,
+    )
+
+
+def _ejecutar_tarea(tarea):
+    programa, nombre_mundo, mundo, max_pasos, verificar, compilado, opciones_karel = tarea
+    return ejecutar_programa(programa, mundo, nombre_mundo, max_pasos, verificar, compilado, **opciones_karel)
+
+
+def _compilar(programa):
+    """Compila ``programa``; si no se puede, lo deja igual para que cada ejecución reporte el error"""
+    from .compilador import compilar
+
+    try:
+        return compilar(programa)
+    except ValueError:
+        return programa
+
+
+def ejecutar_lote(programas, mundos, max_pasos=10000, verificar=None, procesos=None, opciones_karel=None,
+                  compilado=False):
+    """
+    Ejecuta cada programa en cada mundo (producto cruzado) y devuelve la lista de resultados.
+
+    Las ejecuciones son independientes y sin render, y se reparten entre
+    procesos con un ProcessPoolExecutor. Los programas (y ``verificar``)
+    deben poder serializarse con pickle, es decir, estar definidos a nivel
+    de módulo. Con ``procesos=1``, o en Pyodide, se ejecutan en serie.
+
+    Parámetros:
+    -----------
+    programas : list
+        Funciones que reciben un objeto Karel
+    mundos : list o dict
+        Nombres de mundos predefinidos, parámetros de generación, matrices
+        personalizadas o un dict {nombre: mundo}
+    max_pasos : int
+        Límite de acciones por ejecución
+    verificar : callable o None
+        Función que recibe el Karel final y devuelve True si la solución es correcta
+    procesos : int o None
+        Número de procesos; None usa todos los núcleos disponibles
+    opciones_karel : dict o None
+        Parámetros adicionales para cada Karel (x_inicial, cosos_iniciales, ...)
+    compilado : bool
+        Compilar cada programa (una sola vez, aquí) con ``compilador.compilar``
+    """
+    opciones_karel = opciones_karel or {}
+    if compilado:
+        programas = [_compilar(programa) for programa in programas]
+    tareas = [
+        (programa, nombre_mundo, mundo, max_pasos, verificar, compilado, opciones_karel)
+        for programa in programas
+        for nombre_mundo, mundo in _normalizar_mundos(mundos)
+    ]
+
+    if procesos == 1 or len(tareas) <= 1 or sys.platform == "emscripten":
+        return [_ejecutar_tarea(tarea) for tarea in tareas]
+
+    # multiprocessing se importa solo aquí: es caro de cargar y no existe en Pyodide
+    from concurrent.futures import ProcessPoolExecutor
+
+    procesos = procesos or os.cpu_count() or 1
+    bloque = max(1, len(tareas) // (procesos * 4))
+    with ProcessPoolExecutor(max_workers=procesos) as ejecutor:
+        return list(ejecutor.map(_ejecutar_tarea, tareas, chunksize=bloque))
@@ -0,0 +1,286 @@
+# pykarel_web/mundo.py
+import itertools
+import weakref
+from collections.abc import MutableMapping
+
+import numpy as np
+
+# Desplazamiento (dx, dy) de cada dirección: 0:Este, 1:Norte, 2:Oeste, 3:Sur
+MOVIMIENTOS = ((1, 0), (0, 1), (-1, 0), (0, -1))
+
+_ids = itertools.count()
+
+
+class Marca:
+    """
+    Estado de un Mundo al que se puede volver con ``Mundo.deshacer_hasta``.
+
+    Una marca normal es una posición en el diario de cambios y, mientras
+    está viva, obliga al mundo a anotar cada cambio. Una marca con
+    ``copia`` guarda en cambio paredes y cosos completos y no necesita
+    el diario.
+    """
+
+    __slots__ = ("posicion", "valida", "copia", "__weakref__")
+
+    def __init__(self, posicion, copia=None):
+        self.posicion = posicion
+        self.valida = True
+        self.copia = copia
+
+
+class Mundo:
+    """
+    Mundo de Karel respaldado por arreglos de NumPy.
+
+    Las paredes se guardan en una cuadrícula ``int8`` con un borde de una
+    celda de paredes alrededor, así que consultar una celda vecina nunca se
+    sale del arreglo. Los cosos viven en un arreglo ``int32`` del tamaño del
+    mundo; los que se colocan fuera del mundo se guardan aparte.
+
+    Se indexa como la matriz original: ``mundo[y][x]`` devuelve el valor de
+    la celda (1 es obstáculo). Para modificar una celda se usa ``fijar``.
+
+    Mientras haya alguna marca viva (``marca``), cada cambio de ``fijar`` y
+    ``fijar_cosos`` se anota en un diario con el valor anterior y
+    ``deshacer_hasta`` vuelve a la marca en tiempo proporcional a los
+    cambios hechos desde entonces. Sin marcas vivas no se anota nada, y la
+    parte del diario anterior a la marca más vieja se descarta.
+
+    Parámetros:
+    -----------
+    matriz : list o numpy.ndarray
+        Matriz del mundo indexada ``[y][x]``
+    """
+
+    def __init__(self, matriz):
+        celdas = np.array(matriz, dtype=np.int32)
+        if celdas.ndim != 2 or celdas.size == 0:
+            raise ValueError("El mundo debe ser una matriz rectangular no vacía")
+        self.alto, self.ancho = celdas.shape
+        self.celdas = celdas
+        self.celdas.flags.writeable = False
+
+        self.paredes = np.ones((self.alto + 2, self.ancho + 2), dtype=np.int8)
+        self.paredes[1:-1, 1:-1] = celdas == 1
+        self.beepers = np.zeros((self.alto, self.ancho), dtype=np.int32)
+        self._fuera = {}  # Cosos colocados fuera del mundo
+        self._diario = []  # (x, y, cosos anteriores) o (x, y, None, celda anterior)
+        self._base = 0  # Registros descartados del inicio del diario
+        self._marcas = weakref.WeakSet()  # Marcas vivas que usan el diario
+        self._vivas = 0  # Cuántas son; sin ninguna no se anota nada
+        self._tope = 64  # Largo del diario a partir del cual se intenta recortar
+
+        # Vistas planas: indexarlas devuelve enteros de Python sin crear arreglos
+        self._fila = self.ancho + 2
+        self._paredes_planas = memoryview(self.paredes.reshape(-1))
+        self._beepers_planos = memoryview(self.beepers.reshape(-1))
+        self._desplazamientos = tuple(dy * self._fila + dx for dx, dy in MOVIMIENTOS)
+
+        self._id = next(_ids)
+        self._version = 0
+
+    @property
+    def clave(self):
+        """Identifica el contenido de paredes; cambia cada vez que se usa ``fijar``."""
+        return (self._id, self._version)
+
+    def __len__(self):
+        return self.alto
+
+    def __getitem__(self, y):
+        return self.celdas[y]
+
+    def __iter__(self):
+        return iter(self.celdas)
+
+    def dentro(self, x, y):
+        """Indica si (x, y) está dentro del mundo"""
+        return 0 <= x < self.ancho and 0 <= y < self.alto
+
+    def es_pared(self, x, y):
+        """Indica si (x, y) es un obstáculo o está fuera del mundo"""
+        if not self.dentro(x, y):
+            return True
+        return self._paredes_planas[(y + 1) * self._fila + x + 1] != 0
+
+    def abierto(self, x, y, direccion):
+        """Indica si la celda vecina a (x, y) en ``direccion`` está libre"""
+        return self._paredes_planas[(y + 1) * self._fila + x + 1 + self._desplazamientos[direccion]] == 0
+
+    def fijar(self, x, y, valor):
+        """Cambia el valor de una celda (1 para poner un obstáculo)"""
+        if self._vivas:
+            self._diario.append((x, y, None, int(self.celdas[y, x])))
+        self._fijar(x, y, valor)
+
+    def _fijar(self, x, y, valor):
+        celdas = self.celdas.copy()
+        celdas[y, x] = valor
+        celdas.flags.writeable = False
+        self.celdas = celdas
+        self.paredes[y + 1, x + 1] = valor == 1
+        self._version += 1
+
+    def cosos(self, x, y):
+        """Cantidad de cosos en (x, y)"""
+        if self.dentro(x, y):
+            return self._beepers_planos[y * self.ancho + x]
+        return self._fuera.get((x, y), 0)
+
+    def fijar_cosos(self, x, y, cantidad):
+        """Fija la cantidad de cosos en (x, y)"""
+        if self.dentro(x, y):
+            i = y * self.ancho + x
+            if self._vivas:
+                self._diario.append((x, y, self._beepers_planos[i]))
+            self._beepers_planos[i] = cantidad
+            return
+        if self._vivas:
+            self._diario.append((x, y, self._fuera.get((x, y), 0)))
+        self._fijar_fuera(x, y, cantidad)
+
+    def fijar_cosos_celdas(self, xs, ys, cantidades):
+        """
+        Fija los cosos de varias celdas del mundo a la vez (arreglos de
+        NumPy, sin celdas repetidas); cada celda se anota en el diario.
+        """
+        if self._vivas:
+            anteriores = self.beepers[ys, xs]
+            self._diario.extend(zip(xs.tolist(), ys.tolist(), anteriores.tolist()))
+        self.beepers[ys, xs] = cantidades
+
+    def _fijar_fuera(self, x, y, cantidad):
+        if cantidad:
+            self._fuera[(x, y)] = cantidad
+        else:
+            self._fuera.pop((x, y), None)
+
+    def marca(self, copia=False):
+        """
+        Devuelve una Marca del estado actual para ``deshacer_hasta``.
+
+        Con ``copia`` la marca guarda paredes y cosos en vez de depender del
+        diario: cuesta O(celdas) pero puede vivir indefinidamente sin que el
+        mundo tenga que anotar sus cambios.
+        """
+        if copia:
+            return Marca(None, (self.celdas, self.beepers.copy(), dict(self._fuera)))
+        if len(self._diario) > self._tope:
+            self._recortar()
+        marca = Marca(self._base + len(self._diario))
+        self._marcas.add(marca)
+        self._vivas += 1
+        weakref.finalize(marca, self._soltar)
+        return marca
+
+    def _soltar(self):
+        self._vivas -= 1
+        if not self._vivas:
+            self._base += len(self._diario)
+            self._diario.clear()
+
+    def _recortar(self):
+        """Descarta del diario lo anterior a la marca viva más vieja"""
+        sobrante = min((m.posicion for m in self._marcas if m.valida), default=self._base + len(self._diario))
+        sobrante = min(sobrante - self._base, len(self._diario))
+        if sobrante > 0:
+            del self._diario[:sobrante]
+            self._base += sobrante
+        self._tope = max(64, 2 * len(self._diario))
+
+    def deshacer_hasta(self, marca):
+        """
+        Deshace los cambios hechos después de ``marca``.
+
+        Las marcas posteriores dejan de valer. Lanza ValueError si la marca
+        ya no vale porque se deshicieron cambios anteriores a ella.
+        """
+        if marca.copia is not None:
+            self._volver_a_copia(marca.copia)
+            return
+        if not marca.valida or marca not in self._marcas:
+            raise ValueError("La marca no pertenece a la historia actual del mundo")
+        n = marca.posicion - self._base
+        while len(self._diario) > n:
+            registro = self._diario.pop()
+            if len(registro) == 4:
+                self._fijar(registro[0], registro[1], registro[3])
+            elif self.dentro(registro[0], registro[1]):
+                self._beepers_planos[registro[1] * self.ancho + registro[0]] = registro[2]
+            else:
+                self._fijar_fuera(*registro)
+        for otra in self._marcas:
+            if otra.posicion > marca.posicion:
+                otra.valida = False
+
+    def _volver_a_copia(self, copia):
+        celdas, beepers, fuera = copia
+        if self.celdas is not celdas:
+            self.celdas = celdas
+            self.paredes[1:-1, 1:-1] = celdas == 1
+            self._version += 1
+        self.beepers[:] = beepers
+        self._fuera = dict(fuera)
+        # El diario ya no lleva a ninguna marca
+        for otra in self._marcas:
+            otra.valida = False
+        self._base += len(self._diario)
+        self._diario.clear()
+
+    def posiciones_con_cosos(self):
+        """Itera sobre las posiciones (x, y) con una cantidad de cosos distinta de cero"""
+        ys, xs = np.nonzero(self.beepers)
+        for x, y in zip(xs.tolist(), ys.tolist()):
+            yield (x, y)
+        yield from list(self._fuera)
+
+    def copia(self):
+        """Devuelve un mundo independiente con las mismas paredes y cosos"""
+        nuevo = Mundo(self.celdas)
+        nuevo.beepers[:] = self.beepers
+        nuevo._fuera = dict(self._fuera)
+        return nuevo
+
+    def a_lista(self):
+        """Devuelve la matriz del mundo como lista de listas"""
+        return self.celdas.tolist()
+
+
+class VistaBeepers(MutableMapping):
+    """
+    Vista tipo diccionario ``{(x, y): cantidad}`` sobre los cosos de un Mundo.
+
+    Mantiene la interfaz de ``Karel.beepers`` cuando era un dict; solo las
+    celdas con cosos aparecen como llaves.
+    """
+
+    def __init__(self, mundo):
+        self.mundo = mundo
+
+    def __getitem__(self, posicion):
+        cantidad = self.mundo.cosos(*posicion)
+        if not cantidad:
+            raise KeyError(posicion)
+        return cantidad
+
+    def get(self, posicion, default=None):
+        cantidad = self.mundo.cosos(*posicion)
+        return cantidad if cantidad else default
+
+    def __setitem__(self, posicion, cantidad):
+        self.mundo.fijar_cosos(posicion[0], posicion[1], cantidad)
+
+    def __delitem__(self, posicion):
+        if not self.mundo.cosos(*posicion):
+            raise KeyError(posicion)
+        self.mundo.fijar_cosos(posicion[0], posicion[1], 0)
+
+    def __iter__(self):
+        return self.mundo.posiciones_con_cosos()
+
+    def __len__(self):
+        return int(np.count_nonzero(self.mundo.beepers)) + len(self.mundo._fuera)
+
+    def __repr__(self):
+        return repr(dict(self.items()))
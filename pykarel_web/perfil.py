@@ -0,0 +1,90 @@
+# pykarel_web/perfil.py
+import threading
+import time
+from contextlib import contextmanager, nullcontext
+
+_SIN_MEDICION = nullcontext()
+
+
+class Perfilador:
+    """
+    Acumula tiempos y conteos por fase (acciones de Karel, fases del render, display).
+
+    Las fases se nombran con un prefijo: ``accion.avanzar``,
+    ``render.fondo``, ``render.dibujo``, ``render.png``, ``render.base64``,
+    ``mostrar``. Cada medición se envía también a los callbacks registrados
+    con ``agregar_callback`` como ``callback(fase, segundos)``.
+
+    Se puede registrar desde varios hilos (el trabajador del modo
+    "asincrono" mide el render mientras el hilo principal mide acciones).
+    """
+
+    def __init__(self):
+        self._total = {}
+        self._llamadas = {}
+        self._maximo = {}
+        self._callbacks = []
+        self._cerrojo = threading.Lock()
+
+    def registrar(self, fase, segundos):
+        """Agrega una medición de ``segundos`` a ``fase``"""
+        with self._cerrojo:
+            self._total[fase] = self._total.get(fase, 0.0) + segundos
+            self._llamadas[fase] = self._llamadas.get(fase, 0) + 1
+            if segundos > self._maximo.get(fase, 0.0):
+                self._maximo[fase] = segundos
+        for callback in self._callbacks:
+            callback(fase, segundos)
+
+    @contextmanager
+    def medir(self, fase):
+        """Context manager que mide el tiempo del bloque y lo registra en ``fase``"""
+        inicio = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.registrar(fase, time.perf_counter() - inicio)
+
+    def agregar_callback(self, callback):
+        """Registra ``callback(fase, segundos)``, llamado en cada medición"""
+        self._callbacks.append(callback)
+        return callback
+
+    def quitar_callback(self, callback):
+        self._callbacks.remove(callback)
+
+    def reiniciar(self):
+        """Borra las mediciones acumuladas (los callbacks se conservan)"""
+        with self._cerrojo:
+            self._total.clear()
+            self._llamadas.clear()
+            self._maximo.clear()
+
+    def resumen(self):
+        """Devuelve {fase: {"llamadas", "total_ms", "promedio_ms", "max_ms"}} ordenado por tiempo total"""
+        with self._cerrojo:
+            fases = sorted(self._total, key=self._total.get, reverse=True)
+            return {
+                fase: {
+                    "llamadas": self._llamadas[fase],
+                    "total_ms": self._total[fase] * 1000,
+                    "promedio_ms": self._total[fase] * 1000 / self._llamadas[fase],
+                    "max_ms": self._maximo[fase] * 1000,
+                }
+                for fase in fases
+            }
+
+    def tabla(self):
+        """Devuelve el resumen como tabla de texto"""
+        lineas = [f"{'fase':28s} {'llamadas':>9s} {'total ms':>11s} {'prom. ms':>10s} {'máx. ms':>10s}"]
+        for fase, datos in self.resumen().items():
+            lineas.append(f"{fase:28s} {datos['llamadas']:9d} {datos['total_ms']:11.2f} "
+                          f"{datos['promedio_ms']:10.3f} {datos['max_ms']:10.3f}")
+        return "\n".join(lineas)
+
+
+def medir(perfilador, fase):
+    """Devuelve ``perfilador.medir(fase)``, o un contexto vacío si no hay perfilador"""
+    if perfilador is None:
+        return _SIN_MEDICION
+    return perfilador.medir(fase)
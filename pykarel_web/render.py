@@ -0,0 +1,559 @@
+# pykarel_web/render.py
+import base64
+import struct
+import zlib
+from io import BytesIO
+
+import numpy as np
+
+from .perfil import medir
+
+COLORES_KAREL = ['#e74c3c', '#2980b9', '#27ae60', '#f1c40f']
+FLECHAS_KAREL = ['→', '↑', '←', '↓']
+
+
+def _hex_a_rgb(color):
+    color = color.lstrip('#')
+    return np.array([int(color[i:i+2], 16) for i in (0, 2, 4)], dtype=np.float32)
+
+
+def titulo(paso):
+    """Título de un frame; sin ``paso`` (None) no lleva número, así los estados repetidos dan el mismo PNG"""
+    return "Karel" if paso is None else f"Karel - Paso {paso}"
+
+
+def clave_mundo(mundo):
+    """Llave de caché del fondo de un mundo (Mundo o lista de listas)"""
+    clave = getattr(mundo, "clave", None)
+    if clave is not None:
+        return clave
+    return tuple(tuple(fila) for fila in mundo)
+
+
+def _chunk_png(tipo, datos):
+    return struct.pack(">I", len(datos)) + tipo + datos + struct.pack(">I", zlib.crc32(tipo + datos) & 0xffffffff)
+
+
+def codificar_png(rgb, nivel=6):
+    """Codifica un arreglo uint8 de forma (alto, ancho, 3) como PNG"""
+    alto, ancho, _ = rgb.shape
+    filas = np.zeros((alto, ancho * 3 + 1), dtype=np.uint8)  # Byte de filtro 0 por fila
+    filas[:, 1:] = rgb.reshape(alto, ancho * 3)
+    return (b"\x89PNG\r\n\x1a\n"
+            + _chunk_png(b"IHDR", struct.pack(">IIBBBBB", ancho, alto, 8, 2, 0, 0, 0))
+            + _chunk_png(b"IDAT", zlib.compress(filas.tobytes(), nivel))
+            + _chunk_png(b"IEND", b""))
+
+
+def decodificar_png(png):
+    """
+    Decodifica un PNG escrito por ``codificar_png`` (RGB de 8 bits sin
+    filtros) y devuelve el arreglo uint8. Lanza ValueError con otros PNGs.
+    """
+    if png[:8] != b"\x89PNG\r\n\x1a\n":
+        raise ValueError("No es un PNG")
+    i, idat, cabecera = 8, [], None
+    while i < len(png):
+        largo, = struct.unpack(">I", png[i:i + 4])
+        tipo, datos = png[i + 4:i + 8], png[i + 8:i + 8 + largo]
+        if tipo == b"IHDR":
+            cabecera = struct.unpack(">IIBBBBB", datos)
+        elif tipo == b"IDAT":
+            idat.append(datos)
+        i += largo + 12
+    if cabecera is None or cabecera[2:] != (8, 2, 0, 0, 0):
+        raise ValueError("Solo se decodifican PNGs RGB de 8 bits sin entrelazar")
+    ancho, alto = cabecera[:2]
+    filas = np.frombuffer(zlib.decompress(b"".join(idat)), dtype=np.uint8).reshape(alto, ancho * 3 + 1)
+    if filas[:, 0].any():
+        raise ValueError("Solo se decodifican PNGs sin filtros")
+    return filas[:, 1:].reshape(alto, ancho, 3)
+
+
+def ancho_png(png):
+    """Ancho en píxeles de un PNG, leído de su cabecera"""
+    return struct.unpack(">I", png[16:20])[0]
+
+
+# Calidades de los frames según dónde se muestran: ``ancho`` es el ancho
+# objetivo en píxeles; los mundos grandes crecen hasta tener
+# ``celda_minima`` píxeles por celda, sin pasar de ``ancho_maximo``
+CALIDADES = {
+    "miniatura": {"ancho": 300, "celda_minima": 4, "ancho_maximo": 600},
+    "animacion": {"ancho": 500, "celda_minima": 8, "ancho_maximo": 1200},
+    "exportar": {"ancho": 1000, "celda_minima": 16, "ancho_maximo": 4000},
+}
+ANCHO_MINIATURA = CALIDADES["miniatura"]["ancho"]
+
+
+def validar_calidad(calidad):
+    if calidad is not None and calidad not in CALIDADES:
+        raise ValueError(f"Calidad desconocida: {calidad}. Opciones: {', '.join(CALIDADES)}")
+    return calidad
+
+
+def pixeles_calidad(calidad, lado):
+    """Ancho en píxeles de los frames de ``calidad`` para un mundo cuyo lado mayor mide ``lado`` celdas"""
+    opciones = CALIDADES[calidad]
+    return int(min(max(opciones["ancho"], opciones["celda_minima"] * (lado + 1)), opciones["ancho_maximo"]))
+
+
+def reducir(rgb, ancho):
+    """
+    Reduce un frame RGB tomando uno de cada ``factor`` píxeles, con el mayor
+    factor entero que deja al menos ``ancho`` píxeles de ancho. Es casi
+    gratis; el navegador termina de ajustar el tamaño al mostrarlo.
+    """
+    factor = max(1, rgb.shape[1] // ancho)
+    if factor == 1:
+        return rgb
+    return np.ascontiguousarray(rgb[::factor, ::factor, :3])
+
+
+class Renderizador:
+    """
+    Interfaz de los renderizadores de Karel.
+
+    Un renderizador recibe el estado de un paso y devuelve el frame como
+    PNG codificado en base64. Si se le asigna un ``perfilador`` registra el
+    tiempo de cada fase (``render.fondo``, ``render.dibujo``, ``render.png``
+    y ``render.base64``).
+
+    Con una ``calidad`` de ``CALIDADES`` el tamaño de la imagen y de lo que
+    se dibuja se ajusta al tamaño de cada mundo; sin ella se usa el tamaño
+    fijo del renderizador.
+    """
+
+    perfilador = None
+    calidad = None
+    nivel_png = 6
+
+    def _medir(self, fase):
+        return medir(self.perfilador, fase)
+
+    def renderizar(self, karel_x, karel_y, direccion, beepers, mundo, paso):
+        return self.codificar(self.renderizar_rgb(karel_x, karel_y, direccion, beepers, mundo, paso))
+
+    def codificar(self, rgb):
+        """Codifica un frame RGB como PNG en base64"""
+        with self._medir("render.png"):
+            png = codificar_png(rgb, self.nivel_png)
+        with self._medir("render.base64"):
+            return base64.b64encode(png).decode('utf-8')
+
+    def renderizar_rgb(self, karel_x, karel_y, direccion, beepers, mundo, paso):
+        """Dibuja un estado y devuelve el arreglo RGB uint8 (alto, ancho, 3); ver ``titulo`` para ``paso``"""
+        raise NotImplementedError
+
+    def renderizar_robots_rgb(self, robots, beepers, mundo, paso):
+        """
+        Dibuja varios robots en un mismo frame y devuelve el arreglo RGB.
+
+        ``robots`` es una terna (xs, ys, direcciones) de secuencias o
+        arreglos de la misma longitud.
+        """
+        raise NotImplementedError
+
+    def invalidar(self):
+        """Descarta cualquier caché que dependa del mundo."""
+        pass
+
+
+class RenderizadorMatplotlib(Renderizador):
+    """
+    Dibuja los frames de Karel con matplotlib.
+
+    La cuadrícula, los obstáculos y los ejes se dibujan una sola vez por
+    mundo y se guardan como fondo; en cada frame solo se restaura ese fondo
+    y se dibujan encima los cosos, la flecha de Karel y el título.
+
+    La flecha, los cosos y las etiquetas se escalan con el tamaño de la
+    celda, así que no se salen de ella en mundos grandes. Con ``calidad``
+    los dpi se eligen para que la imagen tenga el ancho de esa calidad.
+    """
+
+    def __init__(self, figsize=(10, 10), dpi=100, calidad=None):
+        self.figsize = figsize
+        self.dpi = dpi
+        self.calidad = validar_calidad(calidad)
+        self._clave = None
+        self._fig = None
+        self._ax = None
+        self._canvas = None
+        self._fondo = None
+        self._karel = None
+
+    def invalidar(self):
+        """Descarta el fondo guardado; se reconstruye en el siguiente frame."""
+        self._clave = None
+        self._fig = self._ax = self._canvas = self._fondo = self._karel = None
+
+    def _construir_fondo(self, mundo):
+        """Dibuja la capa estática del mundo y guarda el raster resultante"""
+        # matplotlib solo se importa si se usa este renderizador
+        from matplotlib.backends.backend_agg import FigureCanvasAgg
+        from matplotlib.figure import Figure
+        from matplotlib.patches import Rectangle
+
+        alto, ancho = len(mundo), len(mundo[0])
+        dpi = self.dpi
+        if self.calidad is not None:
+            dpi = pixeles_calidad(self.calidad, max(ancho, alto)) / self.figsize[0]
+        fig = Figure(figsize=self.figsize, dpi=dpi)
+        canvas = FigureCanvasAgg(fig)
+        ax = fig.add_subplot()
+
+        # Lado de una celda en puntos (los ejes ocupan ~77% de la figura);
+        # en el mundo de 5x5 da los tamaños originales: flecha de 60 puntos,
+        # cosos de 18 y números de 12
+        celda = min(0.775 * self.figsize[0] / ancho, 0.77 * self.figsize[1] / alto) * 72
+        self._tam_coso = 0.162 * celda
+        self._tam_numero = 0.108 * celda
+
+        # Dibujar cuadrícula (si las celdas tienen al menos 4 píxeles)
+        if celda * dpi / 72 >= 4:
+            for x in range(ancho+1):
+                ax.axvline(x, color='gray', linestyle=':', linewidth=0.5)
+            for y in range(alto+1):
+                ax.axhline(y, color='gray', linestyle=':', linewidth=0.5)
+
+        # Dibujar obstáculos
+        for y in range(len(mundo)):
+            for x in range(len(mundo[0])):
+                if mundo[y][x] == 1:
+                    ax.add_patch(Rectangle(
+                        (x, y), 1, 1,
+                        color='#2c3e50',
+                        hatch='//',
+                        alpha=0.7
+                    ))
+
+        # Configuración del gráfico con coordenadas
+        ax.set_xlim(-0.5, len(mundo[0])-0.5)
+        ax.set_ylim(-0.5, len(mundo)-0.5)
+
+        # Una etiqueta cada ``salto`` celdas para que no se encimen
+        fuente = min(12, max(6, 0.5 * celda))
+        salto = max(1, int(np.ceil(fuente * (0.6 * len(str(max(ancho, alto) - 1)) + 0.4) / celda)))
+        x_ticks = range(0, ancho, salto)
+        y_ticks = range(0, alto, salto)
+        ax.set_xticks(x_ticks)
+        ax.set_yticks(y_ticks)
+        ax.set_xticklabels([str(i) for i in x_ticks], fontsize=fuente)
+        ax.set_yticklabels([str(i) for i in y_ticks], fontsize=fuente)
+
+        ax.set_xlabel('X Coordinates', fontsize=14, labelpad=10)
+        ax.set_ylabel('Y Coordinates', fontsize=14, labelpad=10)
+
+        ax.grid(True, linestyle=':', alpha=0.6)
+        ax.set_title("", fontweight='bold', pad=20, fontsize=16)
+        ax.title.set_animated(True)
+        ax.set_aspect('equal')
+
+        # Flecha de Karel: se reutiliza en todos los frames
+        self._karel = ax.text(
+            0, 0, '',
+            fontsize=0.54 * celda,
+            ha='center',
+            va='center',
+            fontweight='bold',
+            animated=True
+        )
+
+        canvas.draw()
+        self._fig, self._ax, self._canvas = fig, ax, canvas
+        self._fondo = canvas.copy_from_bbox(fig.bbox)
+
+    def renderizar(self, karel_x, karel_y, direccion, beepers, mundo, paso):
+        """Renderiza un estado del mundo y lo devuelve como PNG en base64"""
+        rgba = self._dibujar(((karel_x,), (karel_y,), (direccion,)), beepers, mundo, paso)
+
+        # Guardar imagen
+        with self._medir("render.png"):
+            import matplotlib.image as mpimg
+            buf = BytesIO()
+            mpimg.imsave(buf, rgba, format='png', dpi=self.dpi)
+        with self._medir("render.base64"):
+            return base64.b64encode(buf.getvalue()).decode('utf-8')
+
+    def renderizar_rgb(self, karel_x, karel_y, direccion, beepers, mundo, paso):
+        return self.renderizar_robots_rgb(((karel_x,), (karel_y,), (direccion,)), beepers, mundo, paso)
+
+    def renderizar_robots_rgb(self, robots, beepers, mundo, paso):
+        return self._dibujar(robots, beepers, mundo, paso)[:, :, :3].copy()
+
+    def _dibujar(self, robots, beepers, mundo, paso):
+        """Dibuja el estado sobre el fondo guardado y devuelve el buffer RGBA del canvas"""
+        clave = clave_mundo(mundo)
+        if clave != self._clave:
+            with self._medir("render.fondo"):
+                self._construir_fondo(mundo)
+            self._clave = clave
+
+        with self._medir("render.dibujo"):
+            return self._dibujar_dinamico(robots, beepers, paso)
+
+    def _dibujar_dinamico(self, robots, beepers, paso):
+        ax, canvas = self._ax, self._canvas
+        canvas.restore_region(self._fondo)
+
+        # Dibujar cosos/zumbadores
+        dinamicos = []
+        for (x, y), cantidad in beepers.items():
+            if cantidad > 0:
+                dinamicos.extend(ax.plot(x + 0.5, y + 0.5, 'ro', markersize=self._tam_coso, alpha=0.5,
+                                         animated=True))
+                if self._tam_numero >= 4:
+                    dinamicos.append(ax.text(x + 0.5, y + 0.5, str(cantidad),
+                                             ha='center', va='center',
+                                             color='white', weight='bold',
+                                             fontsize=self._tam_numero, animated=True))
+        for artista in dinamicos:
+            ax.draw_artist(artista)
+
+        # Dibujar a Karel (el mismo artista en cada posición si hay varios robots)
+        for karel_x, karel_y, direccion in zip(*robots):
+            self._karel.set_position((karel_x + 0.5, karel_y + 0.5))
+            self._karel.set_text(FLECHAS_KAREL[direccion])
+            self._karel.set_color(COLORES_KAREL[direccion])
+            ax.draw_artist(self._karel)
+
+        ax.title.set_text(titulo(paso))
+        ax.draw_artist(ax.title)
+
+        for artista in dinamicos:
+            artista.remove()
+        return np.asarray(canvas.buffer_rgba())
+
+
+# Fuente de 5x7 píxeles para números de cosos, coordenadas y título
+_FUENTE = {
+    "0": ["01110", "10001", "10011", "10101", "11001", "10001", "01110"],
+    "1": ["00100", "01100", "00100", "00100", "00100", "00100", "01110"],
+    "2": ["01110", "10001", "00001", "00010", "00100", "01000", "11111"],
+    "3": ["11110", "00001", "00001", "01110", "00001", "00001", "11110"],
+    "4": ["00010", "00110", "01010", "10010", "11111", "00010", "00010"],
+    "5": ["11111", "10000", "11110", "00001", "00001", "10001", "01110"],
+    "6": ["00110", "01000", "10000", "11110", "10001", "10001", "01110"],
+    "7": ["11111", "00001", "00010", "00100", "01000", "01000", "01000"],
+    "8": ["01110", "10001", "10001", "01110", "10001", "10001", "01110"],
+    "9": ["01110", "10001", "10001", "01111", "00001", "00010", "01100"],
+    "K": ["10001", "10010", "10100", "11000", "10100", "10010", "10001"],
+    "P": ["11110", "10001", "10001", "11110", "10000", "10000", "10000"],
+    "a": ["00000", "00000", "01110", "00001", "01111", "10001", "01111"],
+    "e": ["00000", "00000", "01110", "10001", "11111", "10000", "01110"],
+    "l": ["01100", "00100", "00100", "00100", "00100", "00100", "01110"],
+    "o": ["00000", "00000", "01110", "10001", "10001", "10001", "01110"],
+    "r": ["00000", "00000", "10110", "11001", "10000", "10000", "10000"],
+    "s": ["00000", "00000", "01111", "10000", "01110", "00001", "11110"],
+    "-": ["00000", "00000", "00000", "11111", "00000", "00000", "00000"],
+    " ": ["00000", "00000", "00000", "00000", "00000", "00000", "00000"],
+}
+_GLIFOS = {c: np.array([[b == "1" for b in fila] for fila in filas]) for c, filas in _FUENTE.items()}
+
+
+def _mascara_texto(texto, escala):
+    """Devuelve la máscara booleana de un texto escrito con la fuente de 5x7"""
+    columnas = []
+    for i, caracter in enumerate(texto):
+        if i:
+            columnas.append(np.zeros((7, 1), dtype=bool))
+        columnas.append(_GLIFOS.get(caracter, _GLIFOS[" "]))
+    mascara = np.hstack(columnas)
+    return mascara.repeat(escala, axis=0).repeat(escala, axis=1)
+
+
+class RenderizadorNumpy(Renderizador):
+    """
+    Dibuja los frames directamente en un arreglo RGB de NumPy.
+
+    No necesita matplotlib: la cuadrícula y los obstáculos se pintan una vez
+    por mundo, y en cada frame se copian encima sprites precalculados de los
+    cosos, los números y la flecha de Karel antes de codificar el PNG.
+
+    Con ``calidad`` el tamaño de la celda se elige por mundo para que la
+    imagen tenga el ancho de esa calidad (``celda`` se ignora).
+    """
+
+    CELDA_MINIMA = 2
+    CELDA_MAXIMA = 48
+
+    FONDO = np.array([255, 255, 255], dtype=np.uint8)
+    LINEA = np.array([200, 200, 200], dtype=np.uint8)
+    TEXTO = np.array([40, 40, 40], dtype=np.uint8)
+
+    def __init__(self, celda=48, nivel_png=6, calidad=None):
+        self.nivel_png = nivel_png
+        self.calidad = validar_calidad(calidad)
+        self._clave = None
+        self._fondo = None
+        self._fijar_celda(celda)
+
+    def _fijar_celda(self, celda):
+        self.celda = celda
+        self._escala = max(1, celda // 24)
+        self._margen = 7 * self._escala + 2 * celda // 4
+        self._preparar_sprites()
+
+    def _celda_calidad(self, ancho, alto):
+        """Lado de la celda con el que la imagen de un mundo de ``ancho`` x ``alto`` tiene el ancho de la calidad"""
+        pixeles = pixeles_calidad(self.calidad, max(ancho, alto))
+        # La imagen mide lado * celda + 2 * margen, y el margen es ~celda / 2 + 7
+        celda = (pixeles - 14) // (max(ancho, alto) + 1)
+        return int(min(max(celda, self.CELDA_MINIMA), self.CELDA_MAXIMA))
+
+    def invalidar(self):
+        self._clave = None
+        self._fondo = None
+
+    def _preparar_sprites(self):
+        c = self.celda
+        centro = (c - 1) / 2
+        fil, col = np.ogrid[:c, :c]
+
+        # Disco de los cosos: rojo con alpha 0.5
+        self._disco = (fil - centro) ** 2 + (col - centro) ** 2 <= (0.3 * c) ** 2
+        self._color_disco = np.array([255, 0, 0], dtype=np.float32)
+
+        # Flecha hacia el Este; las demás direcciones son rotaciones de 90°
+        grosor = max(1, c // 14)
+        cuerpo = (np.abs(fil - centro) <= grosor) & (col >= 0.12 * c) & (col <= 0.6 * c)
+        punta = (col >= 0.5 * c) & (col <= 0.9 * c) & (np.abs(fil - centro) <= (0.9 * c - col) * 0.75)
+        este = cuerpo | punta
+        self._flechas = [np.rot90(este, k) for k in range(4)]
+        self._pixeles_flechas = [np.nonzero(flecha) for flecha in self._flechas]  # Para dibujar muchos robots
+        self._colores = [_hex_a_rgb(color).astype(np.uint8) for color in COLORES_KAREL]
+
+    def _origen_celda(self, x, y, alto):
+        """Esquina superior izquierda (fila, columna) de la celda (x, y) en píxeles"""
+        return self._margen + (alto - 1 - y) * self.celda, self._margen + x * self.celda
+
+    def _construir_fondo(self, mundo):
+        c = self.celda
+        alto, ancho = len(mundo), len(mundo[0])
+        # El margen tiene que alcanzar para las coordenadas de las filas
+        largo = (6 * len(str(max(ancho, alto) - 1)) - 1) * self._escala
+        self._margen = max(7 * self._escala + 2 * c // 4, largo + 2 * self._escala)
+        img = np.empty((alto * c + 2 * self._margen, ancho * c + 2 * self._margen, 3), dtype=np.uint8)
+        img[:] = self.FONDO
+
+        # Obstáculos: #2c3e50 con alpha 0.7 y rayado diagonal
+        obstaculo = (0.7 * _hex_a_rgb('#2c3e50') + 0.3 * 255).astype(np.uint8)
+        rayado = _hex_a_rgb('#2c3e50').astype(np.uint8)
+        fil, col = np.ogrid[:c, :c]
+        lineas = ((fil + col) % max(4, c // 6)) == 0
+        for y in range(alto):
+            for x in range(ancho):
+                if mundo[y][x] == 1:
+                    f, k = self._origen_celda(x, y, alto)
+                    bloque = img[f:f + c, k:k + c]
+                    bloque[:] = obstaculo
+                    bloque[lineas] = rayado
+
+        # Cuadrícula
+        abajo, derecha = self._margen + alto * c, self._margen + ancho * c
+        for i in range(ancho + 1):
+            img[self._margen:abajo + 1, min(self._margen + i * c, derecha - 1)] = self.LINEA
+        for j in range(alto + 1):
+            img[min(self._margen + j * c, abajo - 1), self._margen:derecha] = self.LINEA
+
+        # Coordenadas, una cada ``salto`` celdas para que no se encimen
+        salto = max(1, -(-(largo + 4 * self._escala) // c))
+        for x in range(0, ancho, salto):
+            self._pegar_texto(img, str(x), abajo + c // 8, self._margen + x * c + c // 2, self.TEXTO, centrar_fila=False)
+        for y in range(0, alto, salto):
+            f, _ = self._origen_celda(0, y, alto)
+            self._pegar_texto(img, str(y), f + c // 2, self._margen // 2, self.TEXTO)
+        return img
+
+    def _pegar_texto(self, img, texto, fila, columna, color, centrar_fila=True):
+        """Pinta un texto centrado horizontalmente en ``columna``"""
+        mascara = _mascara_texto(texto, self._escala)
+        h, w = mascara.shape
+        f = fila - h // 2 if centrar_fila else fila
+        k = columna - w // 2
+        # Recortar lo que quede fuera de la imagen (mundos muy pequeños)
+        f0, k0 = max(f, 0), max(k, 0)
+        f1, k1 = min(f + h, img.shape[0]), min(k + w, img.shape[1])
+        if f0 < f1 and k0 < k1:
+            img[f0:f1, k0:k1][mascara[f0 - f:f1 - f, k0 - k:k1 - k]] = color
+
+    def renderizar_png(self, karel_x, karel_y, direccion, beepers, mundo, paso):
+        """Igual que ``renderizar`` pero devuelve los bytes del PNG"""
+        rgb = self.renderizar_rgb(karel_x, karel_y, direccion, beepers, mundo, paso)
+        with self._medir("render.png"):
+            return codificar_png(rgb, self.nivel_png)
+
+    def renderizar_rgb(self, karel_x, karel_y, direccion, beepers, mundo, paso):
+        """Dibuja un estado y devuelve el arreglo RGB uint8"""
+        return self.renderizar_robots_rgb(((karel_x,), (karel_y,), (direccion,)), beepers, mundo, paso)
+
+    def renderizar_robots_rgb(self, robots, beepers, mundo, paso):
+        clave = clave_mundo(mundo)
+        if clave != self._clave:
+            with self._medir("render.fondo"):
+                if self.calidad is not None:
+                    celda = self._celda_calidad(len(mundo[0]), len(mundo))
+                    if celda != self.celda:
+                        self._fijar_celda(celda)
+                self._fondo = self._construir_fondo(mundo)
+            self._clave = clave
+
+        with self._medir("render.dibujo"):
+            return self._dibujar_dinamico(robots, beepers, mundo, paso)
+
+    def _dibujar_dinamico(self, robots, beepers, mundo, paso):
+        c = self.celda
+        alto, ancho = len(mundo), len(mundo[0])
+        img = self._fondo.copy()
+
+        # Cosos/zumbadores (los que caen fuera del mundo no se ven)
+        for (x, y), cantidad in beepers.items():
+            if cantidad > 0 and 0 <= x < ancho and 0 <= y < alto:
+                f, k = self._origen_celda(x, y, alto)
+                bloque = img[f:f + c, k:k + c]
+                mezcla = bloque[self._disco] * 0.5 + self._color_disco * 0.5
+                bloque[self._disco] = mezcla.astype(np.uint8)
+                if c >= 8 * self._escala:  # En celdas más chicas el número no cabe
+                    self._pegar_texto(img, str(cantidad), f + c // 2, k + c // 2, self.FONDO)
+
+        # Robots: los de una misma dirección se pintan con una sola asignación
+        xs, ys, direcciones = robots
+        if len(direcciones) == 1:
+            f, k = self._origen_celda(xs[0], ys[0], alto)
+            img[f:f + c, k:k + c][self._flechas[direcciones[0]]] = self._colores[direcciones[0]]
+        else:
+            xs, ys, direcciones = np.asarray(xs), np.asarray(ys), np.asarray(direcciones)
+            for d in range(4):
+                elegidos = direcciones == d
+                if elegidos.any():
+                    f, k = self._origen_celda(xs[elegidos], ys[elegidos], alto)
+                    filas, columnas = self._pixeles_flechas[d]
+                    img[f[:, None] + filas, k[:, None] + columnas] = self._colores[d]
+
+        # Título
+        self._pegar_texto(img, titulo(paso), self._margen // 2, img.shape[1] // 2, self.TEXTO)
+        return img
+
+
+RENDERIZADORES = {
+    "matplotlib": RenderizadorMatplotlib,
+    "numpy": RenderizadorNumpy,
+}
+
+
+def crear_renderizador(renderizador, calidad=None):
+    """
+    Devuelve una instancia de renderizador a partir de su nombre o de una instancia.
+
+    ``calidad`` ("miniatura", "animacion" o "exportar") solo se usa al crear
+    uno por nombre; sin ella el renderizador usa su tamaño fijo.
+    """
+    if isinstance(renderizador, Renderizador):
+        return renderizador
+    validar_calidad(calidad)
+    try:
+        clase = RENDERIZADORES[renderizador]
+    except KeyError:
+        raise ValueError(f"Renderizador desconocido: {renderizador}") from None
+    return clase(calidad=calidad)
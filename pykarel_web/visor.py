@@ -0,0 +1,421 @@
+# pykarel_web/visor.py
+import json
+import random
+
+from .render import COLORES_KAREL, FLECHAS_KAREL
+
+
+def datos_traza(traza, beepers_iniciales):
+    """
+    Convierte la traza de un Karel en un diccionario compacto serializable a JSON.
+
+    Cada mundo distinto se envía una sola vez (filas de '0'/'1', la fila 0
+    es y=0); los pasos son una lista plana ``[x, y, dirección, ...]`` y los
+    cosos solo aparecen en los pasos que los cambian.
+    """
+    mundos, cambios_mundo, claves = [], [], {}
+    pasos, cambios = [], []
+    for i, (x, y, direccion, _, cambio, mundo) in enumerate(traza):
+        clave = getattr(mundo, "clave", id(mundo))
+        if clave not in claves:
+            claves[clave] = len(mundos)
+            mundos.append(["".join("1" if celda == 1 else "0" for celda in fila) for fila in mundo])
+        if not cambios_mundo or cambios_mundo[-1][1] != claves[clave]:
+            cambios_mundo.append([i, claves[clave]])
+        pasos.extend((x, y, direccion))
+        if cambio is not None:
+            (cx, cy), cantidad = cambio
+            cambios.append([i, cx, cy, cantidad])
+    return {
+        "mundos": mundos,
+        "cambios_mundo": cambios_mundo,
+        "beepers": [[x, y, cantidad] for (x, y), cantidad in beepers_iniciales.items() if cantidad > 0],
+        "paso_inicial": traza[0][3] if traza else 0,
+        "pasos": pasos,
+        "cambios": cambios,
+    }
+
+
+def html_animacion(imagenes, delay=500, indices=None):
+    """
+    HTML de una animación con controles a partir de una lista de PNGs en base64.
+
+    Con ``indices`` (como los de ``AlmacenFrames.indexados``), ``imagenes``
+    son los frames únicos y el paso ``i`` muestra ``imagenes[indices[i]]``:
+    cada PNG viaja una sola vez aunque el estado se repita. Sin ``indices``
+    hay una imagen por paso. El navegador las cambia sin ejecutar código en
+    el kernel.
+    """
+    if indices is None:
+        indices = list(range(len(imagenes)))
+    # Generate unique ID for this animation
+    container_id = f"karel_animation_{random.randint(10000, 99999)}"
+    total = len(indices)
+
+    # Create HTML with images and animation controls
+    return f"""
+    <div id="{container_id}" style="text-align:center;">
+        <img id="{container_id}_img"
+             style="width:500px; border:1px solid #ddd; border-radius:5px; margin-bottom:10px;">
+        <div style="margin:10px 0;">
+            <button id="{container_id}_prev" style="padding:5px 15px; margin:0 5px;">« Anterior</button>
+            <button id="{container_id}_play" style="padding:5px 15px; margin:0 5px;">▶ Reproducir</button>
+            <button id="{container_id}_pause" style="padding:5px 15px; margin:0 5px; display:none;">⏸ Pausar</button>
+            <button id="{container_id}_next" style="padding:5px 15px; margin:0 5px;">Siguiente »</button>
+        </div>
+        <div style="margin-top:10px;">
+            <span id="{container_id}_counter">Paso 1 de {total}</span>
+            <div style="margin-top:10px;">
+                <label for="{container_id}_speed">Velocidad: </label>
+                <input type="range" id="{container_id}_speed" min="100" max="2000" value="{delay}" style="width:200px;">
+            </div>
+        </div>
+    </div>
+
+    <script>
+    (function() {{
+        // Frames únicos y, por paso, cuál de ellos se muestra
+        const images = {json.dumps(imagenes)};
+        const indices = {json.dumps(indices, separators=(",", ":"))};
+
+        // Animation variables
+        let currentIdx = 0;
+        let animationId = null;
+        let animDelay = {delay};
+
+        // Get DOM elements
+        const container = document.getElementById("{container_id}");
+        const img = document.getElementById("{container_id}_img");
+        const prevBtn = document.getElementById("{container_id}_prev");
+        const nextBtn = document.getElementById("{container_id}_next");
+        const playBtn = document.getElementById("{container_id}_play");
+        const pauseBtn = document.getElementById("{container_id}_pause");
+        const counter = document.getElementById("{container_id}_counter");
+        const speedControl = document.getElementById("{container_id}_speed");
+
+        // Update display
+        function updateDisplay() {{
+            img.src = "data:image/png;base64," + images[indices[currentIdx]];
+            counter.textContent = `Paso ${{currentIdx + 1}} de {total}`;
+        }}
+
+        // Animation functions
+        function nextFrame() {{
+            currentIdx = (currentIdx + 1) % indices.length;
+            updateDisplay();
+        }}
+
+        function prevFrame() {{
+            currentIdx = (currentIdx - 1 + indices.length) % indices.length;
+            updateDisplay();
+        }}
+
+        function startAnimation() {{
+            if (animationId) clearInterval(animationId);
+            animationId = setInterval(nextFrame, animDelay);
+            playBtn.style.display = "none";
+            pauseBtn.style.display = "inline";
+        }}
+
+        function stopAnimation() {{
+            if (animationId) clearInterval(animationId);
+            animationId = null;
+            playBtn.style.display = "inline";
+            pauseBtn.style.display = "none";
+        }}
+
+        // Event listeners
+        prevBtn.addEventListener("click", () => {{
+            stopAnimation();
+            prevFrame();
+        }});
+
+        nextBtn.addEventListener("click", () => {{
+            stopAnimation();
+            nextFrame();
+        }});
+
+        playBtn.addEventListener("click", startAnimation);
+        pauseBtn.addEventListener("click", stopAnimation);
+
+        speedControl.addEventListener("change", () => {{
+            animDelay = parseInt(speedControl.value);
+            if (animationId) {{
+                stopAnimation();
+                startAnimation();
+            }}
+        }});
+
+        // Initialize display
+        updateDisplay();
+    }})();
+    </script>
+    """
+
+
+def html_animacion_traza(datos, delay=500, ancho=500):
+    """
+    Genera el HTML de una animación que dibuja cada paso en un <canvas>.
+
+    Solo se envía la traza de estados, así que el tamaño no depende de
+    cuántos píxeles tiene cada frame sino del número de pasos.
+    """
+    container_id = f"karel_animation_{random.randint(10000, 99999)}"
+    total = len(datos["pasos"]) // 3
+    return f"""
+        <div id="{container_id}" style="text-align:center;">
+            <canvas id="{container_id}_canvas" width="{ancho}" height="{ancho}"
+                    style="border:1px solid #ddd; border-radius:5px; margin-bottom:10px;"></canvas>
+            <div style="margin:10px 0;">
+                <button id="{container_id}_prev" style="padding:5px 15px; margin:0 5px;">« Anterior</button>
+                <button id="{container_id}_play" style="padding:5px 15px; margin:0 5px;">▶ Reproducir</button>
+                <button id="{container_id}_pause" style="padding:5px 15px; margin:0 5px; display:none;">⏸ Pausar</button>
+                <button id="{container_id}_next" style="padding:5px 15px; margin:0 5px;">Siguiente »</button>
+            </div>
+            <div style="margin-top:10px;">
+                <span id="{container_id}_counter">Paso 1 de {total}</span>
+                <div style="margin-top:10px;">
+                    <label for="{container_id}_speed">Velocidad: </label>
+                    <input type="range" id="{container_id}_speed" min="100" max="2000" value="{delay}" style="width:200px;">
+                </div>
+            </div>
+        </div>
+
+        <script>
+        (function() {{
+            const datos = {json.dumps(datos, separators=(",", ":"))};
+            const colores = {json.dumps(COLORES_KAREL)};
+            const flechas = {json.dumps(FLECHAS_KAREL, ensure_ascii=False)};
+            const total = {total};
+
+            const canvas = document.getElementById("{container_id}_canvas");
+            const ctx = canvas.getContext("2d");
+            const prevBtn = document.getElementById("{container_id}_prev");
+            const nextBtn = document.getElementById("{container_id}_next");
+            const playBtn = document.getElementById("{container_id}_play");
+            const pauseBtn = document.getElementById("{container_id}_pause");
+            const counter = document.getElementById("{container_id}_counter");
+            const speedControl = document.getElementById("{container_id}_speed");
+
+            // Índices por paso de los cambios de cosos y de mundo
+            const cambiosPorPaso = new Map();
+            for (const [i, x, y, n] of datos.cambios) cambiosPorPaso.set(i, [x, y, n]);
+            const mundoPorPaso = new Array(total);
+            let m = 0;
+            for (let i = 0, c = 0; i < total; i++) {{
+                if (c < datos.cambios_mundo.length && datos.cambios_mundo[c][0] === i) m = datos.cambios_mundo[c++][1];
+                mundoPorPaso[i] = m;
+            }}
+
+            // Estado de los cosos en el paso actual
+            let cosos = new Map();
+            let pasoCosos = -1;
+            function irA(i) {{
+                if (i < pasoCosos) {{
+                    cosos = new Map();
+                    pasoCosos = -1;
+                }}
+                if (pasoCosos === -1) {{
+                    for (const [x, y, n] of datos.beepers) cosos.set(x + "," + y, n);
+                }}
+                for (let k = pasoCosos + 1; k <= i; k++) {{
+                    const cambio = cambiosPorPaso.get(k);
+                    if (cambio) cosos.set(cambio[0] + "," + cambio[1], cambio[2]);
+                }}
+                pasoCosos = i;
+            }}
+
+            function dibujar(i) {{
+                irA(i);
+                const filas = datos.mundos[mundoPorPaso[i]];
+                const alto = filas.length, ancho = filas[0].length;
+                const titulo = 40;
+                const celda = Math.floor(Math.min((canvas.width - 20) / ancho, (canvas.height - titulo - 10) / alto));
+                const ox = Math.floor((canvas.width - celda * ancho) / 2), oy = titulo;
+                const px = (x) => ox + x * celda, py = (y) => oy + (alto - 1 - y) * celda;
+
+                ctx.fillStyle = "#ffffff";
+                ctx.fillRect(0, 0, canvas.width, canvas.height);
+
+                ctx.fillStyle = "rgba(44, 62, 80, 0.7)";
+                for (let y = 0; y < alto; y++)
+                    for (let x = 0; x < ancho; x++)
+                        if (filas[y][x] === "1") ctx.fillRect(px(x), py(y), celda, celda);
+
+                ctx.strokeStyle = "#c8c8c8";
+                ctx.lineWidth = 1;
+                ctx.beginPath();
+                for (let x = 0; x <= ancho; x++) {{ ctx.moveTo(px(x) + 0.5, oy); ctx.lineTo(px(x) + 0.5, oy + alto * celda); }}
+                for (let y = 0; y <= alto; y++) {{ ctx.moveTo(ox, oy + y * celda + 0.5); ctx.lineTo(ox + ancho * celda, oy + y * celda + 0.5); }}
+                ctx.stroke();
+
+                ctx.textAlign = "center";
+                ctx.textBaseline = "middle";
+                for (const [clave, n] of cosos) {{
+                    const [x, y] = clave.split(",").map(Number);
+                    if (n <= 0 || x < 0 || y < 0 || x >= ancho || y >= alto) continue;
+                    ctx.fillStyle = "rgba(255, 0, 0, 0.5)";
+                    ctx.beginPath();
+                    ctx.arc(px(x) + celda / 2, py(y) + celda / 2, celda * 0.3, 0, 2 * Math.PI);
+                    ctx.fill();
+                    ctx.fillStyle = "#ffffff";
+                    ctx.font = "bold " + Math.max(8, Math.floor(celda * 0.3)) + "px sans-serif";
+                    ctx.fillText(String(n), px(x) + celda / 2, py(y) + celda / 2);
+                }}
+
+                const kx = datos.pasos[3 * i], ky = datos.pasos[3 * i + 1], d = datos.pasos[3 * i + 2];
+                ctx.fillStyle = colores[d];
+                ctx.font = "bold " + Math.floor(celda * 0.8) + "px sans-serif";
+                ctx.fillText(flechas[d], px(kx) + celda / 2, py(ky) + celda / 2);
+
+                ctx.fillStyle = "#000000";
+                ctx.font = "bold 16px sans-serif";
+                ctx.fillText("Karel - Paso " + (datos.paso_inicial + i), canvas.width / 2, titulo / 2);
+                counter.textContent = `Paso ${{i + 1}} de ${{total}}`;
+            }}
+
+            let currentIdx = 0;
+            let animationId = null;
+            let animDelay = {delay};
+
+            function nextFrame() {{
+                currentIdx = (currentIdx + 1) % total;
+                dibujar(currentIdx);
+            }}
+
+            function prevFrame() {{
+                currentIdx = (currentIdx - 1 + total) % total;
+                dibujar(currentIdx);
+            }}
+
+            function startAnimation() {{
+                if (animationId) clearInterval(animationId);
+                animationId = setInterval(nextFrame, animDelay);
+                playBtn.style.display = "none";
+                pauseBtn.style.display = "inline";
+            }}
+
+            function stopAnimation() {{
+                if (animationId) clearInterval(animationId);
+                animationId = null;
+                playBtn.style.display = "inline";
+                pauseBtn.style.display = "none";
+            }}
+
+            prevBtn.addEventListener("click", () => {{
+                stopAnimation();
+                prevFrame();
+            }});
+
+            nextBtn.addEventListener("click", () => {{
+                stopAnimation();
+                nextFrame();
+            }});
+
+            playBtn.addEventListener("click", startAnimation);
+            pauseBtn.addEventListener("click", stopAnimation);
+
+            speedControl.addEventListener("change", () => {{
+                animDelay = parseInt(speedControl.value);
+                if (animationId) {{
+                    stopAnimation();
+                    startAnimation();
+                }}
+            }});
+
+            dibujar(0);
+        }})();
+        </script>
+        """
+
+
+def html_paginador(miniaturas, max_images=8, page=1, show_controls=True, ancho=300, indices=None):
+    """
+    Genera el HTML de una galería paginada en el navegador.
+
+    Con ``indices`` (como los de ``AlmacenFrames.miniaturas``), ``miniaturas``
+    son las miniaturas únicas y el paso ``i`` muestra
+    ``miniaturas[indices[i]]``; sin ``indices`` hay una por paso. El índice
+    llega una vez; cada miniatura distinta va una sola vez, en el bloque
+    JSON de la primera página que la usa, y el navegador lee los bloques
+    recién al mostrar esas páginas. Sin controles solo se envía lo que usa
+    la página visible. Cambiar de página no ejecuta nada en el kernel.
+    """
+    if indices is None:
+        indices = list(range(len(miniaturas)))
+    container_id = f"karel_paginas_{random.randint(10000, 99999)}"
+    total_pages = max(1, -(-len(indices) // max_images))
+    page = max(1, min(page, total_pages))
+    controles = "inline" if show_controls and total_pages > 1 else "none"
+    # Sin controles no se puede cambiar de página: basta la visible
+    paginas = range(1, total_pages + 1) if controles == "inline" else [page]
+    enviadas, bloques = set(), []
+    for n in paginas:
+        nuevas = {}
+        for j in indices[(n - 1) * max_images:n * max_images]:
+            if j not in enviadas:
+                enviadas.add(j)
+                nuevas[j] = miniaturas[j]
+        bloques.append(f'<script type="application/json" id="{container_id}_p{n}">{json.dumps(nuevas)}</script>')
+    bloques = "".join(bloques)
+    return f"""
+        <div id="{container_id}">
+            <div id="{container_id}_grid" style="display:flex; flex-wrap:wrap; justify-content:center;"></div>
+            <div style="text-align:center; margin-top:10px;">
+                <span id="{container_id}_label" style="margin:0 10px;"></span>
+                <div style="margin-top:5px; display:{controles};">
+                    <button id="{container_id}_prev" style="padding:5px 10px; margin:0 5px;">« Anterior</button>
+                    <button id="{container_id}_next" style="padding:5px 10px; margin:0 5px;">Siguiente »</button>
+                </div>
+            </div>
+        </div>
+        {bloques}
+        <script>
+        (function() {{
+            const porPagina = {max_images};
+            const totalPages = {total_pages};
+            const indices = {json.dumps(indices, separators=(",", ":"))};
+            const frames = {{}};  // Miniaturas ya leídas, por índice
+            let page = {page};
+
+            const grid = document.getElementById("{container_id}_grid");
+            const label = document.getElementById("{container_id}_label");
+
+            function leerHasta(n) {{
+                // Una miniatura viaja en el bloque de la primera página que la usa
+                for (let p = 1; p <= n; p++) {{
+                    const bloque = document.getElementById("{container_id}_p" + p);
+                    if (bloque) {{
+                        Object.assign(frames, JSON.parse(bloque.textContent));
+                        bloque.remove();
+                    }}
+                }}
+            }}
+
+            function mostrar() {{
+                leerHasta(page);
+                grid.replaceChildren();
+                const inicio = (page - 1) * porPagina;
+                indices.slice(inicio, inicio + porPagina).forEach((j, i) => {{
+                    const img = document.createElement("img");
+                    img.src = "data:image/png;base64," + frames[j];
+                    img.title = "Paso " + (inicio + i);
+                    img.style.cssText = "margin:5px; width:{ancho}px; border:1px solid #ddd; border-radius:5px;";
+                    grid.appendChild(img);
+                }});
+                label.textContent = `Página ${{page}} de ${{totalPages}}`;
+            }}
+
+            document.getElementById("{container_id}_prev").addEventListener("click", () => {{
+                page = Math.max(1, page - 1);
+                mostrar();
+            }});
+            document.getElementById("{container_id}_next").addEventListener("click", () => {{
+                page = Math.min(totalPages, page + 1);
+                mostrar();
+            }});
+
+            mostrar();
+        }})();
+        </script>
+        """
@@ -7,7 +7,7 @@ setup(
     name="pykarel_web",
     version=__version__,
     packages=["pykarel_web"],
-    install_requires=["matplotlib>=3.0", "ipython"],
+    install_requires=["numpy", "matplotlib>=3.0", "ipython"],
     python_requires=">=3.8",
     author="Santiago Garcia-Rios",
     description="Karel para Python en el navegador con Pyodide"
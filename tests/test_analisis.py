@@ -0,0 +1,48 @@
+import pytest
+
+from pykarel_web import Karel
+from pykarel_web.analisis import NO_ALCANZABLE, analizar
+from pykarel_web.mundo import Mundo
+
+MUNDO = [
+    [0, 0, 1, 0],
+    [0, 0, 1, 0],
+    [0, 0, 1, 0],
+]
+
+
+@pytest.mark.parametrize("celda", [(-1, 0), (-3, -2), (4, 0), (0, 3), (10, 0)])
+def test_celdas_fuera_del_mundo(celda):
+    analisis = analizar(Mundo(MUNDO))
+    for consulta in (lambda: analisis.conectados((0, 0), celda),
+                     lambda: analisis.conectados(celda, (0, 0)),
+                     lambda: analisis.distancia((0, 0), celda),
+                     lambda: analisis.distancia(celda, (0, 0)),
+                     lambda: analisis.acciones_minimas((0, 0), 0, celda),
+                     lambda: analisis.camino_acciones((0, 0), 0, celda)):
+        with pytest.raises(ValueError):
+            consulta()
+
+    karel = Karel(MUNDO, modo_render="ninguno")
+    assert karel.puede_llegar(*celda) is False
+    assert karel.acciones_hasta(*celda) is None
+
+
+def test_conectados_y_distancias():
+    analisis = analizar(Mundo(MUNDO))
+    assert analisis.num_componentes == 2
+    assert analisis.conectados((0, 0), (1, 2))
+    assert not analisis.conectados((0, 0), (3, 0))
+    assert not analisis.conectados((0, 0), (2, 0))  # Pared
+    assert analisis.distancia((0, 0), (1, 2)) == 3
+    assert analisis.distancia((0, 0), (3, 0)) == NO_ALCANZABLE
+
+
+def test_acciones_hasta_lleva_a_karel_al_destino():
+    karel = Karel(MUNDO, modo_render="ninguno")
+    acciones = karel.acciones_hasta(1, 2)
+    assert len(acciones) == analizar(karel.mundo).acciones_minimas((0, 0), 0, (1, 2))
+    for accion in acciones:
+        getattr(karel, accion)()
+    assert (karel.x, karel.y) == (1, 2)
+    assert karel.acciones_hasta(3, 0) is None
@@ -0,0 +1,91 @@
+import asyncio
+import threading
+
+import pytest
+
+from pykarel_web import Karel
+from pykarel_web.asincrono import TrabajadorRender
+
+
+def _con_limite(funcion, segundos=5):
+    """Corre ``funcion`` en un hilo y devuelve (terminó, excepción)"""
+    resultado = []
+
+    def correr():
+        try:
+            funcion()
+            resultado.append(None)
+        except Exception as e:
+            resultado.append(e)
+
+    hilo = threading.Thread(target=correr, daemon=True)
+    hilo.start()
+    hilo.join(segundos)
+    return bool(resultado), resultado[0] if resultado else None
+
+
+def _karel_que_falla(monkeypatch, **opciones):
+    karel = Karel([[0] * 6] * 6, modo_render="asincrono", renderizador="numpy", **opciones)
+
+    def falla(*args):
+        raise RuntimeError("falla del render")
+
+    monkeypatch.setattr(karel._renderizador, "renderizar_rgb", falla)
+    return karel
+
+
+def test_flush_dibuja_todo():
+    karel = Karel([[0] * 6] * 6, modo_render="asincrono", renderizador="numpy")
+    for _ in range(10):
+        karel.girar_izquierda()
+    asyncio.run(karel.flush())
+    assert karel._dibujados == len(karel._traza) == len(karel._images) == 11
+
+
+def test_flush_relanza_un_error_persistente(monkeypatch):
+    karel = _karel_que_falla(monkeypatch)
+    karel.girar_izquierda()
+    termino, error = _con_limite(lambda: asyncio.run(asyncio.wait_for(karel.flush(), 5)))
+    assert termino and isinstance(error, RuntimeError)
+
+
+def test_contrapresion_no_se_cuelga_con_un_error(monkeypatch):
+    karel = _karel_que_falla(monkeypatch)
+    karel._trabajador.max_pendientes = 4
+
+    def acciones():
+        for _ in range(20):
+            karel.girar_izquierda()
+
+    termino, error = _con_limite(acciones)
+    assert termino and isinstance(error, RuntimeError)
+
+
+def test_tarea_asyncio_relanza_el_error():
+    llamadas = []
+
+    def materializar(limite):
+        llamadas.append(limite)
+        raise RuntimeError("falla")
+
+    trabajador = TrabajadorRender(materializar, lambda: 3, usar_hilo=False)
+
+    async def correr():
+        trabajador.notificar()
+        with pytest.raises(RuntimeError):
+            await trabajador.flush()
+
+    asyncio.run(correr())
+    assert llamadas == [trabajador.lote]  # El flush relanza el error sin reintentar
+
+
+def test_reiniciar_detiene_el_trabajador_anterior():
+    for _ in range(5):
+        karel = Karel("default", modo_render="asincrono", renderizador="numpy")
+        for _ in range(30):
+            karel.girar_izquierda()
+        karel.reiniciar(mundo=[[0] * 8] * 8)
+        for _ in range(5):
+            karel.girar_izquierda()
+        asyncio.run(karel.flush())
+        assert len(karel._images) == len(karel._traza) == karel._dibujados == 6
@@ -0,0 +1,43 @@
+import json
+import os
+import subprocess
+import sys
+
+RAIZ = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+BENCHMARKS = os.path.join(RAIZ, "benchmarks")
+
+
+def _comparar(tmp_path, base, nuevo, *opciones):
+    rutas = []
+    for nombre, mundos in (("base.json", base), ("nuevo.json", nuevo)):
+        ruta = tmp_path / nombre
+        ruta.write_text(json.dumps({"mundos": mundos}))
+        rutas.append(str(ruta))
+    return subprocess.run([sys.executable, os.path.join(BENCHMARKS, "comparar.py"), *rutas, *opciones],
+                          capture_output=True, text=True)
+
+
+def test_comparar_detecta_regresiones(tmp_path):
+    base = {"recta": {"acciones_por_segundo": {"ninguno": {"girar": 1000}}, "ms_por_frame": {"numpy": 2.0}}}
+
+    mejor = {"recta": {"acciones_por_segundo": {"ninguno": {"girar": 1500}}, "ms_por_frame": {"numpy": 1.0}}}
+    assert _comparar(tmp_path, base, mejor).returncode == 0
+
+    peor = {"recta": {"acciones_por_segundo": {"ninguno": {"girar": 800}}, "ms_por_frame": {"numpy": 2.1}}}
+    resultado = _comparar(tmp_path, base, peor)
+    assert resultado.returncode == 1
+    assert "1 regresiones" in resultado.stdout and "!! recta.acciones_por_segundo" in resultado.stdout
+    assert _comparar(tmp_path, base, peor, "--umbral", "0.3").returncode == 0
+
+
+def test_bench_karel_rapido_escribe_json(tmp_path):
+    salida = tmp_path / "resultados.json"
+    subprocess.run([sys.executable, os.path.join(BENCHMARKS, "bench_karel.py"), "--rapido", "--mundos", "recta",
+                    "--salida", str(salida)], check=True, capture_output=True, cwd=str(tmp_path))
+
+    resultados = json.loads(salida.read_text())
+    recta = resultados["mundos"]["recta"]
+    assert {"version", "python", "fecha"} <= resultados.keys()
+    assert set(recta) == {"acciones_por_segundo", "ms_por_frame", "memoria_frames", "bytes_html"}
+    assert recta["acciones_por_segundo"]["ninguno"]["girar_izquierda"] > 0
+    assert recta["bytes_html"]["mostrar_animacion_traza"] < recta["bytes_html"]["mostrar_animacion"]
@@ -0,0 +1,115 @@
+import numpy as np
+import pytest
+
+from pykarel_web import Karel, KarelError, compilar
+
+
+def recursivo(k):
+    while k.hay_coso():
+        k.juntar_coso()
+        recursivo(k)
+
+
+def limpiar_fila(k):
+    while k.frente_abierto():
+        if k.hay_coso():
+            k.juntar_coso()
+        k.avanzar()
+    k.girar_izquierda()
+    k.girar_izquierda()
+
+
+def recorrer(k):
+    for _ in range(4):
+        while k.frente_abierto():
+            while k.hay_coso():
+                k.juntar_coso()
+            k.avanzar()
+        if k.contar_cosos() < 2:
+            k.poner_coso()
+        k.girar_izquierda()
+
+
+def sin_fin(k):
+    while k.frente_abierto():
+        if k.frente_bloqueado():
+            k.avanzar()
+
+
+def correr(programa, mundo, x=0, y=0, cosos=0, max_pasos=None, **opciones):
+    karel = Karel(mundo, x, y, cosos_iniciales=cosos, modo_render="ninguno", max_pasos=max_pasos, **opciones)
+    try:
+        programa(karel)
+        error = None
+    except KarelError as e:
+        error = (type(e).__name__, str(e))
+    return karel.resumen(), error
+
+
+def maneras(programa):
+    """El programa original, compilado directo y compilado pasando por los métodos de Karel"""
+    compilado = compilar(programa)
+    return [(programa, {}), (compilado, {}), (compilado, {"grabar": True})]
+
+
+@pytest.mark.parametrize("programa", [recursivo, limpiar_fila, recorrer])
+def test_compilado_equivale_al_original(programa):
+    for semilla in range(20):
+        rng = np.random.default_rng(semilla)
+        mundo = (rng.random((int(rng.integers(3, 8)), int(rng.integers(3, 8)))) < 0.15).astype(int)
+        mundo[0, 0] = 0
+        cosos = int(rng.integers(0, 4))
+        max_pasos = int(rng.integers(3, 60)) if semilla % 2 else None
+        resultados = [correr(funcion, mundo.tolist(), cosos=cosos, max_pasos=max_pasos, **opciones)
+                      for funcion, opciones in maneras(programa)]
+        assert resultados[0] == resultados[1] == resultados[2], semilla
+
+
+def test_while_en_recursion_no_es_ciclo_infinito():
+    for funcion, opciones in maneras(recursivo):
+        resumen, error = correr(funcion, "default", 2, 2, **opciones)
+        assert error is None
+        assert resumen["pasos"] == 5 and resumen["cosos"] == 5
+
+
+def test_ciclo_sin_acciones():
+    compilado = compilar(sin_fin)
+    for opciones in ({}, {"grabar": True}):
+        _, error = correr(compilado, [[0] * 3], **opciones)
+        assert error[0] == "KarelError" and "Ciclo infinito" in error[1]
+
+
+def continuar_sin_accion(k):
+    while k.frente_abierto():
+        if k.hay_coso():
+            continue
+        k.avanzar()
+
+
+def continuar_juntando(k):
+    while k.frente_abierto():
+        if k.hay_coso():
+            k.juntar_coso()
+            continue
+        k.avanzar()
+
+
+def test_continue_pasa_por_la_deteccion_de_ciclos():
+    compilado = compilar(continuar_sin_accion)
+    for opciones in ({}, {"grabar": True}):
+        _, error = correr(compilado, [[0] * 4], 0, 0, max_pasos=100, **opciones)
+        assert error[0] == "KarelError" and "Ciclo infinito" in error[1]
+
+    resultados = [correr(funcion, "default", 0, 2, **opciones) for funcion, opciones in maneras(continuar_juntando)]
+    assert resultados[0] == resultados[1] == resultados[2]
+    assert resultados[0][1] is None
+
+
+def no_compilable(k):
+    k.avanzar()
+    print("hola")
+
+
+def test_error_de_compilacion_indica_la_linea():
+    with pytest.raises(ValueError, match=r'Línea \d+: no se puede compilar: print\("hola"\)'):
+        compilar(no_compilable)
@@ -0,0 +1,24 @@
+import pytest
+
+from pykarel_web import Karel
+from pykarel_web.enjambre import Enjambre
+
+
+@pytest.mark.parametrize("mundo", ["default", [[0] * 6] * 6, {"generador": "obstaculos", "ancho": 8, "alto": 8,
+                                                               "semilla": 3, "cosos": 5}])
+def test_mismos_cosos_iniciales_que_karel(mundo):
+    karel = Karel(mundo, modo_render="ninguno")
+    enjambre = Enjambre(mundo, posiciones=[(karel.x, karel.y)], modo_render="ninguno")
+    cosos = {posicion: int(enjambre.mundo.cosos(*posicion)) for posicion in enjambre.mundo.posiciones_con_cosos()}
+    assert cosos == dict(karel.beepers.items())
+
+
+def test_mostrar_ultima_accion(monkeypatch):
+    import pykarel_web
+
+    mostrados = []
+    monkeypatch.setattr(pykarel_web, "_mostrar_html", mostrados.append)
+    enjambre = Enjambre([[0] * 4] * 4, posiciones=[(0, 0), (0, 1)])
+    enjambre.paso(["avanzar", "girar_izquierda"])
+    enjambre.mostrar_ultima_accion()
+    assert enjambre.images[-1] in mostrados[0]
@@ -0,0 +1,81 @@
+import numpy as np
+import pytest
+
+from pykarel_web import Karel, KarelError
+from pykarel_web.exportar import _PALETA, _cuantizar, indices_exportados, iterar_frames
+from pykarel_web.render import crear_renderizador
+
+
+def _karel():
+    karel = Karel([[0] * 4, [0, 1, 0, 0]], modo_render="diferido", renderizador="numpy", cosos_iniciales=2)
+    karel.avanzar()
+    karel.poner_coso()
+    karel.avanzar()
+    karel.girar_izquierda()
+    return karel
+
+
+def _esperados(karel, saltar=1):
+    indices = indices_exportados(len(karel._traza), saltar)
+    renderizador = crear_renderizador("numpy", "exportar")
+    return list(iterar_frames(karel._traza, karel._beepers_iniciales, renderizador, indices))
+
+
+def _leer_frames(ruta):
+    Image = pytest.importorskip("PIL.Image")
+    with Image.open(ruta) as imagen:
+        frames = []
+        for i in range(imagen.n_frames):
+            imagen.seek(i)
+            frames.append(np.array(imagen.convert("RGB")))
+    return frames
+
+
+def test_indices_exportados_incluyen_el_ultimo():
+    assert indices_exportados(10, 3) == [0, 3, 6, 9]
+    assert indices_exportados(10, 4) == [0, 4, 8, 9]
+    assert indices_exportados(3, 0) == [0, 1, 2]
+    assert indices_exportados(0) == []
+
+
+def test_apng_reproduce_cada_frame(tmp_path):
+    karel = _karel()
+    ruta = tmp_path / "karel.png"
+    karel.exportar(str(ruta))
+
+    leidos, esperados = _leer_frames(ruta), _esperados(karel)
+    assert len(leidos) == len(karel._traza) == 5
+    assert all(np.array_equal(a, b) for a, b in zip(leidos, esperados))
+
+
+def test_gif_reproduce_cada_frame_con_la_paleta(tmp_path):
+    karel = _karel()
+    ruta = tmp_path / "karel.gif"
+    karel.exportar(str(ruta), saltar=2)
+
+    leidos, esperados = _leer_frames(ruta), _esperados(karel, saltar=2)
+    assert len(leidos) == 3
+    assert all(np.array_equal(a, _PALETA[_cuantizar(b)]) for a, b in zip(leidos, esperados))
+
+
+def test_mp4(tmp_path):
+    karel = _karel()
+    ruta = tmp_path / "karel.mp4"
+    try:
+        import imageio  # noqa: F401
+    except ImportError:
+        with pytest.raises(ImportError, match="imageio"):
+            karel.exportar(str(ruta))
+        return
+    karel.exportar(str(ruta))
+    assert ruta.stat().st_size > 0
+
+
+def test_exportar_errores(tmp_path):
+    karel = _karel()
+    with pytest.raises(KarelError):
+        karel.exportar(str(tmp_path / "karel.bmp"))
+    with pytest.raises(KarelError):
+        karel.exportar(str(tmp_path / "karel.gif"), renderizador="svg")
+    with pytest.raises(KarelError):
+        Karel([[0] * 4], modo_render="ninguno").exportar(str(tmp_path / "karel.gif"))
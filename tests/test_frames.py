@@ -0,0 +1,60 @@
+import numpy as np
+import pytest
+
+from pykarel_web import AlmacenFrames, Karel
+
+
+@pytest.mark.parametrize("renderizador", ["numpy", "matplotlib"])
+def test_estados_repetidos_se_guardan_una_vez(renderizador):
+    karel = Karel("default", modo_render="diferido", renderizador=renderizador)
+    for _ in range(10):
+        karel.girar_derecha()
+
+    assert len(karel.images) == 31
+    assert karel.images.estadisticas()["unicos"] == 4  # Una por dirección
+    assert karel.images[0] == karel.images[4] == karel.images[-3]
+
+
+def test_truncar_descarta_contenidos_sin_frames():
+    almacen = AlmacenFrames()
+    for frame in ["a", "b", "a", "c"]:
+        almacen.append(frame)
+    almacen.truncar(2)
+    assert list(almacen) == ["a", "b"]
+    assert almacen.estadisticas()["unicos"] == 2
+
+
+def test_truncar_con_deltas_descarta_bloques_sin_frames():
+    almacen = AlmacenFrames(deltas=True, bloque=4)
+    fondo = np.zeros((8, 8, 3), dtype=np.uint8)
+    for valor in (0, 50, 100, 150):
+        frame = fondo.copy()
+        frame[:4, :4] = valor
+        almacen.append(frame)
+    almacen.truncar(2)
+    assert len(almacen) == 2
+    assert almacen.estadisticas()["unicos"] == 2  # Frame completo y el bloque del segundo
+
+
+@pytest.mark.parametrize("deltas", [False, True])
+def test_indexados_envia_cada_frame_una_vez(deltas):
+    karel = Karel([[0] * 3] * 3, modo_render="diferido", renderizador="numpy",
+                  almacen_frames="deltas" if deltas else "completo")
+    for _ in range(8):
+        karel.girar_derecha()
+    unicos, indices = karel.images.indexados()
+    assert len(unicos) == 4 and len(indices) == len(karel.images)
+    assert [unicos[i] for i in indices] == list(karel.images)
+
+
+def test_animacion_no_repite_frames(monkeypatch):
+    karel = Karel([[0] * 3] * 3, modo_render="diferido", renderizador="numpy")
+    for _ in range(40):
+        karel.girar_derecha()
+    mostrados = []
+    monkeypatch.setattr(karel, "_mostrar", mostrados.append)
+    karel.mostrar_animacion()
+    html = mostrados[0]
+    frame = karel.images[0]
+    assert html.count(frame) == 1
+    assert len(html) < karel.images.estadisticas()["bytes"] + 10000  # Frames únicos más el reproductor
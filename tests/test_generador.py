@@ -0,0 +1,86 @@
+import numpy as np
+import pytest
+
+from pykarel_web import Karel
+from pykarel_web.generador import (MUNDOS_PREDEFINIDOS, colocar_cosos, generar_mundo, info_cache, limpiar_cache,
+                                   obtener_mundo)
+from pykarel_web.mundo import Mundo
+
+
+def _iguales(a, b):
+    return np.array_equal(a.celdas, b.celdas) and np.array_equal(a.beepers, b.beepers)
+
+
+@pytest.mark.parametrize("parametros", [
+    {"generador": "laberinto"},
+    {"generador": "laberinto", "algoritmo": "arbol_binario"},
+    {"generador": "obstaculos", "densidad": 0.3},
+])
+def test_misma_semilla_mismo_mundo(parametros):
+    mundo = generar_mundo(ancho=15, alto=11, semilla=3, cosos=5, max_por_celda=3, **parametros)
+    assert mundo.celdas.shape == (11, 15)
+    assert _iguales(mundo, generar_mundo(ancho=15, alto=11, semilla=3, cosos=5, max_por_celda=3, **parametros))
+    assert not _iguales(mundo, generar_mundo(ancho=15, alto=11, semilla=4, cosos=5, max_por_celda=3,
+                                             **parametros))
+
+
+@pytest.mark.parametrize("algoritmo", ["backtracking", "arbol_binario"])
+def test_laberintos_perfectos(algoritmo):
+    celdas = generar_mundo("laberinto", 21, 15, semilla=1, algoritmo=algoritmo).celdas
+    libres = {(x, y) for y, x in zip(*np.nonzero(celdas != 1))}
+    pasillos = sum((x + 1, y) in libres for x, y in libres) + sum((x, y + 1) in libres for x, y in libres)
+
+    visitadas, pendientes = {(0, 0)}, [(0, 0)]
+    while pendientes:
+        x, y = pendientes.pop()
+        for vecina in ((x + 1, y), (x - 1, y), (x, y + 1), (x, y - 1)):
+            if vecina in libres and vecina not in visitadas:
+                visitadas.add(vecina)
+                pendientes.append(vecina)
+    assert visitadas == libres  # Conexo
+    assert pasillos == len(libres) - 1  # Sin ciclos
+
+
+def test_otros_generadores_y_errores():
+    assert not generar_mundo("habitacion", 6, 4).celdas.any()
+    assert generar_mundo("obstaculos", 30, 30, semilla=0, densidad=0.9).celdas[0, 0] == 0
+    for parametros in ({"generador": "cuevas"}, {"ancho": 0}, {"generador": "obstaculos", "densidad": 1},
+                       {"algoritmo": "prim"}):
+        with pytest.raises(ValueError):
+            generar_mundo(**parametros)
+
+
+def test_colocar_cosos_solo_en_celdas_libres():
+    matriz = np.zeros((6, 6), dtype=np.int8)
+    matriz[::2] = 1
+    mundo = colocar_cosos(Mundo(matriz), cantidad=10, max_por_celda=4, semilla=5)
+    con_cosos = mundo.beepers > 0
+    assert con_cosos.sum() == 10 and not (con_cosos & (matriz == 1)).any()
+    assert mundo.beepers.max() <= 4
+    assert np.array_equal(mundo.beepers, colocar_cosos(Mundo(matriz), 10, max_por_celda=4, semilla=5).beepers)
+
+    assert (colocar_cosos(Mundo(matriz), densidad=0.5, semilla=1).beepers > 0).sum() == 9
+    assert (colocar_cosos(Mundo(matriz), cantidad=100).beepers > 0).sum() == 18
+
+
+def test_obtener_mundo_usa_la_cache_y_devuelve_copias():
+    limpiar_cache()
+    espec = {"generador": "obstaculos", "ancho": 8, "alto": 8, "semilla": 2, "cosos": 3}
+    primero = obtener_mundo(espec)
+    primero.fijar_cosos(0, 0, 99)
+    primero.fijar(1, 1, 1)
+    segundo = obtener_mundo(dict(reversed(list(espec.items()))))
+
+    assert info_cache().hits == 1 and info_cache().misses == 1
+    assert segundo is not primero and _iguales(segundo, generar_mundo(**espec))
+
+    obtener_mundo({"generador": "habitacion", "ancho": 3, "alto": 3})  # Sin semilla no se guarda
+    assert info_cache().currsize == 1
+    assert obtener_mundo("no_existe").a_lista() == MUNDOS_PREDEFINIDOS["default"]
+
+
+def test_karel_con_mundo_generado_usa_sus_cosos():
+    espec = {"generador": "habitacion", "ancho": 5, "alto": 5, "semilla": 9, "cosos": 4}
+    karel = Karel(espec, modo_render="ninguno")
+    assert dict(karel.beepers) == dict(Karel(espec, modo_render="ninguno").beepers)
+    assert len(karel.beepers) == 4
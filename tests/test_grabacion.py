@@ -0,0 +1,28 @@
+import numpy as np
+
+from pykarel_web import Karel
+
+
+def test_truncar_descarta_los_mundos_en_cache():
+    karel = Karel([[0] * 3] * 3, modo_render="ninguno", grabar=True)
+    foto = karel.instantanea()
+    karel.crear_mundo_personalizado([[0, 1, 0]] * 3)
+    assert karel.grabacion.estado(-1)[-1].celdas[0, 1] == 1  # Queda en la cache
+
+    karel.restaurar(foto)
+    karel.crear_mundo_personalizado([[0, 0, 1]] * 3)
+    mundo = karel.grabacion.estado(-1)[-1]
+    assert np.array_equal(mundo.celdas, karel.mundo.celdas)
+
+
+def test_estado_reproduce_la_historia():
+    karel = Karel("default", 2, 2, modo_render="ninguno", grabar=True)
+    estados = [karel.resumen()]
+    karel.juntar_coso()
+    estados.append(karel.resumen())
+    karel.girar_izquierda()
+    estados.append(karel.resumen())
+    for n, resumen in enumerate(estados):
+        x, y, direccion, cosos, _, beepers, _ = karel.grabacion.estado(n)
+        assert (x, y, direccion, cosos) == (resumen["x"], resumen["y"], resumen["direccion"], resumen["cosos"])
+        assert beepers == resumen["beepers"]
@@ -0,0 +1,157 @@
+import os
+import subprocess
+import sys
+import threading
+
+import pytest
+
+from pykarel_web import Karel, KarelError, LimitePasosExcedido
+from pykarel_web.perfil import Perfilador
+
+RAIZ = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def test_limite_de_pasos_no_cambia_el_estado():
+    karel = Karel([[0] * 5], modo_render="ninguno", max_pasos=2, cosos_iniciales=1)
+    karel.avanzar()
+    karel.poner_coso()
+    estado = karel.resumen()
+
+    for accion in (karel.avanzar, karel.girar_izquierda, karel.juntar_coso):
+        with pytest.raises(LimitePasosExcedido):
+            accion()
+        assert karel.resumen() == estado
+    with pytest.raises(LimitePasosExcedido):
+        karel.colocar_cosos_en_posicion(3, 0)
+    assert karel.resumen() == estado
+
+
+def test_error_de_render_no_desalinea_frames_y_traza(monkeypatch):
+    karel = Karel([[0] * 5], modo_render="diferido", renderizador="numpy")
+    karel.avanzar()
+    karel.avanzar()
+    renderizar = karel._renderizador.renderizar_rgb
+    llamadas = []
+
+    def falla_una_vez(*args):
+        llamadas.append(args)
+        if len(llamadas) == 2:
+            raise RuntimeError("falla del render")
+        return renderizar(*args)
+
+    monkeypatch.setattr(karel._renderizador, "renderizar_rgb", falla_una_vez)
+    with pytest.raises(RuntimeError):
+        karel.images
+    assert karel._dibujados == len(karel._images) == 1
+    assert len(karel.images) == len(karel._traza) == 3
+
+
+def test_perfilador_desde_varios_hilos():
+    perfilador = Perfilador()
+
+    def registrar():
+        for _ in range(10000):
+            perfilador.registrar("render.png", 0.001)
+
+    hilos = [threading.Thread(target=registrar) for _ in range(4)]
+    for hilo in hilos:
+        hilo.start()
+    for hilo in hilos:
+        hilo.join()
+    assert perfilador.resumen()["render.png"]["llamadas"] == 40000
+
+
+@pytest.mark.parametrize("direccion", [-1, 4, 1.5, "0"])
+def test_direccion_inicial_invalida(direccion):
+    with pytest.raises(KarelError):
+        Karel([[0] * 3], direccion_inicial=direccion, modo_render="ninguno")
+    karel = Karel([[0] * 3], modo_render="ninguno")
+    with pytest.raises(KarelError):
+        karel.reiniciar(direccion_inicial=direccion)
+
+
+def test_modo_diferido_dibuja_al_consultar_los_frames(monkeypatch):
+    import pykarel_web
+
+    mostrados = []
+    monkeypatch.setattr(pykarel_web, "_mostrar_html", mostrados.append)
+    diferido = Karel([[0] * 4] * 4, modo_render="diferido", renderizador="numpy")
+    inmediato = Karel([[0] * 4] * 4, renderizador="numpy")
+    for karel in (diferido, inmediato):
+        karel.avanzar()
+        karel.girar_izquierda()
+        karel.avanzar()
+    assert diferido._dibujados == 0 and len(diferido._traza) == 4
+    assert inmediato._dibujados == 4
+
+    diferido.mostrar_ultima_accion()  # Dibuja solo el último estado
+    assert diferido._dibujados == 0 and len(mostrados) == 1
+    assert list(diferido.images) == list(inmediato.images)
+    assert diferido._dibujados == 4
+
+
+def test_modo_ninguno_no_guarda_frames():
+    karel = Karel([[0] * 4] * 4, modo_render="ninguno", cosos_iniciales=1)
+    karel.avanzar()
+    karel.poner_coso()
+    assert not karel._traza and not karel.images
+    assert karel.resumen()["beepers"][(1, 0)] == 1
+
+
+def test_crear_karel_no_carga_modulos_pesados():
+    codigo = ("import sys; from pykarel_web import Karel; from pykarel_web.lote import ejecutar_programa; "
+              "k = Karel(); assert k._dibujados == 0; "
+              "assert ejecutar_programa(lambda k: k.avanzar(), 'default').exito; "
+              "pesados = {'matplotlib', 'IPython', 'asyncio', 'multiprocessing'} & set(sys.modules); "
+              "assert not pesados, pesados; "
+              "assert len(k.images) == 1 and 'matplotlib' in sys.modules")
+    subprocess.run([sys.executable, "-c", codigo], check=True, cwd=RAIZ)
+
+
+def test_perfilador_acumula_por_fase():
+    perfilador = Perfilador()
+    recibidas = []
+    callback = perfilador.agregar_callback(lambda fase, segundos: recibidas.append((fase, segundos)))
+    perfilador.registrar("render.png", 0.002)
+    perfilador.registrar("render.png", 0.004)
+    perfilador.registrar("accion.avanzar", 0.001)
+    with perfilador.medir("mostrar"):
+        pass
+
+    resumen = perfilador.resumen()
+    assert list(resumen)[0] == "render.png"
+    assert resumen["render.png"]["llamadas"] == 2
+    assert resumen["render.png"]["total_ms"] == pytest.approx(6)
+    assert resumen["render.png"]["promedio_ms"] == pytest.approx(3)
+    assert resumen["render.png"]["max_ms"] == pytest.approx(4)
+    assert [fase for fase, _ in recibidas] == ["render.png", "render.png", "accion.avanzar", "mostrar"]
+    assert "accion.avanzar" in perfilador.tabla()
+
+    perfilador.reiniciar()
+    perfilador.registrar("mostrar", 0.001)
+    assert list(perfilador.resumen()) == ["mostrar"] and len(recibidas) == 5
+    perfilador.quitar_callback(callback)
+    perfilador.registrar("mostrar", 0.001)
+    assert len(recibidas) == 5
+
+
+def test_karel_perfila_acciones_y_render():
+    karel = Karel([[0] * 5], renderizador="numpy", perfilar=True)
+    karel.avanzar()
+    karel.avanzar()
+    karel.girar_izquierda()
+
+    perfil = karel.perfil()
+    assert perfil["accion.avanzar"]["llamadas"] == 2 and perfil["accion.girar_izquierda"]["llamadas"] == 1
+    assert {"render.dibujo", "render.png", "render.base64"} <= perfil.keys()
+
+    perfilador = karel.perfilador
+    karel.reiniciar()
+    assert karel.perfilador is perfilador  # reiniciar conserva el perfilado
+    karel.avanzar()
+    assert karel.perfil()["accion.avanzar"]["llamadas"] == 3
+
+    assert karel.desactivar_perfilado() is perfilador
+    karel.avanzar()
+    assert karel.perfil() == {} and perfilador.resumen()["accion.avanzar"]["llamadas"] == 3
+    assert "avanzar" not in vars(karel)  # Sin perfilado no quedan envolturas
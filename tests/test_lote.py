@@ -0,0 +1,72 @@
+import pytest
+
+from pykarel_web.lote import ejecutar_lote, ejecutar_programa
+
+MUNDO = [[0] * 5]
+
+
+def avanzar_dos(karel):
+    karel.avanzar()
+    karel.avanzar()
+
+
+def poner_uno(karel):
+    karel.poner_coso()
+
+
+def sin_fin(karel):
+    while True:
+        karel.girar_izquierda()
+
+
+def llego_al_final(karel):
+    return karel.resumen()["x"] == 4
+
+
+def test_ejecutar_programa_exitoso():
+    resultado = ejecutar_programa(avanzar_dos, MUNDO, nombre_mundo="fila")
+
+    assert resultado.exito and resultado.error is None
+    assert (resultado.programa, resultado.mundo) == ("avanzar_dos", "fila")
+    assert (resultado.pasos, resultado.x, resultado.y) == (2, 2, 0)
+    assert resultado.tiempo >= 0
+
+
+def test_ejecutar_programa_reporta_errores():
+    sin_cosos = ejecutar_programa(poner_uno, MUNDO, cosos_iniciales=0)
+    assert not sin_cosos.exito and sin_cosos.error == "KarelError"
+
+    limite = ejecutar_programa(sin_fin, MUNDO, max_pasos=10)
+    assert limite.error == "LimitePasosExcedido" and limite.pasos == 10
+
+    verificado = ejecutar_programa(avanzar_dos, MUNDO, verificar=llego_al_final)
+    assert verificado.error == "VerificacionFallida"
+
+
+def test_ejecutar_programa_compilado_da_el_mismo_estado():
+    normal = ejecutar_programa(avanzar_dos, MUNDO)
+    compilado = ejecutar_programa(avanzar_dos, MUNDO, compilado=True)
+
+    assert compilado.exito
+    assert (compilado.pasos, compilado.x, compilado.beepers) == (normal.pasos, normal.x, normal.beepers)
+
+
+@pytest.mark.parametrize("compilado", [False, True])
+def test_ejecutar_lote_en_paralelo_igual_que_en_serie(compilado):
+    programas = [avanzar_dos, poner_uno, sin_fin]
+    mundos = {"fila": MUNDO, "columna": [[0]] * 3}
+
+    def sin_tiempo(resultados):
+        return [r._replace(tiempo=None, grabacion=None) for r in resultados]
+
+    serie = ejecutar_lote(programas, mundos, max_pasos=20, procesos=1, compilado=compilado)
+    paralelo = ejecutar_lote(programas, mundos, max_pasos=20, procesos=2, compilado=compilado)
+
+    assert len(serie) == 6
+    assert [(r.programa, r.mundo) for r in serie][:2] == [("avanzar_dos", "fila"), ("avanzar_dos", "columna")]
+    assert sin_tiempo(serie) == sin_tiempo(paralelo)
+
+
+def test_ejecutar_lote_nombra_las_matrices():
+    resultados = ejecutar_lote([avanzar_dos], [MUNDO, MUNDO], procesos=1)
+    assert [r.mundo for r in resultados] == ["mundo_0", "mundo_1"]
@@ -0,0 +1,135 @@
+import gc
+
+import pytest
+
+from pykarel_web import Karel, KarelError
+from pykarel_web.mundo import Mundo, VistaBeepers
+
+
+def test_paredes_con_borde_y_vecinos():
+    mundo = Mundo([[0, 1, 0], [0, 0, 0]])
+
+    assert mundo.paredes.shape == (4, 5)
+    assert mundo.es_pared(1, 0) and mundo.es_pared(-1, 0) and mundo.es_pared(0, 2)
+    assert not mundo.es_pared(0, 0)
+    # Desde (0, 0): derecha es obstáculo, abajo libre, izquierda y arriba es el borde
+    assert [mundo.abierto(0, 0, d) for d in range(4)] == [False, True, False, False]
+
+    mundo.fijar(1, 0, 0)
+    assert mundo.abierto(0, 0, 0) and mundo[0][1] == 0
+
+
+def test_matriz_invalida():
+    with pytest.raises(ValueError):
+        Mundo([])
+
+
+def test_vista_beepers_se_comporta_como_dict():
+    mundo = Mundo([[0] * 3] * 2)
+    beepers = VistaBeepers(mundo)
+    beepers[(2, 1)] = 4
+    beepers[(7, 7)] = 1  # Fuera del mundo
+
+    assert mundo.beepers[1, 2] == 4 and mundo.cosos(7, 7) == 1
+    assert dict(beepers) == {(2, 1): 4, (7, 7): 1} and len(beepers) == 2
+    assert beepers.get((0, 0)) is None and (0, 0) not in beepers
+    with pytest.raises(KeyError):
+        beepers[(0, 0)]
+
+    del beepers[(7, 7)]
+    beepers[(2, 1)] = 0
+    assert dict(beepers) == {} and len(beepers) == 0
+    with pytest.raises(KeyError):
+        del beepers[(2, 1)]
+
+
+def test_copia_es_independiente():
+    mundo = Mundo([[0] * 3])
+    mundo.fijar_cosos(1, 0, 2)
+    mundo.fijar_cosos(-1, 0, 3)
+    copia = mundo.copia()
+    copia.fijar_cosos(1, 0, 9)
+    copia.fijar(2, 0, 1)
+
+    assert mundo.cosos(1, 0) == 2 and copia.cosos(-1, 0) == 3
+    assert not mundo.es_pared(2, 0) and mundo.a_lista() == [[0, 0, 0]]
+
+
+def test_deshacer_hasta_vuelve_a_la_marca():
+    mundo = Mundo([[0] * 4] * 3)
+    mundo.fijar_cosos(0, 0, 2)
+    marca = mundo.marca()
+    mundo.fijar_cosos(0, 0, 5)
+    mundo.fijar_cosos(9, 9, 1)  # Fuera del mundo
+    mundo.fijar(1, 1, 1)
+    mundo.deshacer_hasta(marca)
+    assert mundo.cosos(0, 0) == 2 and mundo.cosos(9, 9) == 0
+    assert not mundo.es_pared(1, 1)
+
+
+def test_marcas_posteriores_dejan_de_valer():
+    mundo = Mundo([[0] * 4])
+    primera = mundo.marca()
+    mundo.fijar_cosos(0, 0, 1)
+    segunda = mundo.marca()
+    mundo.deshacer_hasta(primera)
+    mundo.fijar_cosos(1, 0, 1)
+    with pytest.raises(ValueError):
+        mundo.deshacer_hasta(segunda)
+
+
+def test_sin_marcas_vivas_no_se_anota_nada():
+    mundo = Mundo([[0] * 4])
+    for i in range(100):
+        mundo.fijar_cosos(0, 0, i)
+    assert not mundo._diario
+
+    marca = mundo.marca()
+    for i in range(100):
+        mundo.fijar_cosos(0, 0, i)
+    assert len(mundo._diario) == 100
+    del marca
+    gc.collect()
+    assert not mundo._diario
+
+
+def test_el_diario_se_recorta_hasta_la_marca_mas_vieja():
+    mundo = Mundo([[0] * 4])
+    vieja = mundo.marca()
+    for i in range(100):
+        mundo.fijar_cosos(0, 0, i)
+    nueva = mundo.marca()
+    del vieja
+    gc.collect()
+    for i in range(150):
+        mundo.fijar_cosos(1, 0, i)
+    mundo.marca()
+    assert len(mundo._diario) == 150
+    mundo.deshacer_hasta(nueva)
+    assert mundo.cosos(0, 0) == 99 and mundo.cosos(1, 0) == 0
+
+
+def test_karel_no_anota_cambios_sin_instantaneas():
+    karel = Karel("default", 2, 2, modo_render="ninguno")
+    karel.juntar_coso()
+    karel.poner_coso()
+    assert not karel.mundo._diario
+
+
+def test_instantanea_y_reiniciar():
+    karel = Karel("default", 2, 2, modo_render="ninguno")
+    inicial = karel.resumen()
+    karel.juntar_coso()
+    foto = karel.instantanea()
+    estado = karel.resumen()
+    karel.juntar_coso()
+    karel.crear_mundo_personalizado([[0] * 3] * 3)
+    karel.restaurar(foto)
+    assert karel.resumen() == estado
+    karel.restaurar(foto)  # Se puede volver varias veces
+    assert karel.resumen() == estado
+
+    karel.reiniciar()
+    assert karel.resumen() == inicial
+    with pytest.raises(KarelError):
+        karel.restaurar(foto)
@@ -0,0 +1,103 @@
+import base64
+import os
+import subprocess
+import sys
+
+import numpy as np
+import pytest
+
+from pykarel_web import Karel, KarelError
+from pykarel_web.mundo import Mundo
+from pykarel_web.render import (CALIDADES, COLORES_KAREL, RenderizadorMatplotlib, RenderizadorNumpy, _hex_a_rgb,
+                                ancho_png, crear_renderizador, decodificar_png, pixeles_calidad)
+
+RAIZ = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def test_fondo_se_dibuja_una_vez_por_mundo(monkeypatch):
+    renderizador = RenderizadorMatplotlib(figsize=(3, 3), dpi=50)
+    construir = renderizador._construir_fondo
+    construcciones = []
+
+    def contar(mundo):
+        construcciones.append(mundo)
+        return construir(mundo)
+
+    monkeypatch.setattr(renderizador, "_construir_fondo", contar)
+    mundo = Mundo([[0] * 4] * 4)
+    primero = renderizador.renderizar_rgb(0, 0, 0, {}, mundo, None)
+    for direccion in range(4):
+        renderizador.renderizar_rgb(1, 1, direccion, {(2, 2): 3}, mundo, 5)
+    assert len(construcciones) == 1
+    assert np.array_equal(renderizador.renderizar_rgb(0, 0, 0, {}, mundo, None), primero)
+
+    mundo.fijar(3, 3, 1)  # Cambiar las paredes invalida el fondo
+    con_pared = renderizador.renderizar_rgb(0, 0, 0, {}, mundo, None)
+    assert len(construcciones) == 2
+    nuevo = RenderizadorMatplotlib(figsize=(3, 3), dpi=50)
+    assert np.array_equal(con_pared, nuevo.renderizar_rgb(0, 0, 0, {}, mundo, None))
+    assert not np.array_equal(con_pared, primero)
+
+
+def _tiene_color(rgb, color):
+    return bool(np.all(rgb == _hex_a_rgb(color).astype(np.uint8), axis=2).any())
+
+
+def test_numpy_dibuja_karel_y_los_cosos():
+    renderizador = RenderizadorNumpy(celda=24)
+    mundo = Mundo([[0, 0, 1], [0, 0, 0]])
+    frames = [renderizador.renderizar_rgb(0, 0, d, {}, mundo, None) for d in range(4)]
+    assert frames[0].dtype == np.uint8 and frames[0].shape[2] == 3
+    for direccion, frame in enumerate(frames):
+        assert _tiene_color(frame, COLORES_KAREL[direccion])
+    assert len({frame.tobytes() for frame in frames}) == 4
+    con_cosos = renderizador.renderizar_rgb(0, 0, 0, {(1, 1): 2}, mundo, None)
+    assert not np.array_equal(con_cosos, frames[0])
+    assert np.array_equal(decodificar_png(base64.b64decode(renderizador.codificar(con_cosos))), con_cosos)
+
+
+def test_karel_con_numpy_no_importa_matplotlib():
+    codigo = ("import sys; from pykarel_web import Karel; k = Karel(renderizador='numpy'); k.avanzar(); "
+              "assert len(k.images) == 2; assert 'matplotlib' not in sys.modules")
+    subprocess.run([sys.executable, "-c", codigo], check=True, cwd=RAIZ)
+
+
+def test_renderizador_desconocido():
+    with pytest.raises(ValueError):
+        crear_renderizador("svg")
+    with pytest.raises(KarelError):
+        Karel(renderizador="svg")
+    propio = RenderizadorNumpy()
+    assert crear_renderizador(propio) is propio
+
+
+def _ancho(renderizador, lado):
+    return renderizador.renderizar_rgb(0, 0, 0, {}, Mundo([[0] * lado] * lado), 0).shape[1]
+
+
+def test_pixeles_calidad_crece_con_el_mundo_hasta_el_maximo():
+    for calidad, opciones in CALIDADES.items():
+        assert pixeles_calidad(calidad, 5) == opciones["ancho"]
+        assert opciones["ancho"] < pixeles_calidad(calidad, 150) <= opciones["ancho_maximo"]
+        assert pixeles_calidad(calidad, 10000) == opciones["ancho_maximo"]
+
+
+@pytest.mark.parametrize("calidad", list(CALIDADES))
+def test_ancho_de_los_frames_segun_la_calidad(calidad):
+    assert _ancho(crear_renderizador("matplotlib", calidad), 8) == pixeles_calidad(calidad, 8)
+
+    numpy = crear_renderizador("numpy", calidad)
+    assert _ancho(numpy, 60) == pytest.approx(pixeles_calidad(calidad, 60), rel=0.15)
+    # En mundos chicos la celda no pasa de su tamaño original
+    assert _ancho(numpy, 5) <= _ancho(RenderizadorNumpy(), 5)
+
+
+def test_calidad_en_karel():
+    karel = Karel([[0] * 8] * 8, renderizador="matplotlib", calidad="miniatura")
+    karel.avanzar()
+    assert ancho_png(base64.b64decode(karel.images[-1])) == CALIDADES["miniatura"]["ancho"]
+
+    with pytest.raises(ValueError):
+        crear_renderizador("numpy", "ultra")
+    with pytest.raises(KarelError):
+        Karel(calidad="ultra")
@@ -0,0 +1,88 @@
+import base64
+import json
+
+import numpy as np
+import pytest
+
+from pykarel_web import Karel, KarelError
+from pykarel_web.render import ANCHO_MINIATURA, ancho_png, codificar_png, decodificar_png, reducir
+from pykarel_web.visor import datos_traza, html_paginador
+
+
+def test_reducir_toma_uno_de_cada_n_pixeles():
+    rgb = np.arange(1000 * 800 * 3, dtype=np.uint32).astype(np.uint8).reshape(800, 1000, 3)
+    pequeno = reducir(rgb, 300)
+    assert pequeno.shape == (267, 334, 3)
+    assert np.array_equal(pequeno, rgb[::3, ::3])
+    assert reducir(rgb[:, :500], 300).shape[1] == 500  # Menos del doble: se deja igual
+
+
+def test_decodificar_png_propio():
+    rgb = np.random.default_rng(0).integers(0, 256, (7, 5, 3), dtype=np.uint8)
+    png = codificar_png(rgb)
+    assert ancho_png(png) == 5
+    assert np.array_equal(decodificar_png(png), rgb)
+
+
+def test_miniaturas_se_calculan_al_pedirlas_una_vez_por_frame(monkeypatch):
+    karel = Karel([[0] * 3] * 3, renderizador="numpy", calidad="exportar")
+    for _ in range(40):
+        karel.girar_derecha()
+    assert not karel._images._miniaturas  # Las acciones no calculan miniaturas
+
+    mostrados = []
+    monkeypatch.setattr(karel, "_mostrar", mostrados.append)
+    karel.ejecutar_acciones()
+    miniaturas, indices = karel._miniaturas()
+    assert len(miniaturas) == 4 and len(indices) == 121
+    assert all(ancho_png(base64.b64decode(m)) < 2 * ANCHO_MINIATURA for m in miniaturas)
+    assert sum(mostrados[0].count(m) for m in miniaturas) == 4
+
+
+def test_frames_pequenos_se_usan_como_miniatura():
+    karel = Karel([[0] * 3] * 3, modo_render="diferido", renderizador="numpy")
+    karel.avanzar()
+    miniaturas, indices = karel._miniaturas()
+    assert [miniaturas[i] for i in indices] == list(karel.images)
+
+
+def test_paginador_envia_cada_miniatura_una_vez():
+    miniaturas = [f"mini{i}:" for i in range(20)]
+    html = html_paginador(miniaturas, max_images=8, page=2)
+    assert html.count('type="application/json"') == 3
+    assert all(html.count(m) == 1 for m in miniaturas)
+
+    html = html_paginador(miniaturas, max_images=8, page=2, show_controls=False)
+    assert html.count('type="application/json"') == 1
+    assert "mini8:" in html and "mini7:" not in html and "mini16:" not in html
+
+    html = html_paginador(["mini-a:", "mini-b:"], max_images=2, indices=[0, 1, 0, 0, 1, 1])
+    assert html.count('type="application/json"') == 3
+    assert html.count("mini-a:") == 1 and html.count("mini-b:") == 1
+
+
+def test_datos_traza_compactos():
+    karel = Karel([[0] * 4, [0, 1, 0, 0]], modo_render="diferido", renderizador="numpy", cosos_iniciales=2)
+    karel.avanzar()
+    karel.poner_coso()
+    karel.girar_izquierda()
+    datos = datos_traza(karel._traza, karel._beepers_iniciales)
+
+    assert datos["mundos"] == [["0000", "0100"]] and datos["cambios_mundo"] == [[0, 0]]
+    assert sorted(datos["beepers"]) == sorted([x, y, n] for (x, y), n in karel._beepers_iniciales.items())
+    assert datos["pasos"] == [0, 0, 0, 1, 0, 0, 1, 0, 0, 1, 0, 1]
+    assert datos["cambios"] == [[2, 1, 0, 1]]  # Solo el paso que cambia cosos
+
+
+def test_mostrar_animacion_por_traza(monkeypatch):
+    karel = Karel([[0] * 5], modo_render="diferido", renderizador="numpy")
+    mostrados = []
+    monkeypatch.setattr(karel, "_mostrar", mostrados.append)
+    for _ in range(3):
+        karel.avanzar()
+    karel.mostrar_animacion(transporte="traza")
+    assert "<canvas" in mostrados[-1] and "data:image/png" not in mostrados[-1]
+    assert json.dumps(datos_traza(karel._traza, karel._beepers_iniciales), separators=(",", ":")) in mostrados[-1]
+
+    with pytest.raises(KarelError):
+        karel.mostrar_animacion(transporte="video")